@@ -0,0 +1,157 @@
+"""Local stand-in for the Apify endpoints the ingestion pipeline uses.
+
+Serves `POST /v2/acts/<actor>/runs`, `GET /v2/actor-runs/<id>` (with
+`waitForFinish` long polling) and `GET /v2/datasets/<id>/items` (with
+`offset`, `limit` and `fields`) from in-memory items, with a configurable
+run duration and per-request latency. Point the app or ingest.py at it:
+
+    python apify_stub.py --port 8765 --rows 2000 --run-seconds 3 --latency 0.05
+    APIFY_API_BASE=http://127.0.0.1:8765/v2 APIFY_API_TOKEN=stub python ingest.py ...
+
+By default each actor serves synthetic items for its platform (see
+benchmarks/synthetic.py); actors listed in `fail_actors` finish FAILED.
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubApifyServer:
+    """Threaded HTTP server mimicking Apify runs and datasets; usable as a context manager."""
+
+    def __init__(self, items_by_actor, run_seconds=0.0, latency=0.0, fail_actors=(), host="127.0.0.1", port=0):
+        self.items_by_actor = items_by_actor
+        self.run_seconds = run_seconds
+        self.latency = latency
+        self.fail_actors = set(fail_actors)
+        self.runs = {}
+        self.requests = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start_run(self, actor_id, payload):
+        with self._lock:
+            run_id = f"run-{next(self._ids)}"
+            self.runs[run_id] = {"actor_id": actor_id, "input": payload,
+                                 "finishes_at": time.monotonic() + self.run_seconds}
+        return self.run_data(run_id)
+
+    def run_data(self, run_id):
+        run = self.runs[run_id]
+        if time.monotonic() < run["finishes_at"]:
+            status = "RUNNING"
+        else:
+            status = "FAILED" if run["actor_id"] in self.fail_actors else "SUCCEEDED"
+        return {"data": {"id": run_id, "status": status, "defaultDatasetId": run_id}}
+
+    def dataset_items(self, dataset_id, offset, limit, fields):
+        items = self.items_by_actor.get(self.runs[dataset_id]["actor_id"], [])
+        page = items[offset:offset + limit] if limit is not None else items[offset:]
+        if fields:
+            page = [{k: item[k] for k in fields if k in item} for item in page]
+        return page
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _route(self, method):
+                url = urlparse(self.path)
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                parts = url.path.strip("/").split("/")
+                with stub._lock:
+                    stub.requests.append((method, url.path, query))
+                time.sleep(stub.latency)
+                return parts, query
+
+            def do_POST(self):
+                parts, _ = self._route("POST")
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if len(parts) == 4 and parts[:2] == ["v2", "acts"] and parts[3] == "runs":
+                    self._reply(201, stub.start_run(parts[2], payload))
+                else:
+                    self._reply(404, {"error": {"type": "page-not-found"}})
+
+            def do_GET(self):
+                parts, query = self._route("GET")
+                if len(parts) == 3 and parts[:2] == ["v2", "actor-runs"] and parts[2] in stub.runs:
+                    # Long poll: hold the request until the run ends or waitForFinish runs out
+                    deadline = time.monotonic() + min(float(query.get("waitForFinish", 0)), 60)
+                    while stub.run_data(parts[2])["data"]["status"] == "RUNNING" and time.monotonic() < deadline:
+                        time.sleep(0.01)
+                    self._reply(200, stub.run_data(parts[2]))
+                elif len(parts) == 4 and parts[:2] == ["v2", "datasets"] and parts[3] == "items" and parts[2] in stub.runs:
+                    limit = int(query["limit"]) if "limit" in query else None
+                    fields = query["fields"].split(",") if query.get("fields") else None
+                    self._reply(200, stub.dataset_items(parts[2], int(query.get("offset", 0)), limit, fields))
+                else:
+                    self._reply(404, {"error": {"type": "record-not-found"}})
+
+        return Handler
+
+
+def synthetic_items_by_actor(rows=None, seed=0):
+    """Synthetic raw items for every actor in PLATFORMS."""
+    from benchmarks.synthetic import raw_items
+    from ingestion import PLATFORMS
+    return {actor_id: raw_items(name, rows, seed=seed) for name, actor_id, _ in PLATFORMS}
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve stand-in Apify endpoints locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=None, help="items per actor (default: one per bundled review)")
+    parser.add_argument("--run-seconds", type=float, default=2.0, help="how long each run takes")
+    parser.add_argument("--latency", type=float, default=0.0, help="added to every request, in seconds")
+    parser.add_argument("--fail", action="append", default=[], metavar="ACTOR_ID", help="actor whose runs fail")
+    args = parser.parse_args()
+
+    server = StubApifyServer(synthetic_items_by_actor(args.rows), run_seconds=args.run_seconds,
+                             latency=args.latency, fail_actors=args.fail, host=args.host, port=args.port)
+    print(f"Serving stand-in Apify API at {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
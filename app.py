@@ -1,11 +1,23 @@
 import streamlit as st
-import requests
-import time
-import json
 import pandas as pd
 from datetime import datetime, timedelta
 import openai
 import os
+import time
+from contextlib import closing
+
+import dedup
+import jobs
+import metrics
+import portfolio
+import replay
+import review_store
+import screening
+import shared_store
+import summarizer
+import themes
+from ingestion import PLATFORMS, compact_reviews
+from review_index import ReviewDateIndex
 
 # Set page config
 st.set_page_config(
@@ -14,11 +26,16 @@ st.set_page_config(
     layout="wide"
 )
 
+# Record or replay every Apify call of this server process if asked to (see replay.py)
+replay.install_from_env()
+
 # Initialize session state variables
 if 'reviews_loaded' not in st.session_state:
     st.session_state.reviews_loaded = False
 if 'reviews_df' not in st.session_state:
     st.session_state.reviews_df = None
+if 'reviews_lease' not in st.session_state:
+    st.session_state.reviews_lease = None
 if 'summary' not in st.session_state:
     st.session_state.summary = None
 if 'report' not in st.session_state:
@@ -33,300 +50,217 @@ if 'openai_api_key' not in st.session_state:
     st.session_state.openai_api_key = None
 if 'establishment_name' not in st.session_state:
     st.session_state.establishment_name = None
+if 'dataset_version' not in st.session_state:
+    st.session_state.dataset_version = None
+if 'csv_requested' not in st.session_state:
+    st.session_state.csv_requested = None
+if 'ingest_job' not in st.session_state:
+    st.session_state.ingest_job = None
+if 'job_errors' not in st.session_state:
+    st.session_state.job_errors = []
 
 st.title("Review Round Up 📊")
 
-def trigger_actor(actor_id, api_token, start_url):
-    run_url = f"https://api.apify.com/v2/acts/{actor_id}/runs?token={api_token}"
-    
-    # Platform-specific configurations
-    if "booking-reviews-scraper" in actor_id:
-        sort_by = "review_score_and_price"  # Valid for Booking.com
-    elif "expedia-hotels-com-reviews-scraper" in actor_id:
-        sort_by = "Most recent"  # Valid for Expedia
-    elif "tripadvisor-reviews" in actor_id:
-        sort_by = "Most recent"  # Valid for TripAdvisor
-    elif "google-maps-reviews-scraper" in actor_id:
-        sort_by = "Most recent"  # Valid for Google Maps
-    else:
-        sort_by = "Most recent"  # Default for other platforms
-    
-    # Configure the actor to fetch 2 years of reviews
-    payload = {
-        "startUrls": [{"url": start_url}],
-        "maxReviews": 1000,  # Set a high number to ensure we get all reviews
-        "maxReviewsPerPage": 100,  # Maximum reviews per page
-        "maxPages": 10,  # Maximum number of pages to scrape
-        "minRating": 1,  # Include all ratings
-        "maxRating": 5,  # Include all ratings
-        "sortBy": sort_by,
-        "timeRange": "2y"  # Last 2 years
-    }
-    
-    # Add platform-specific configurations
-    if "google-maps-reviews-scraper" in actor_id:
-        payload["includeReviewOrigin"] = True  # Ensure we get review origin for Google
-    
-    resp = requests.post(run_url, json=payload)
-    resp.raise_for_status()
-    run_data = resp.json()
-    run_id = run_data["data"]["id"]
-    return run_id
-
-def wait_for_run(run_id, api_token):
-    status_url = f"https://api.apify.com/v2/actor-runs/{run_id}?token={api_token}"
-    while True:
-        resp = requests.get(status_url)
-        resp.raise_for_status()
-        data = resp.json()
-        status = data["data"]["status"]
-        if status in ["SUCCEEDED", "FAILED", "ABORTED"]:
-            # Add detailed status information
-            if status != "SUCCEEDED":
-                st.error(f"Run status: {status}")
-                st.error(f"Run details: {json.dumps(data['data'], indent=2)}")
-            return data
-        time.sleep(5)
-
-def fetch_reviews(dataset_id, api_token):
-    dataset_url = f"https://api.apify.com/v2/datasets/{dataset_id}/items?token={api_token}"
-    resp = requests.get(dataset_url)
-    resp.raise_for_status()
-    return resp.json()
-
-# Normalization functions
-def normalize_date(date_str):
-    """Helper function to normalize dates across all platforms"""
-    if not date_str:
-        return None
-    try:
-        # Try different date formats
-        for fmt in ["%Y-%m-%d", "%d %b %Y", "%b %d, %Y", "%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"]:
-            try:
-                date_obj = pd.to_datetime(date_str, format=fmt)
-                return date_obj.strftime("%Y-%m-%d")
-            except:
-                continue
-        # If none of the specific formats work, try pandas' automatic parsing
-        date_obj = pd.to_datetime(date_str)
-        return date_obj.strftime("%Y-%m-%d")
-    except:
-        return None
-
-def normalize_booking_review(raw):
-    rating_10 = raw.get("rating")
-    rating_5 = round((rating_10 / 2), 1) if rating_10 is not None else None
-    review_title = raw.get("reviewTitle")
-    liked = raw.get('likedText', '')
-    disliked = raw.get('dislikedText', '')
-    
-    # Format review text with clear sections
-    review_parts = []
-    if review_title:
-        review_parts.append(f"Title: {review_title}")
-    if liked:
-        review_parts.append(f"Liked: {liked}")
-    if disliked:
-        review_parts.append(f"Disliked: {disliked}")
-    
-    review_text = "\n".join(review_parts)
-    
-    return {
-        "platform": "Booking.com",
-        "review_date": normalize_date(raw.get("reviewDate")),
-        "reviewer_name": raw.get("userName"),
-        "star_rating": rating_5,
-        "review_text": review_text,
-        "replied": raw.get("propertyResponse") is not None
-    }
+# Derived views of the loaded reviews, memoized on the dataset version (plus the
+# date range where relevant) so widget interactions don't recompute them. The
+# DataFrame arguments are underscored so Streamlit doesn't hash them; the
+# version stands in for them.
 
-def normalize_expedia_review(raw):
-    label = raw.get("reviewScoreWithDescription", {}).get("label", "")
-    try:
-        rating_10 = float(label.split(" out of ")[0])
-        rating_5 = round(rating_10 / 2, 1)
-    except Exception:
-        rating_5 = None
-    review_title = raw.get("title", "")
-    review_text = raw.get("text", "")
-    reviewer_name = raw.get("reviewAuthorAttribution", {}).get("text", "")
-    replied = bool(raw.get("managementResponses"))
-    
-    # Format review text with title only if it exists
-    if review_title:
-        review_text = f"Title: {review_title}\n{review_text}"
-    
-    # Get and format the date
-    date_str = raw.get("submissionTime", {}).get("longDateFormat", "")
-    
-    return {
-        "platform": "Expedia",
-        "review_date": normalize_date(date_str),
-        "reviewer_name": reviewer_name,
-        "star_rating": rating_5,
-        "review_text": review_text.strip(),
-        "replied": replied
-    }
+def dataset_version(df):
+    """Content hash identifying a loaded reviews DataFrame."""
+    return f"{len(df)}-{pd.util.hash_pandas_object(df, index=False).sum():x}"
 
-def normalize_tripadvisor_review(raw):
-    review_title = raw.get("title", "")
-    review_text = raw.get("text", "")
-    reviewer_name = raw.get("user", {}).get("name", "")
-    replied = raw.get("ownerResponse") is not None
-    published_date = raw.get("publishedDate")
-    
-    # Format review text with title only if it exists
-    if review_title:
-        review_text = f"Title: {review_title}\n{review_text}"
-    
-    return {
-        "platform": "TripAdvisor",
-        "review_date": normalize_date(published_date),
-        "reviewer_name": reviewer_name,
-        "star_rating": raw.get("rating"),
-        "review_text": review_text.strip(),
-        "replied": replied
-    }
+@st.cache_resource
+def review_datasets():
+    # One store per server process, so sessions opening the same establishment share its reviews.
+    # Nothing modifies a loaded frame: filters are row slices and derived columns go on new frames.
+    return shared_store.SharedStore()
 
-def normalize_google_review(raw):
-    # Only process reviews that have "Google" as their origin
-    if raw.get("reviewOrigin") != "Google":
-        return None
-        
-    review_title = raw.get("title", "")
-    review_text = raw.get("text") or raw.get("textTranslated") or ""
-    reviewer_name = raw.get("name", "")
-    replied = raw.get("responseFromOwnerText") is not None
-    star_rating = raw.get("stars")  # Use stars field directly
-    published_date = raw.get("publishedAtDate")
-    
-    return {
-        "platform": "Google",
-        "review_date": normalize_date(published_date),
-        "reviewer_name": reviewer_name,
-        "star_rating": star_rating,
-        "review_text": review_text.strip(),  # Remove title/establishment name
-        "replied": replied
-    }
+def release_reviews():
+    """Give back this session's lease on its loaded reviews, if any."""
+    if st.session_state.reviews_lease is not None:
+        st.session_state.reviews_lease.release()
+    st.session_state.reviews_lease = None
+
+@st.cache_resource(max_entries=16)
+def date_index(_df, version):
+    # Built once per dataset; range filters and stats are then O(log n) lookups
+    return ReviewDateIndex(_df)
+
+@st.cache_data(max_entries=16)
+def overall_stats(_filtered_df, version, start_date, end_date):
+    # Reviews posted on several platforms count once
+    unique = dedup.unique_reviews(_filtered_df)
+    return {'avg_rating': unique['star_rating'].mean(), 'count': len(unique),
+            'duplicates': len(_filtered_df) - len(unique)}
+
+@st.cache_data(max_entries=8)
+def review_themes(_filtered_df, version, start_date, end_date):
+    # Clustered locally, without any API call; duplicates would skew theme sizes
+    _, found = themes.find_themes(dedup.unique_reviews(_filtered_df))
+    return found
+
+@st.cache_data(max_entries=8)
+def reviews_csv(_filtered_df, version, start_date, end_date):
+    return _filtered_df.to_csv(index=False)
+
+@st.cache_resource
+def metrics_exporters():
+    # Started once per server process; a no-op unless metrics are enabled
+    metrics.start_exporters()
+
+@st.cache_resource
+def job_runner():
+    # One runner per server process; its jobs outlive the script runs and sessions that start them
+    return jobs.JobRunner()
+
+def plan_load(conn, establishment, inputs, force_refresh, incremental, ttl_hours):
+    """Return `{platform: (url, since)}` of the platforms to scrape (see portfolio.plan_refresh).
+
+    Platforms scraped within their TTL are served from the review store
+    instead; `since` is set for incremental syncs.
+    """
+    planned = portfolio.plan_refresh(conn, {establishment: inputs}, force=force_refresh, incremental=incremental,
+                                     ttl_hours=ttl_hours)
+    return {platform: (url, since) for _, platform, url, since in planned}
 
-def generate_summary(filtered_df, start_date, end_date, api_key):
+def assemble_reviews(establishment, inputs):
+    """Read an establishment's stored reviews; returns `(df, version)`, or None if there are none."""
+    with closing(review_store.connect()) as conn:
+        frames = [review_store.load_platform_reviews(conn, establishment, url) for url in inputs.values() if url]
+    all_reviews = [frame for frame in frames if not frame.empty]
+    if all_reviews:
+        with metrics.timer("reviews_assemble_seconds"):
+            # Convert to the compact typed layout and sort by date
+            df = compact_reviews(pd.concat(all_reviews, ignore_index=True))
+            df = df.sort_values(by='review_date', ascending=False, ignore_index=True)
+            df['duplicate_cluster'] = dedup.duplicate_clusters(df).astype('int32')
+        return df, dataset_version(df)
+    return None
+
+def show_reviews(establishment, inputs, refresh=False):
+    """Lease the establishment's reviews from the shared store into this session; False if there are none."""
+    # Sessions opening the same establishment and URLs share one copy of its reviews
+    key = (establishment, tuple(sorted((name, url) for name, url in inputs.items() if url)))
+    # A copy loaded before the last fetch of any of its URLs (by a job, a portfolio refresh
+    # or ingest.py in another process) is reloaded from the store
+    with closing(review_store.connect()) as conn:
+        fetched = [review_store.last_fetched(conn, establishment, url) for _, url in key[1]]
+    changed_at = max((t for t in fetched if t is not None), default=None)
+    lease = review_datasets().acquire(
+        key, lambda: assemble_reviews(establishment, inputs), changed_at=changed_at, refresh=refresh,
+        on_wait=lambda: st.write(f"Another session is already loading {establishment}; waiting for it..."))
+    if lease is None:
+        return False
+    release_reviews()
+    st.session_state.reviews_lease = lease
+    st.session_state.reviews_df, st.session_state.dataset_version = lease.value
+    st.session_state.reviews_loaded = True
+    return True
+
+def show_job(job_id, establishment, inputs, api_token):
+    """Show an ingestion job's progress; once it has finished, load its reviews and rerun."""
+    with closing(jobs.connect()) as conn:
+        job = jobs.job_status(conn, job_id)
+    if job is None:
+        st.session_state.ingest_job = None
+        return
+    platforms = job['platforms']
+    st.dataframe(platforms[['platform', 'status', 'saved', 'message']], hide_index=True)
+    for row in platforms[platforms['status'] == 'failed'].itertuples():
+        st.error(f"Error fetching {row.platform}: {row.message}")
+        if row.details:
+            st.error(f"Error details: {row.details}")
+    for row in platforms[platforms['status'] != 'failed'].itertuples():
+        if row.details:
+            st.warning(row.details)
+
+    if job['status'] in jobs.ACTIVE:
+        runner = job_runner()
+        if not runner.is_running(job_id):
+            # A job left behind by a restarted server is resumed from its recorded Apify runs
+            if not api_token:
+                st.info(f"Loading {establishment} was interrupted; enter your Apify API token to resume it.")
+                return
+            if not runner.resume(job_id, api_token, job['created_at']):
+                st.session_state.ingest_job = None
+                st.rerun()
+        st.caption(f"Loading {establishment} in the background; it carries on if you leave or reload this page.")
+        time.sleep(1)
+        st.rerun()
+    # Platforms that failed are reported with the loaded reviews, past the rerun that shows them
+    st.session_state.job_errors = platforms[platforms['status'] == 'failed'][
+        ['platform', 'message', 'details']].to_dict('records')
+    # The job has just written new reviews, so any stored copy of the establishment is stale
+    if show_reviews(job['establishment'], inputs, refresh=True):
+        st.session_state.ingest_job = None
+        st.rerun()
+
+def generate_summary(filtered_df, start_date, end_date, api_key, use_cache=True, theme_digest=None):
     if not api_key:
         st.error("Please enter your OpenAI API key.")
         return
     
+    # Clicking anything (e.g. Stop) reruns the script, which interrupts the next
+    # placeholder update; the stream is then closed and nothing is saved
+    st.button("Stop generating", key="stop_summary")
+    status = st.empty()
+    output = st.empty()
     with st.spinner("Generating summary..."):
         try:
-            # Prepare the reviews data for ChatGPT
-            reviews_text = []
-            
-            for _, row in filtered_df.iterrows():
-                # Full review text with clear formatting
-                review_info = f"Date: {row['review_date'].strftime('%Y-%m-%d')}\n"
-                review_info += f"Platform: {row['platform']}\n"
-                review_info += f"Rating: {row['star_rating']} stars\n"
-                review_info += f"Review: {row['review_text']}\n"
-                review_info += f"Replied: {'Yes' if row['replied'] else 'No'}\n"
-                review_info += "---\n"
-                reviews_text.append(review_info)
-            
-            # Combine all reviews into a single text
-            combined_reviews = "\n".join(reviews_text)
-            
-            # Create the prompt for ChatGPT
-            prompt = f"""Analyze these reviews from {start_date} to {end_date} and provide a structured summary with the following sections:
-
-1. Overall Sentiment
-2. Positive Highlights
-3. Areas for Improvement
-4. Actionable Suggestions
-5. Unreplied Reviews (if any)
-
-Reviews to analyze:
-{combined_reviews}
-
-Please provide a professional, concise, and solution-oriented summary that helps managers take efficient actions based on customer feedback insights."""
-
-            # Call ChatGPT API
+            # Large ranges are summarized in parallel batches and then merged
             client = openai.OpenAI(api_key=api_key)
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a professional business analyst specializing in customer feedback analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            # Store the summary in session state
-            st.session_state.summary = response.choices[0].message.content
-            
+            # Each review once, even if it was posted on several platforms
+            unique = dedup.unique_reviews(filtered_df)
+            if theme_digest:
+                # One prompt of theme digests, however many reviews there are
+                summary = summarizer.summarize_themes(client, theme_digest, len(unique), start_date, end_date,
+                                                      use_cache=use_cache,
+                                                      on_text=lambda text: output.markdown(text + " ▌"))
+            else:
+                summary = summarizer.summarize_reviews(client, unique, start_date, end_date,
+                                                       use_cache=use_cache,
+                                                       on_text=lambda text: output.markdown(text + " ▌"),
+                                                       on_progress=status.caption)
         except Exception as e:
             st.error(f"Error generating summary: {str(e)}")
+            return
+    status.empty()
+    output.markdown(summary)
+    st.session_state.summary = summary
 
-def generate_report(filtered_df, start_date, end_date, api_key):
+def generate_report(filtered_df, start_date, end_date, api_key, rescreen=False):
     if not api_key:
         st.error("Please enter your OpenAI API key.")
         return
     
+    # As in generate_summary, any click interrupts screening; finished batches stay stored
+    st.button("Stop screening", key="stop_report")
+    output = st.empty()
     with st.spinner("Analyzing reviews for potential violations..."):
+        # Only reviews without a stored verdict are sent; the report is built from the verdicts
+        client = openai.OpenAI(api_key=api_key)
         try:
-            # Prepare the reviews data for ChatGPT
-            reviews_text = []
-            
-            for _, row in filtered_df.iterrows():
-                # Full review text with clear formatting
-                review_info = f"Date: {row['review_date'].strftime('%Y-%m-%d')}\n"
-                review_info += f"Platform: {row['platform']}\n"
-                review_info += f"Rating: {row['star_rating']} stars\n"
-                review_info += f"Review: {row['review_text']}\n"
-                review_info += f"Replied: {'Yes' if row['replied'] else 'No'}\n"
-                review_info += "---\n"
-                reviews_text.append(review_info)
-            
-            # Combine all reviews into a single text
-            combined_reviews = "\n".join(reviews_text)
-            
-            # Create the prompt for ChatGPT
-            prompt = f"""Analyze these reviews from {start_date} to {end_date} and identify ONLY reviews that have clear, legitimate grounds for removal based on platform policies. For each flagged review, provide:
-
-1. Review Details (date, platform, rating)
-2. Specific Violation(s) Identified
-3. Evidence from the review text
-4. Draft message to the platform requesting removal
-
-IMPORTANT: Only flag reviews that have CLEAR and UNDENIABLE violations. Do not include reviews that are simply negative or critical but legitimate. Focus strictly on identifying:
-
-- Fake or fraudulent reviews (e.g., reviewer never stayed)
-- Reviews from non-guests (e.g., competitors, non-customers)
-- Offensive language or hate speech
-- Personal attacks or threats
-- Confidential information exposure
-- Reviews for wrong business
-- Reviews from canceled bookings/no-shows
-
-Reviews to analyze:
-{combined_reviews}
-
-Please provide a professional, evidence-based analysis that ONLY includes reviews with clear violations of platform policies. If no reviews meet these strict criteria, state that no reviews were found that could be legitimately challenged."""
-
-            # Call ChatGPT API
-            client = openai.OpenAI(api_key=api_key)
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a professional review policy compliance analyst specializing in identifying reviews that violate platform terms and conditions."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            # Store the report in session state
-            st.session_state.report = response.choices[0].message.content
-            
+            verdicts = screening.screen_reviews(
+                client, filtered_df, rescreen=rescreen,
+                on_batch=lambda so_far: output.markdown(screening.build_report(filtered_df, so_far, start_date, end_date)))
+        except screening.ScreeningError as e:
+            st.error(f"Error generating report: {str(e)}")
+            with closing(screening.connect()) as conn:
+                verdicts = screening.load_verdicts(conn, review_store.review_ids(filtered_df))
         except Exception as e:
             st.error(f"Error generating report: {str(e)}")
+            return
+    report = screening.build_report(filtered_df, verdicts, start_date, end_date)
+    output.markdown(report)
+    st.session_state.report = report
+
+metrics_exporters()
+if metrics.ENABLED:
+    with st.sidebar.expander("Metrics (debug)"):
+        # As of this script run; counters and timers cover every session of the server
+        st.dataframe(pd.DataFrame(metrics.registry.snapshot(), columns=["metric", "labels", "count", "total", "max"]),
+                     hide_index=True)
 
 # Main app logic
 if not st.session_state.reviews_loaded:
@@ -338,12 +272,7 @@ if not st.session_state.reviews_loaded:
     with col2:
         st.session_state.openai_api_key = st.text_input("Enter your OpenAI API key", type="password", value=os.getenv("OPENAI_API_KEY", ""))
     
-    platforms = [
-        ("Booking.com", "voyager~booking-reviews-scraper", normalize_booking_review),
-        ("Expedia", "tri_angle~expedia-hotels-com-reviews-scraper", normalize_expedia_review),
-        ("TripAdvisor", "maxcopell~tripadvisor-reviews", normalize_tripadvisor_review),
-        ("Google Maps", "compass~google-maps-reviews-scraper", normalize_google_review),
-    ]
+    platforms = PLATFORMS
 
     # Default URLs
     default_urls = {
@@ -353,60 +282,89 @@ if not st.session_state.reviews_loaded:
         "Google Maps": "https://maps.app.goo.gl/9PKnWdh6gnDcERsY8"
     }
 
+    # Prefer the URLs saved for this establishment on a previous load
+    with closing(review_store.connect()) as conn:
+        saved_urls = review_store.load_establishment(conn, st.session_state.establishment_name) or {}
+
     # Create input fields for each platform
     inputs = {}
     for name, _, _ in platforms:
         inputs[name] = st.text_input(f"Paste the {name} URL", 
-                                   value=default_urls[name],
+                                   value=saved_urls.get(name, default_urls[name]),
                                    help=f"Enter the {name} URL for the establishment")
 
+    with st.expander("Cache settings"):
+        force_refresh = st.checkbox("Ignore cached reviews and re-scrape every platform")
+        incremental = st.checkbox("Incremental sync: only fetch reviews newer than the last stored one", value=True,
+                                  disabled=force_refresh)
+        ttl_hours = {}
+        ttl_cols = st.columns(len(platforms))
+        for ttl_col, (name, _, _) in zip(ttl_cols, platforms):
+            with ttl_col:
+                ttl_hours[name] = st.number_input(f"{name} cache TTL (hours)", min_value=0,
+                                                  value=review_store.DEFAULT_TTL_HOURS[name])
+
+    with st.expander("Portfolio refresh"):
+        # Scrapes every stale platform of many establishments into the store; load any of them above afterwards
+        portfolio_file = st.file_uploader("Establishments file (JSON or CSV)", type=["json", "csv"],
+                                          help="JSON {name: {platform: url}}, or CSV with a name column "
+                                               "and one column per platform. Leave empty to refresh "
+                                               "every saved establishment.")
+        max_runs = st.number_input("Concurrent Apify runs", min_value=1, value=portfolio.MAX_CONCURRENT_RUNS)
+        if st.button("Refresh portfolio", use_container_width=True):
+            if not API_TOKEN:
+                st.error("Please enter your Apify API token.")
+            else:
+                if portfolio_file is not None:
+                    establishments = portfolio.load_portfolio(portfolio_file)
+                else:
+                    with closing(review_store.connect()) as conn:
+                        establishments = portfolio.stored_portfolio(conn)
+                results = []
+                for establishment, name, kind, payload in portfolio.refresh_portfolio(
+                        establishments, API_TOKEN, max_concurrent_runs=max_runs, force=force_refresh,
+                        incremental=incremental, ttl_hours=ttl_hours):
+                    if kind == "progress":
+                        st.write(f"{establishment}: {payload}")
+                    elif kind == "warning":
+                        st.warning(f"{establishment}: {payload}")
+                    elif kind == "saved":
+                        results.append({"establishment": establishment, "platform": name, "reviews saved": payload})
+                        review_datasets().discard(lambda key: key[0] == establishment)
+                    else:
+                        st.error(f"Error fetching {name} for {establishment}: {str(payload)}")
+                        results.append({"establishment": establishment, "platform": name, "error": str(payload)})
+                if results:
+                    st.dataframe(pd.DataFrame(results), hide_index=True)
+                else:
+                    st.write(f"All {len(establishments):,} establishments are up to date.")
+
+    establishment = st.session_state.establishment_name
+    if st.session_state.ingest_job is None:
+        # Pick up a job this establishment already has, e.g. after a page reload; show_job resumes
+        # it if the server was restarted while it ran
+        with closing(jobs.connect()) as conn:
+            active = jobs.active_job(conn, establishment)
+        if active is not None:
+            st.session_state.ingest_job = active[0]
+
+    # While a job runs this polls it and reruns, so the Load button only comes back once it has finished
+    if st.session_state.ingest_job is not None:
+        show_job(st.session_state.ingest_job, establishment, inputs, API_TOKEN)
+
     if st.button("Load Reviews", use_container_width=True):
         if not API_TOKEN:
             st.error("Please enter your Apify API token.")
         elif not st.session_state.openai_api_key:
             st.error("Please enter your OpenAI API key.")
         else:
-            all_reviews = []
-            for name, actor_id, normalize_fn in platforms:
-                public_url = inputs[name]
-                if public_url:
-                    try:
-                        st.write(f"Triggering Apify actor for {name}...")
-                        run_id = trigger_actor(actor_id, API_TOKEN, public_url)
-                        st.write(f"Waiting for {name} run to finish...")
-                        run_data = wait_for_run(run_id, API_TOKEN)
-                        if run_data["data"]["status"] != "SUCCEEDED":
-                            st.error(f"{name} run failed or was aborted.")
-                            if "meta" in run_data["data"]:
-                                st.error(f"Error details: {json.dumps(run_data['data']['meta'], indent=2)}")
-                            continue
-                        dataset_id = run_data["data"]["defaultDatasetId"]
-                        st.write(f"Fetching reviews for {name}...")
-                        reviews = fetch_reviews(dataset_id, API_TOKEN)
-                        if not reviews:
-                            st.warning(f"No reviews found for {name}. This might indicate an issue with the URL or scraper.")
-                        normalized = [r for r in [normalize_fn(r) for r in reviews] if r is not None]
-                        all_reviews.extend(normalized)
-                    except Exception as e:
-                        st.error(f"Error fetching {name}: {str(e)}")
-                        if hasattr(e, 'response'):
-                            try:
-                                error_details = e.response.json()
-                                st.error(f"Error details: {json.dumps(error_details, indent=2)}")
-                            except:
-                                st.error(f"Error response: {e.response.text}")
-                        else:
-                            st.error(f"Error details: {str(e)}")
-
-            if all_reviews:
-                # Convert to DataFrame and sort by date
-                df = pd.DataFrame(all_reviews)
-                df['review_date'] = pd.to_datetime(df['review_date'], errors='coerce')
-                df = df.sort_values(by='review_date', ascending=False)
-                
-                # Store in session state
-                st.session_state.reviews_df = df
-                st.session_state.reviews_loaded = True
+            with closing(jobs.connect()) as conn:
+                review_store.save_establishment(conn, establishment, inputs)
+                plan = plan_load(conn, establishment, inputs, force_refresh, incremental, ttl_hours)
+                if plan:
+                    # Scraping runs on the server's job runner, not in this script run
+                    st.session_state.ingest_job = job_runner().start(conn, establishment, plan, API_TOKEN)
+            if plan or show_reviews(establishment, inputs):
                 st.rerun()
 
 else:
@@ -421,6 +379,12 @@ else:
     
     # Display the main header with establishment name
     st.title(f"{st.session_state.establishment_name} Reviews")
+
+    # Failures of the job that loaded these reviews; the other platforms' reviews are shown
+    for error in st.session_state.job_errors:
+        st.error(f"Error fetching {error['platform']}: {error['message']}")
+        if error['details']:
+            st.error(f"Error details: {error['details']}")
     
     # Date range filter
     col1, col2 = st.columns(2)
@@ -430,26 +394,25 @@ else:
         st.session_state.end_date = st.date_input("End Date", value=st.session_state.end_date)
     
     # Filter reviews based on date range
-    mask = (df['review_date'].dt.date >= st.session_state.start_date) & (df['review_date'].dt.date <= st.session_state.end_date)
-    filtered_df = df.loc[mask]
+    if st.session_state.dataset_version is None:
+        st.session_state.dataset_version = dataset_version(df)
+    view_key = (st.session_state.dataset_version, st.session_state.start_date, st.session_state.end_date)
+    index = date_index(df, st.session_state.dataset_version)
+    filtered_df = index.slice(st.session_state.start_date, st.session_state.end_date)
     st.session_state.filtered_df = filtered_df
 
     # Calculate and display platform statistics
     st.subheader("Review Statistics")
     
-    # Get unique platforms in the filtered data
-    platforms = filtered_df['platform'].unique()
+    stats = index.platform_stats(st.session_state.start_date, st.session_state.end_date)
     
     # Create columns for the statistics
-    cols = st.columns(len(platforms) + 1)  # +1 for overall stats
+    cols = st.columns(len(stats) + 1)  # +1 for overall stats
     
-    # Calculate and display stats for each platform
-    platform_stats = {}
-    for i, platform in enumerate(platforms):
-        platform_df = filtered_df[filtered_df['platform'] == platform]
-        avg_rating = platform_df['star_rating'].mean()
-        review_count = len(platform_df)
-        platform_stats[platform] = {'avg_rating': avg_rating, 'count': review_count}
+    # Display stats for each platform
+    for i, (platform, stat) in enumerate(stats.items()):
+        avg_rating = stat['avg_rating']
+        review_count = stat['count']
         
         # Display platform stats with custom styling
         with cols[i]:
@@ -458,46 +421,76 @@ else:
             st.markdown(f"<p style='color: #666; margin: 0;'>{review_count:,} Reviews</p>", unsafe_allow_html=True)
     
     # Calculate and display overall stats
-    if platform_stats:
-        overall_avg = sum(stat['avg_rating'] * stat['count'] for stat in platform_stats.values()) / sum(stat['count'] for stat in platform_stats.values())
-        total_reviews = sum(stat['count'] for stat in platform_stats.values())
+    if stats:
+        overall = overall_stats(filtered_df, *view_key)
+        overall_avg = overall['avg_rating']
+        total_reviews = overall['count']
         
         # Display overall stats with custom styling
         with cols[-1]:
             st.markdown("### Overall")
             st.markdown(f"<h2 style='margin: 0;'>{overall_avg:.1f} ⭐</h2>", unsafe_allow_html=True)
             st.markdown(f"<p style='color: #666; margin: 0;'>{total_reviews:,} Reviews</p>", unsafe_allow_html=True)
+            if overall['duplicates']:
+                st.caption(f"{overall['duplicates']:,} cross-posted duplicates counted once")
     
     # Add a divider for visual separation
     st.divider()
     
-    # Action buttons in a row
+    # Summaries and reports for the same reviews are served from the on-disk cache
+    regenerate = st.checkbox("Regenerate instead of reusing cached summaries and review verdicts")
+    from_themes = st.checkbox("Summarize from theme digests instead of every review",
+                              help="Sends the themes below with a few quotes each, so the prompt "
+                                   "doesn't grow with the number of reviews")
+
+    # Action buttons in a row; their output streams into the sections below the table
     col1, col2, col3 = st.columns(3)
     with col1:
-        # Check date range only when generating summary
-        date_range = st.session_state.end_date - st.session_state.start_date
-        if date_range.days > 365:
-            st.warning("Summary generation is limited to 1 year of reviews. Please adjust the date range to generate a summary.")
-        if st.button("Generate Summary", use_container_width=True, disabled=date_range.days > 365):
-            generate_summary(filtered_df, st.session_state.start_date, st.session_state.end_date, st.session_state.openai_api_key)
+        summary_clicked = st.button("Generate Summary", use_container_width=True, disabled=filtered_df.empty)
     with col2:
-        if st.button("Report Review", use_container_width=True, disabled=date_range.days > 365):
-            generate_report(filtered_df, st.session_state.start_date, st.session_state.end_date, st.session_state.openai_api_key)
+        report_clicked = st.button("Report Review", use_container_width=True, disabled=filtered_df.empty)
     with col3:
-        csv = filtered_df.to_csv(index=False)
-        st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name="reviews.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
+        # The CSV is only built once asked for, then kept for this range
+        if st.session_state.csv_requested != view_key:
+            if st.button("Download CSV", use_container_width=True, disabled=filtered_df.empty):
+                st.session_state.csv_requested = view_key
+                st.rerun()
+        else:
+            st.download_button(
+                label="Save reviews.csv",
+                data=reviews_csv(filtered_df, *view_key),
+                file_name="reviews.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
     
     # Display the filtered reviews
     st.subheader("Review Table")
+
+    # Keyword search over the stored reviews, within the date range and chosen platforms
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        search = st.text_input("Search reviews", placeholder='e.g. parking, "front desk", breakfast OR coffee')
+    with col2:
+        all_platforms = list(stats)
+        table_platforms = st.multiselect("Platforms", all_platforms, default=all_platforms)
+    with col3:
+        everywhere = st.checkbox("All establishments", disabled=not search)
+    if search:
+        with closing(review_store.connect()) as conn:
+            table_df = review_store.search_reviews(
+                conn, search, establishment=None if everywhere else st.session_state.establishment_name,
+                start_date=st.session_state.start_date, end_date=st.session_state.end_date,
+                platforms=table_platforms)
+        table_df = table_df.drop(columns="rank" if everywhere else ["rank", "establishment"])
+        st.caption(f"{len(table_df):,} matching reviews, best match first")
+    elif len(table_platforms) < len(all_platforms):
+        table_df = filtered_df[filtered_df["platform"].isin(table_platforms)]
+    else:
+        table_df = filtered_df
     
     st.dataframe(
-        filtered_df,
+        table_df,
         hide_index=True,
         column_config={
             "review_text": st.column_config.TextColumn(
@@ -529,23 +522,57 @@ else:
         use_container_width=True,
     )
     
-    # Display summary if available
-    if st.session_state.summary:
+    # Themes of the reviews in range
+    found_themes = review_themes(filtered_df, *view_key)
+    if not found_themes.empty:
+        st.subheader("Themes")
+        st.dataframe(
+            found_themes.assign(terms=found_themes["terms"].str.join(", "),
+                                quote=found_themes["quotes"].str[0])[
+                ["terms", "reviews", "avg_rating", "trend", "unreplied", "quote"]],
+            hide_index=True,
+            column_config={
+                "terms": st.column_config.TextColumn("Theme", width="medium"),
+                "reviews": st.column_config.NumberColumn("Reviews"),
+                "avg_rating": st.column_config.NumberColumn("Rating", format="%.1f ⭐"),
+                "trend": st.column_config.NumberColumn("Trend", format="%+.2f ⭐/month",
+                                                       help="Change in average rating per month"),
+                "unreplied": st.column_config.NumberColumn("Unreplied"),
+                "quote": st.column_config.TextColumn("Representative review", width="large"),
+            },
+            use_container_width=True,
+        )
+
+    # Display summary if available, or stream in the one being generated
+    if summary_clicked:
+        st.markdown("### 📊 Summary")
+        generate_summary(filtered_df, st.session_state.start_date, st.session_state.end_date, st.session_state.openai_api_key,
+                         use_cache=not regenerate,
+                         theme_digest=themes.theme_digest(found_themes) if from_themes and not found_themes.empty else None)
+    elif st.session_state.summary:
         st.markdown("### 📊 Summary")
         st.markdown(st.session_state.summary)
     
-    # Display report if available
-    if st.session_state.report:
+    # Display report if available, or fill in the one being screened
+    if report_clicked:
+        st.markdown("### ⚠️ Review Violation Report")
+        generate_report(filtered_df, st.session_state.start_date, st.session_state.end_date, st.session_state.openai_api_key,
+                        rescreen=regenerate)
+    elif st.session_state.report:
         st.markdown("### ⚠️ Review Violation Report")
         st.markdown(st.session_state.report)
 
     # Add reset button at the bottom
     if st.button("Reset and Load New Reviews", use_container_width=True):
         st.session_state.reviews_loaded = False
+        release_reviews()
         st.session_state.reviews_df = None
         st.session_state.summary = None
         st.session_state.report = None
         st.session_state.filtered_df = None
+        st.session_state.dataset_version = None
+        st.session_state.csv_requested = None
+        st.session_state.job_errors = []
         st.session_state.start_date = None
         st.session_state.end_date = None
         st.session_state.establishment_name = None
@@ -0,0 +1,42 @@
+"""Row-by-row vs batch normalization of synthetic Apify items.
+
+    python -m benchmarks.bench_normalization [--rows 2300] [--repeat 3]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import raw_items
+from ingestion import BATCH_NORMALIZERS, PLATFORMS, REVIEW_COLUMNS
+
+
+def row_normalize(normalize_fn, items):
+    normalized = [r for r in [normalize_fn(r) for r in items] if r is not None]
+    return pd.DataFrame(normalized, columns=REVIEW_COLUMNS)
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=None, help="items per platform (default: bundled count)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'platform':<12} {'rows':>7} {'row (s)':>9} {'batch (s)':>10} {'speedup':>8}")
+    for name, _, normalize_fn in PLATFORMS:
+        items = raw_items(name, args.rows)
+        row_time, expected = best_of(args.repeat, row_normalize, normalize_fn, items)
+        batch_time, actual = best_of(args.repeat, BATCH_NORMALIZERS[normalize_fn], items)
+        pd.testing.assert_frame_equal(actual, expected)
+        print(f"{name:<12} {len(items):>7,} {row_time:>9.3f} {batch_time:>10.3f} {row_time / batch_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Time, throughput and peak memory of each pipeline stage at several dataset sizes.
+
+    python -m benchmarks.bench_pipeline [--sizes 1000,10000,100000,1000000] [--repeat 3]
+                                        [--output FILE] [--compare OLD_FILE]
+
+Each size is split evenly over the platforms and generated from the bundled
+reviews (see synthetic.py). Stages run as the app runs them: ingestion pages
+items from a local stub Apify server, then the loaded reviews are normalized,
+indexed, filtered to the newest year, summarized per platform, deduplicated,
+formatted into prompt batches and a screening report, and written as CSV.
+The stages after the filter work on the filtered rows, as in the app.
+
+A stage's time is the best of `--repeat` runs; its peak memory is measured
+with tracemalloc in one extra run, so tracing never slows the timed runs.
+Results are written as JSON (by default to benchmarks/results/) and, with
+`--compare`, each stage is shown against an earlier results file.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import dedup
+import ingestion
+import review_store
+import screening
+import summarizer
+from apify_stub import StubApifyServer
+from benchmarks.bench_normalization import best_of
+from benchmarks.synthetic import ROOT, raw_items
+from review_index import ReviewDateIndex
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Share of screened reviews flagged in the report stage
+FLAGGED_SHARE = 0.01
+
+
+def peak_memory(fn, *args):
+    """Peak bytes allocated while `fn(*args)` runs, above what was allocated before."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+def ingest(base_url):
+    """Run every platform through ingest_platforms against the stub server at `base_url`; returns the frames."""
+    urls = {name: f"https://example.com/{name}" for name, _, _ in ingestion.PLATFORMS}
+    base = ingestion.API_BASE
+    ingestion.API_BASE = base_url
+    try:
+        events = list(ingestion.ingest_platforms(ingestion.PLATFORMS, urls, "benchmark"))
+    finally:
+        ingestion.API_BASE = base
+    errors = [payload for _, kind, payload in events if kind == "error"]
+    if errors:
+        raise errors[0]
+    return [payload for _, kind, payload in events if kind == "done"]
+
+def normalize(items_by_platform):
+    """Normalize every platform's items and sort them as the loader does."""
+    frames = [ingestion.normalize_reviews(normalize_fn, items_by_platform[name])
+              for name, _, normalize_fn in ingestion.PLATFORMS]
+    df = pd.concat(frames, ignore_index=True)
+    df["review_date"] = pd.to_datetime(df["review_date"])
+    return df.sort_values("review_date", ascending=False, ignore_index=True)
+
+def synthetic_verdicts(df):
+    ids = review_store.review_ids(df)
+    flagged = np.random.default_rng(0).random(len(ids)) < FLAGGED_SHARE
+    return {review_id: {"flagged": bool(f), "violations": ["Off-topic"] if f else [],
+                        "evidence": "text" if f else "", "removal_request": "Please remove." if f else ""}
+            for review_id, f in zip(ids, flagged)}
+
+def run_size(n, repeat, skip):
+    """Results for one dataset size, one dict per stage."""
+    per_platform = max(n // len(ingestion.PLATFORMS), 1)
+    items = {name: raw_items(name, per_platform) for name, _, _ in ingestion.PLATFORMS}
+    rows = per_platform * len(ingestion.PLATFORMS)
+    results = []
+
+    def stage(name, stage_rows, fn, *args):
+        if name in skip:
+            return None
+        seconds, result = best_of(repeat, fn, *args)
+        peak = peak_memory(fn, *args)
+        results.append({"size": rows, "stage": name, "rows": stage_rows, "seconds": seconds,
+                        "rows_per_sec": stage_rows / seconds if seconds else None, "peak_mb": peak / 1e6})
+        print(f"{rows:>10,} {name:<16} {stage_rows:>10,} {seconds:>9.3f} "
+              f"{results[-1]['rows_per_sec'] or 0:>14,.0f} {peak / 1e6:>10.1f}")
+        return result
+
+    if "ingest" not in skip:
+        with StubApifyServer({actor_id: items[name] for name, actor_id, _ in ingestion.PLATFORMS}) as server:
+            stage("ingest", rows, ingest, server.base_url)
+    df = stage("normalize", rows, normalize, items)
+    if df is None:
+        df = normalize(items)
+    # The raw items are done with; at 1M rows they are over a gigabyte
+    del items
+    index = stage("index", rows, ReviewDateIndex, df) or ReviewDateIndex(df)
+    newest = df["review_date"].max()
+    start, end = newest - pd.Timedelta(days=365), newest
+    filtered = index.slice(start, end)
+    stage("filter", rows, index.slice, start, end)
+    stage("platform_stats", rows, index.platform_stats, start, end)
+    stage("dedup", len(filtered), dedup.duplicate_clusters, filtered)
+    stage("prompt_batches", len(filtered), summarizer.batch_reviews, filtered)
+    if "report" not in skip:
+        verdicts = synthetic_verdicts(filtered)
+        stage("report", len(filtered), screening.build_report, filtered, verdicts, start.date(), end.date())
+    stage("to_csv", len(filtered), lambda: filtered.to_csv(index=False))
+    return results
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "processor": platform.processor() or None}
+
+def compare(results, old_path):
+    with open(old_path) as f:
+        old = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {old_path}:")
+    print(f"{'size':>10} {'stage':<16} {'old (s)':>9} {'new (s)':>9} {'change':>8} {'old MB':>8} {'new MB':>8}")
+    for r in results:
+        before = old.get((r["size"], r["stage"]))
+        if before is None:
+            continue
+        change = r["seconds"] / before["seconds"] - 1 if before["seconds"] else float("nan")
+        print(f"{r['size']:>10,} {r['stage']:<16} {before['seconds']:>9.3f} {r['seconds']:>9.3f} "
+              f"{change:>+8.0%} {before['peak_mb']:>8.1f} {r['peak_mb']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES),
+                        help="comma-separated total review counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip", action="append", default=[], metavar="STAGE", help="stage to leave out")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", metavar="OLD_FILE", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    meta = metadata()
+    print(f"{'size':>10} {'stage':<16} {'rows':>10} {'time (s)':>9} {'rows/s':>14} {'peak MB':>10}")
+    results = []
+    for n in (int(s) for s in args.sizes.split(",")):
+        results += run_size(n, args.repeat, set(args.skip))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{meta['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nSaved results to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Indented JSON files vs Parquet snapshots: size and load time.
+
+    python -m benchmarks.bench_snapshots [--rows 50000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+import pandas as pd
+
+import snapshots
+from benchmarks.bench_normalization import best_of
+from benchmarks.synthetic import load_templates
+from ingestion import REVIEW_COLUMNS
+
+
+def load_json(path):
+    with open(path) as f:
+        df = pd.DataFrame(json.load(f), columns=REVIEW_COLUMNS)
+    df["review_date"] = pd.to_datetime(df["review_date"], errors="coerce")
+    return df.sort_values("review_date", ascending=False, ignore_index=True)
+
+def synthetic_reviews(platform, n, seed=0):
+    """`n` bundled reviews with their words shuffled, so repeats don't flatter compression."""
+    rng = random.Random(seed)
+    templates = load_templates(platform)
+    rows = []
+    for i in range(n):
+        review = dict(templates[i % len(templates)])
+        words = (review["review_text"] or "").split(" ")
+        rng.shuffle(words)
+        review["review_text"] = " ".join(words)
+        rows.append(review)
+    return pd.DataFrame(rows, columns=REVIEW_COLUMNS)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000, help="reviews per platform")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'platform':<12} {'rows':>7} {'json MB':>8} {'parquet MB':>11} {'json (s)':>9} "
+          f"{'parquet (s)':>12} {'1 month, 2 cols (s)':>20}")
+    with tempfile.TemporaryDirectory() as root:
+        for name in ["Booking.com", "Expedia", "TripAdvisor", "Google Maps"]:
+            df = synthetic_reviews(name, args.rows)
+            json_path = os.path.join(root, f"{name}.json")
+            with open(json_path, "w") as f:
+                json.dump(df.to_dict("records"), f, indent=2)
+            snapshots.write_snapshot(df, "Benchmark Hotel", root=os.path.join(root, "snapshots"))
+            platform = df["platform"].iloc[0]
+            parquet_dir = os.path.join(root, "snapshots", "establishment=Benchmark%20Hotel", f"platform={platform}")
+            parquet_size = sum(os.path.getsize(os.path.join(parquet_dir, f)) for f in os.listdir(parquet_dir))
+
+            json_time, _ = best_of(args.repeat, load_json, json_path)
+            parquet_time, _ = best_of(args.repeat, snapshots.load_snapshots, os.path.join(root, "snapshots"),
+                                      "Benchmark Hotel", [platform])
+            newest = pd.to_datetime(df["review_date"]).max()
+            pushdown_time, _ = best_of(args.repeat, lambda: snapshots.load_snapshots(
+                os.path.join(root, "snapshots"), "Benchmark Hotel", [platform],
+                start_date=newest - pd.Timedelta(days=30), end_date=newest, columns=["review_date", "star_rating"]))
+            print(f"{name:<12} {len(df):>7,} {os.path.getsize(json_path) / 1e6:>8.1f} {parquet_size / 1e6:>11.1f} "
+                  f"{json_time:>9.3f} {parquet_time:>12.3f} {pushdown_time:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
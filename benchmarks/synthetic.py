@@ -0,0 +1,95 @@
+"""Synthetic Apify items built from the bundled *_reviews_normalized.json files.
+
+The bundled files are already normalized, so each review is turned back into
+the raw shape its actor returns. Dates use the layout each actor emits, with
+a sprinkling of the other layouts normalize_date accepts.
+"""
+import json
+import os
+import random
+import re
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEMPLATE_FILES = {
+    "Booking.com": "booking_reviews_normalized.json",
+    "Expedia": "expedia_reviews_normalized.json",
+    "TripAdvisor": "tripadvisor_reviews_normalized.json",
+    "Google Maps": "google_reviews_normalized.json",
+}
+
+TITLE_RE = re.compile(r"^=== ?(.*?) ?===\n?")
+
+
+def load_templates(platform):
+    """The bundled normalized reviews for a platform."""
+    with open(os.path.join(ROOT, TEMPLATE_FILES[platform])) as f:
+        return json.load(f)
+
+def _split_title(text):
+    match = TITLE_RE.match(text or "")
+    if not match:
+        return "", text or ""
+    return match.group(1).strip(), text[match.end():]
+
+def _date(review, rng, layouts):
+    date = pd.Timestamp(review["review_date"]) + pd.Timedelta(seconds=rng.randrange(86400))
+    fmt = layouts[0] if rng.random() < 0.95 else rng.choice(layouts[1:])
+    value = date.strftime(fmt)
+    if "%f" in fmt:
+        value = value[:-4] + "Z"  # milliseconds, like the actors
+    return value
+
+def to_raw(platform, review, rng):
+    """Turn one normalized review back into a raw item for `platform`."""
+    title, body = _split_title(review["review_text"])
+    response = "Thank you for your review!" if review["replied"] else None
+    rating = review["star_rating"]
+    if platform == "Booking.com":
+        liked, _, disliked = body.partition("\nDisliked: ")
+        return {
+            "userName": review["reviewer_name"],
+            "rating": None if rating is None else rating * 2,
+            "reviewTitle": title or None,
+            "likedText": liked.replace("Liked: ", "", 1) or None,
+            "dislikedText": disliked or None,
+            "reviewDate": _date(review, rng, ["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S.%fZ"]),
+            "propertyResponse": response,
+        }
+    if platform == "Expedia":
+        return {
+            "reviewScoreWithDescription": {"label": f"{rating * 2:g} out of 10 Excellent"},
+            "title": title,
+            "text": body,
+            "reviewAuthorAttribution": {"text": review["reviewer_name"]},
+            "managementResponses": [{"response": response}] if response else [],
+            "submissionTime": {"longDateFormat": _date(review, rng, ["%b %d, %Y", "%d %b %Y"])},
+        }
+    if platform == "TripAdvisor":
+        return {
+            "title": title,
+            "text": body,
+            "rating": rating,
+            "user": {"name": review["reviewer_name"]},
+            "ownerResponse": {"text": response} if response else None,
+            "publishedDate": _date(review, rng, ["%Y-%m-%d", "%d %b %Y"]),
+        }
+    return {
+        "name": review["reviewer_name"],
+        "title": title,
+        "text": body or None,
+        "textTranslated": None,
+        "stars": rating,
+        "reviewOrigin": "Google" if rng.random() < 0.9 else "Tripadvisor",
+        "responseFromOwnerText": response,
+        "publishedAtDate": _date(review, rng, ["%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"]),
+    }
+
+def raw_items(platform, n=None, seed=0):
+    """`n` raw items for a platform (default: one per bundled review)."""
+    rng = random.Random(seed)
+    templates = load_templates(platform)
+    n = len(templates) if n is None else n
+    return [to_raw(platform, templates[i % len(templates)], rng) for i in range(n)]
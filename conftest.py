@@ -0,0 +1,40 @@
+import time
+
+import pytest
+
+import ingestion
+
+
+class FakeApify:
+    """Stands in for the Apify calls ingestion makes, so tests run offline.
+
+    Each run's ID and dataset ID are the actor ID it was started for.
+    """
+
+    def __init__(self):
+        self.items = {}       # dataset ID -> raw items
+        self.delays = {}      # run ID -> seconds the run takes
+        self.failed = set()   # run IDs that end FAILED
+        self.triggered = []   # (actor ID, since) of every run started
+        self.pages = []       # (dataset ID, offset, limit, fields) of every page requested
+
+    def trigger_actor(self, actor_id, api_token, start_url, since=None):
+        self.triggered.append((actor_id, since))
+        return actor_id
+
+    def wait_for_run(self, run_id, api_token, *args, **kwargs):
+        time.sleep(self.delays.get(run_id, 0))
+        status = "FAILED" if run_id in self.failed else "SUCCEEDED"
+        return {"data": {"status": status, "defaultDatasetId": run_id}}
+
+    def fetch_dataset_page(self, dataset_id, api_token, offset, limit, fields=None):
+        self.pages.append((dataset_id, offset, limit, fields))
+        return self.items.get(dataset_id, [])[offset:offset + limit]
+
+
+@pytest.fixture
+def fake_apify(monkeypatch):
+    fake = FakeApify()
+    for name in ("trigger_actor", "wait_for_run", "fetch_dataset_page"):
+        monkeypatch.setattr(ingestion, name, getattr(fake, name))
+    return fake
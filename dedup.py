@@ -0,0 +1,154 @@
+"""Near-duplicate detection across platforms with MinHash and LSH.
+
+Guests often post the same review on several platforms. Each review's text
+is reduced to word shingles and a MinHash signature; locality-sensitive
+hashing over signature bands finds candidate pairs without comparing every
+review with every other, and candidates are confirmed on estimated text
+similarity, review date and reviewer name. Confirmed pairs are merged into
+clusters.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Words per shingle
+SHINGLE_WORDS = 3
+# Signature length, as BANDS bands of ROWS_PER_BAND rows; candidates share a whole band.
+# 16 x 4 makes pairs with a Jaccard similarity around 0.5 and up likely candidates.
+BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERM = BANDS * ROWS_PER_BAND
+# Estimated Jaccard similarity a pair needs: on text alone, or with matching reviewer names
+TEXT_THRESHOLD = 0.7
+NAMED_THRESHOLD = 0.5
+# Reviews shorter than this (after normalization) are too generic to match
+MIN_TEXT_CHARS = 40
+# Copies are posted around the same time
+MAX_DAYS_APART = 30
+# Texts shingled at once while computing signatures
+CHUNK_TEXTS = 20000
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+# Section labels the normalizers add, which differ between platforms
+_LABELS = re.compile(r"^\s*(title|liked|disliked):", re.IGNORECASE | re.MULTILINE)
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_text(text):
+    """Lowercased words of a review, without the platform-specific section labels."""
+    if not isinstance(text, str):
+        return ""
+    return _NON_WORD.sub(" ", _LABELS.sub(" ", text).lower()).strip()
+
+def shingle_hashes(texts, vocabulary=None):
+    """31-bit hashes of the overlapping SHINGLE_WORDS-word shingles of each normalized text.
+
+    Returns `(hashes, starts)`: the hashes of all texts back to back and the
+    offset where each text's run begins. Words are numbered once across all
+    texts and shingles hashed from those numbers with NumPy. Every text
+    needs at least one word; shorter texts than a shingle get one shingle.
+    Pass the same `vocabulary` dict to hash several batches of texts alike.
+    """
+    vocabulary = {} if vocabulary is None else vocabulary
+    words = [text.split() for text in texts]
+    lengths = np.array([len(w) for w in words], dtype=np.int64)
+    local, uniques = pd.factorize(pd.Series([w for ws in words for w in ws], dtype=object))
+    del words
+    numbers = np.array([vocabulary.setdefault(w, len(vocabulary) + 1) for w in uniques], dtype=np.uint64)
+    codes = numbers[local] if len(local) else np.empty(0, dtype=np.uint64)
+    word_starts = np.cumsum(lengths) - lengths
+    counts = np.maximum(1, lengths - SHINGLE_WORDS + 1)
+    starts = np.cumsum(counts) - counts
+    owner = np.repeat(np.arange(len(texts)), counts)
+    position = np.arange(counts.sum()) - starts[owner]
+    hashes = np.zeros(len(owner), dtype=np.uint64)
+    for j in range(SHINGLE_WORDS):
+        word = codes[word_starts[owner] + np.minimum(position + j, lengths[owner] - 1)]
+        hashes = (hashes * np.uint64(1000003) + word) % np.uint64(_PRIME)
+    return hashes, starts
+
+def minhash_signatures(hashes, starts):
+    """(len(starts), NUM_PERM) MinHash signatures of the hash runs from shingle_hashes()."""
+    signatures = np.empty((len(starts), NUM_PERM), dtype=np.uint64)
+    if not len(starts):
+        return signatures
+    # One permutation at a time keeps memory at one vector over all shingles
+    for p in range(NUM_PERM):
+        signatures[:, p] = np.minimum.reduceat((_A[p] * hashes + _B[p]) % np.uint64(_PRIME), starts)
+    return signatures
+
+
+class _DisjointSet:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+
+def _first_name(name):
+    words = normalize_text(name).split()
+    return words[0] if words else ""
+
+def duplicate_clusters(df):
+    """Cluster label per row of `df`: rows holding the same review share a label.
+
+    The label is the position of the cluster's first row, so unique reviews
+    are labelled with their own position.
+    """
+    texts = [normalize_text(t) for t in df["review_text"]]
+    candidates = [i for i, text in enumerate(texts) if len(text) >= MIN_TEXT_CHARS]
+    # Signatures in chunks, so the shingles of only one chunk are in memory at a time
+    vocabulary = {}
+    signatures = [minhash_signatures(*shingle_hashes([texts[i] for i in candidates[start:start + CHUNK_TEXTS]],
+                                                     vocabulary))
+                  for start in range(0, len(candidates), CHUNK_TEXTS)]
+    signatures = np.concatenate(signatures) if signatures else np.empty((0, NUM_PERM), dtype=np.uint64)
+    dates = pd.to_datetime(df["review_date"], errors="coerce").to_numpy("datetime64[D]")[candidates]
+    names = np.array([_first_name(n) for n in df["reviewer_name"]], dtype=object)[candidates]
+
+    # Candidate pairs: within each band, every review paired with the first review sharing its key
+    # (rather than with every such review, so large buckets stay linear)
+    n = len(candidates)
+    pair_keys = []
+    for band in range(BANDS):
+        # Fold the band's rows into one 64-bit key; a rare collision only adds a candidate
+        key = np.zeros(n, dtype=np.uint64)
+        for row in signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].T:
+            key = key * np.uint64(0x9E3779B1) + row
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        first = first[inverse]
+        paired = np.flatnonzero(first != np.arange(n))
+        pair_keys.append(first[paired] * n + paired)
+    pair_keys = np.unique(np.concatenate(pair_keys)) if pair_keys else np.empty(0, dtype=np.int64)
+    a, b = pair_keys // max(n, 1), pair_keys % max(n, 1)
+
+    similarity = (signatures[a] == signatures[b]).mean(axis=1)
+    same_name = (names[a] == names[b]) & (names[a] != "")
+    apart = np.abs((dates[a] - dates[b]).astype("timedelta64[D]").astype(np.int64))
+    close = np.isnat(dates[a]) | np.isnat(dates[b]) | (apart <= MAX_DAYS_APART)
+    confirmed = close & (similarity >= np.where(same_name, NAMED_THRESHOLD, TEXT_THRESHOLD))
+
+    clusters = _DisjointSet(len(df))
+    for i, j in zip(a[confirmed], b[confirmed]):
+        clusters.union(candidates[i], candidates[j])
+    return np.array([clusters.find(i) for i in range(len(df))], dtype=np.int64)
+
+def unique_reviews(df):
+    """One row per duplicate cluster (the first), for prompts that should see each review once."""
+    if "duplicate_cluster" not in df:
+        return df
+    return df[~df["duplicate_cluster"].duplicated()]
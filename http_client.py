@@ -0,0 +1,148 @@
+"""Shared HTTP client for the Apify API.
+
+All Apify requests go through one pooled `requests.Session`, so connections
+are kept alive across polls, pages and platforms. Transient failures (429,
+5xx, dropped connections) are retried with jittered exponential backoff,
+honouring Retry-After when the server sends one, and a token bucket shared
+by every thread caps the request rate across concurrent platform and
+establishment fetches.
+
+POSTs are not idempotent (a retried run start could start a second run), so
+they are only retried when the server certainly did not act on them: a 429,
+or a connection that was never established.
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+
+import requests
+import urllib3
+
+import metrics
+
+# Requests per second across all threads, and the burst allowed above it
+RATE_LIMIT = float(os.getenv("APIFY_RATE_LIMIT", "30"))
+RATE_BURST = 30
+# Retries after the first attempt; backoff before retry n is up to BACKOFF_BASE * 2**n seconds
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+# Seconds to wait for a response when the caller gives no timeout
+DEFAULT_TIMEOUT = 60
+# Pooled connections per host; enough for every platform worker of a portfolio refresh
+POOL_SIZE = 32
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `acquire()` blocks until a token is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def retry_after(response):
+    """Seconds the server asked us to wait (Retry-After as seconds or an HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class HttpClient:
+    """Pooled session with retries, backoff and a shared rate limit."""
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX, pool_size=POOL_SIZE):
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff(self, attempt):
+        """Full-jitter delay before retry `attempt` (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, url, **kwargs):
+        """Send a request, retrying transient failures; returns the last response.
+
+        The caller still calls `raise_for_status()`, so a response that is
+        an error after every retry surfaces as before.
+        """
+        method = method.upper()
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout) or _never_connected(e)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                delay = retry_after(response)
+                delay = self.backoff(attempt) if delay is None else min(delay, self.backoff_max)
+                response.close()
+            metrics.inc("apify_http_retries_total", method=method)
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+def _never_connected(error):
+    # urllib3 wraps refused or unresolvable connections in NewConnectionError
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+# One client, and so one connection pool and rate limit, for the whole process
+_client = HttpClient()
+
+def get(url, **kwargs):
+    return _client.get(url, **kwargs)
+
+def post(url, **kwargs):
+    return _client.post(url, **kwargs)
@@ -0,0 +1,97 @@
+"""Headless ingestion: scrape establishments into the review store without Streamlit.
+
+    python ingest.py                                  # every saved establishment
+    python ingest.py --portfolio portfolio.csv        # establishments from a file
+    python ingest.py --establishment "Stanwell House" --url "TripAdvisor=https://..."
+
+Suitable for cron. Only the ingestion pipeline and the review store are
+imported (no Streamlit or OpenAI), and only after the arguments are parsed.
+Exits with status 1 if any platform failed.
+"""
+import argparse
+import os
+import sys
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape review platforms into the review store.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--establishment", help="Refresh one establishment (its saved URLs unless --url is given)")
+    source.add_argument("--portfolio", help="JSON or CSV file of establishments and their platform URLs")
+    parser.add_argument("--url", action="append", default=[], metavar="PLATFORM=URL",
+                        help="Platform URL for --establishment, e.g. 'Google Maps=https://...'; repeatable")
+    parser.add_argument("--token", default=os.getenv("APIFY_API_TOKEN"),
+                        help="Apify API token (default: $APIFY_API_TOKEN)")
+    parser.add_argument("--db", help="Review store path (default: $REVIEWS_DB_PATH or reviews.db)")
+    parser.add_argument("--force", action="store_true", help="Re-scrape platforms that are still within their TTL")
+    parser.add_argument("--full", action="store_true", help="Fetch all reviews instead of only new ones")
+    parser.add_argument("--max-runs", type=int, default=None, help="Concurrent Apify runs")
+    args = parser.parse_args(argv)
+    if args.url and not args.establishment:
+        parser.error("--url needs --establishment")
+    if args.url:
+        from ingestion import PLATFORMS
+        names = [name for name, _, _ in PLATFORMS]
+        for item in args.url:
+            platform, _, url = item.partition("=")
+            if platform.strip() not in names or not url.strip():
+                parser.error(f"invalid --url {item!r}: expected PLATFORM=URL with PLATFORM one of {', '.join(names)}")
+    if not args.token:
+        parser.error("an Apify token is required (--token or $APIFY_API_TOKEN)")
+    return args
+
+def select_establishments(args, conn):
+    import portfolio
+    import review_store
+    if args.portfolio:
+        return portfolio.load_portfolio(args.portfolio)
+    if args.establishment:
+        urls = dict(review_store.load_establishment(conn, args.establishment) or {})
+        for item in args.url:
+            platform, _, url = item.partition("=")
+            urls[platform.strip()] = url.strip()
+        return {args.establishment: urls}
+    return portfolio.stored_portfolio(conn)
+
+def main(argv=None):
+    args = parse_args(argv)
+    import metrics
+    import portfolio
+    import replay
+    import review_store
+    if args.db:
+        review_store.DB_PATH = args.db
+    replay.install_from_env()
+
+    conn = review_store.connect()
+    try:
+        establishments = select_establishments(args, conn)
+    finally:
+        conn.close()
+    if not establishments:
+        print("No establishments to refresh.", file=sys.stderr)
+        return 1
+    if args.establishment and not any(establishments[args.establishment].values()):
+        print(f"No platform URLs for {args.establishment}; pass them with --url.", file=sys.stderr)
+        return 1
+
+    failed = 0
+    for establishment, platform, kind, payload in portfolio.refresh_portfolio(
+            establishments, args.token, max_concurrent_runs=args.max_runs or portfolio.MAX_CONCURRENT_RUNS,
+            force=args.force, incremental=not args.full):
+        if kind == "saved":
+            print(f"{establishment}: saved {payload:,} {platform} reviews")
+        elif kind == "error":
+            failed += 1
+            print(f"{establishment}: error fetching {platform}: {payload}", file=sys.stderr)
+        elif kind == "warning":
+            print(f"{establishment}: warning: {payload}", file=sys.stderr)
+        else:
+            print(f"{establishment}: {payload}")
+    # The process is about to exit, so write the final figures rather than wait for a periodic flush
+    metrics.flush()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
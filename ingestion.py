@@ -0,0 +1,597 @@
+"""Apify ingestion pipeline: trigger the review actors, wait for them, fetch and
+normalize their datasets.
+
+Nothing in here touches Streamlit so the pipeline can run in worker threads;
+callers get progress back as events and decide how to display them.
+"""
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import http_client
+import metrics
+
+# Columns of a normalized review, in display order
+REVIEW_COLUMNS = ["platform", "review_date", "reviewer_name", "star_rating", "review_text", "replied"]
+
+# Compact in-memory layout of loaded reviews (see compact_reviews)
+REVIEW_DTYPES = {
+    "platform": "category",
+    "review_date": "datetime64[ns]",
+    "reviewer_name": "string[pyarrow]",
+    "star_rating": "float32",
+    "review_text": "string[pyarrow]",
+    "replied": "bool",
+}
+
+# Incremental syncs only ask for this many of the most recent reviews
+INCREMENTAL_MAX_REVIEWS = 100
+
+# Actor input that restricts a run to reviews published on or after a date
+# ("YYYY-MM-DD"). Actors not listed here rely on INCREMENTAL_MAX_REVIEWS alone.
+CUTOFF_DATE_FIELDS = {
+    "booking-reviews-scraper": "cutoffDate",
+    "google-maps-reviews-scraper": "reviewsStartDate",
+}
+
+# Newest-first sort of actors whose full-sync sort isn't by date. Incremental
+# runs are capped at INCREMENTAL_MAX_REVIEWS, so if an actor ignores the cutoff
+# date they must still get the newest reviews rather than the best scored.
+RECENT_SORTS = {
+    "booking-reviews-scraper": "f_recent_desc",
+}
+
+
+# Apify API root; point it at a stand-in server (see apify_stub.py) to run offline
+API_BASE = os.getenv("APIFY_API_BASE", "https://api.apify.com/v2")
+
+# Longest waitForFinish Apify accepts on the run endpoint, in seconds
+WAIT_FOR_FINISH_SECS = 60
+# Backoff between run-status requests that return early: first and longest delay
+POLL_MIN_DELAY = 0.5
+POLL_MAX_DELAY = 10
+TERMINAL_STATUSES = ("SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT")
+
+
+class ActorRunError(Exception):
+    """Raised when an actor run finishes in any state other than SUCCEEDED."""
+
+    def __init__(self, name, run_data):
+        self.run_data = run_data
+        status = run_data["data"]["status"]
+        super().__init__(f"{name} run failed or was aborted (status: {status}).")
+
+
+def trigger_actor(actor_id, api_token, start_url, since=None):
+    """Start an actor run and return its ID.
+
+    With `since` (a "YYYY-MM-DD" date) only the reviews since that date are
+    requested, for incremental syncs.
+    """
+    run_url = f"{API_BASE}/acts/{actor_id}/runs?token={api_token}"
+    
+    # Platform-specific configurations
+    if "booking-reviews-scraper" in actor_id:
+        sort_by = "review_score_and_price"  # Valid for Booking.com
+    elif "expedia-hotels-com-reviews-scraper" in actor_id:
+        sort_by = "Most recent"  # Valid for Expedia
+    elif "tripadvisor-reviews" in actor_id:
+        sort_by = "Most recent"  # Valid for TripAdvisor
+    elif "google-maps-reviews-scraper" in actor_id:
+        sort_by = "Most recent"  # Valid for Google Maps
+    else:
+        sort_by = "Most recent"  # Default for other platforms
+    
+    # Configure the actor to fetch 2 years of reviews
+    payload = {
+        "startUrls": [{"url": start_url}],
+        "maxReviews": 1000,  # Set a high number to ensure we get all reviews
+        "maxReviewsPerPage": 100,  # Maximum reviews per page
+        "maxPages": 10,  # Maximum number of pages to scrape
+        "minRating": 1,  # Include all ratings
+        "maxRating": 5,  # Include all ratings
+        "sortBy": sort_by,
+        "timeRange": "2y"  # Last 2 years
+    }
+    
+    # Add platform-specific configurations
+    if "google-maps-reviews-scraper" in actor_id:
+        payload["includeReviewOrigin"] = True  # Ensure we get review origin for Google
+
+    # Incremental sync: only the newest reviews, cut off by date where supported
+    if since:
+        payload["maxReviews"] = INCREMENTAL_MAX_REVIEWS
+        payload["maxPages"] = 1
+        for actor_name, field in CUTOFF_DATE_FIELDS.items():
+            if actor_name in actor_id:
+                payload[field] = since
+        for actor_name, recent in RECENT_SORTS.items():
+            if actor_name in actor_id:
+                payload["sortBy"] = recent
+    
+    resp = http_client.post(run_url, json=payload)
+    resp.raise_for_status()
+    run_data = resp.json()
+    run_id = run_data["data"]["id"]
+    return run_id
+
+def wait_for_run(run_id, api_token, wait_secs=WAIT_FOR_FINISH_SECS):
+    """Block until a run finishes and return its run data.
+
+    Each request long-polls the run endpoint (`waitForFinish`), so Apify
+    answers as soon as the run ends. When a request comes back early with the
+    run still going, the next one is delayed with exponential backoff so a
+    server that ignores long polling isn't hammered. Dropped connections and
+    5xx answers are retried by http_client.
+    """
+    status_url = f"{API_BASE}/actor-runs/{run_id}"
+    delay = POLL_MIN_DELAY
+    while True:
+        started = time.monotonic()
+        resp = http_client.get(status_url, params={"token": api_token, "waitForFinish": wait_secs},
+                               timeout=wait_secs + 30)
+        resp.raise_for_status()
+        data = resp.json()
+        if data["data"]["status"] in TERMINAL_STATUSES:
+            return data
+        if time.monotonic() - started >= wait_secs / 2:
+            # A full long poll; ask again straight away
+            delay = POLL_MIN_DELAY
+            continue
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_DELAY)
+
+# Dataset items requested per page
+DATASET_PAGE_SIZE = 1000
+
+def fetch_dataset_page(dataset_id, api_token, offset, limit, fields=None):
+    """One page of a dataset's items, optionally only the listed top-level fields."""
+    params = {"token": api_token, "offset": offset, "limit": limit}
+    if fields:
+        params["fields"] = ",".join(fields)
+    resp = http_client.get(f"{API_BASE}/datasets/{dataset_id}/items", params=params)
+    resp.raise_for_status()
+    return resp.json()
+
+def iter_dataset_pages(dataset_id, api_token, fields=None, page_size=None):
+    """Yield a dataset's items a page at a time.
+
+    The next page downloads in a background thread while the caller works on
+    the current one, so at most two pages are held at once.
+    """
+    page_size = page_size or DATASET_PAGE_SIZE
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        offset = 0
+        future = pool.submit(fetch_dataset_page, dataset_id, api_token, offset, page_size, fields)
+        while future is not None:
+            page = future.result()
+            offset += len(page)
+            # A short page is the last one
+            future = (pool.submit(fetch_dataset_page, dataset_id, api_token, offset, page_size, fields)
+                      if len(page) == page_size else None)
+            if page:
+                yield page
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def fetch_reviews(dataset_id, api_token, fields=None):
+    return [item for page in iter_dataset_pages(dataset_id, api_token, fields) for item in page]
+
+# Normalization functions
+def normalize_date(date_str):
+    """Helper function to normalize dates across all platforms"""
+    if not date_str:
+        return None
+    try:
+        # Try different date formats
+        for fmt in ["%Y-%m-%d", "%d %b %Y", "%b %d, %Y", "%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"]:
+            try:
+                date_obj = pd.to_datetime(date_str, format=fmt)
+                return date_obj.strftime("%Y-%m-%d")
+            except:
+                continue
+        # If none of the specific formats work, try pandas' automatic parsing
+        date_obj = pd.to_datetime(date_str)
+        return date_obj.strftime("%Y-%m-%d")
+    except:
+        return None
+
+def normalize_booking_review(raw):
+    rating_10 = raw.get("rating")
+    rating_5 = round((rating_10 / 2), 1) if rating_10 is not None else None
+    review_title = raw.get("reviewTitle")
+    liked = raw.get('likedText', '')
+    disliked = raw.get('dislikedText', '')
+    
+    # Format review text with clear sections
+    review_parts = []
+    if review_title:
+        review_parts.append(f"Title: {review_title}")
+    if liked:
+        review_parts.append(f"Liked: {liked}")
+    if disliked:
+        review_parts.append(f"Disliked: {disliked}")
+    
+    review_text = "\n".join(review_parts)
+    
+    return {
+        "platform": "Booking.com",
+        "review_date": normalize_date(raw.get("reviewDate")),
+        "reviewer_name": raw.get("userName"),
+        "star_rating": rating_5,
+        "review_text": review_text,
+        "replied": raw.get("propertyResponse") is not None
+    }
+
+def normalize_expedia_review(raw):
+    label = raw.get("reviewScoreWithDescription", {}).get("label", "")
+    try:
+        rating_10 = float(label.split(" out of ")[0])
+        rating_5 = round(rating_10 / 2, 1)
+    except Exception:
+        rating_5 = None
+    review_title = raw.get("title", "")
+    review_text = raw.get("text", "")
+    reviewer_name = raw.get("reviewAuthorAttribution", {}).get("text", "")
+    replied = bool(raw.get("managementResponses"))
+    
+    # Format review text with title only if it exists
+    if review_title:
+        review_text = f"Title: {review_title}\n{review_text}"
+    
+    # Get and format the date
+    date_str = raw.get("submissionTime", {}).get("longDateFormat", "")
+    
+    return {
+        "platform": "Expedia",
+        "review_date": normalize_date(date_str),
+        "reviewer_name": reviewer_name,
+        "star_rating": rating_5,
+        "review_text": review_text.strip(),
+        "replied": replied
+    }
+
+def normalize_tripadvisor_review(raw):
+    review_title = raw.get("title", "")
+    review_text = raw.get("text", "")
+    reviewer_name = raw.get("user", {}).get("name", "")
+    replied = raw.get("ownerResponse") is not None
+    published_date = raw.get("publishedDate")
+    
+    # Format review text with title only if it exists
+    if review_title:
+        review_text = f"Title: {review_title}\n{review_text}"
+    
+    return {
+        "platform": "TripAdvisor",
+        "review_date": normalize_date(published_date),
+        "reviewer_name": reviewer_name,
+        "star_rating": raw.get("rating"),
+        "review_text": review_text.strip(),
+        "replied": replied
+    }
+
+def normalize_google_review(raw):
+    # Only process reviews that have "Google" as their origin
+    if raw.get("reviewOrigin") != "Google":
+        return None
+        
+    review_title = raw.get("title", "")
+    review_text = raw.get("text") or raw.get("textTranslated") or ""
+    reviewer_name = raw.get("name", "")
+    replied = raw.get("responseFromOwnerText") is not None
+    star_rating = raw.get("stars")  # Use stars field directly
+    published_date = raw.get("publishedAtDate")
+    
+    return {
+        "platform": "Google",
+        "review_date": normalize_date(published_date),
+        "reviewer_name": reviewer_name,
+        "star_rating": star_rating,
+        "review_text": review_text.strip(),  # Remove title/establishment name
+        "replied": replied
+    }
+
+# Batch normalization: the same output as the normalize_* functions above, but
+# computed a column at a time over a whole dataset.
+
+# Formats normalize_date tries, in its order
+DATE_FORMATS = ["%Y-%m-%d", "%d %b %Y", "%b %d, %Y", "%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"]
+
+# The format each platform's actor actually uses, tried first
+PLATFORM_DATE_FORMATS = {
+    "Booking.com": "%Y-%m-%d",
+    "Expedia": "%b %d, %Y",
+    "TripAdvisor": "%Y-%m-%d",
+    "Google": "%Y-%m-%dT%H:%M:%S.%fZ",
+}
+
+def _field(items, key, default=None):
+    return [raw.get(key, default) for raw in items]
+
+def _nested_field(items, key, subkey, default):
+    return [raw.get(key, {}).get(subkey, default) for raw in items]
+
+def normalize_dates(values, platform=None):
+    """Vectorized normalize_date over a sequence of raw date values.
+
+    Each format is parsed once for the whole column, starting with the
+    platform's own; only values none of them match fall back to
+    normalize_date row by row.
+    """
+    values = pd.Series(values, dtype=object)
+    result = pd.Series([None] * len(values), index=values.index, dtype=object)
+    is_str = values.map(type) == str
+    # Non-empty strings that no format has matched yet
+    pending = is_str & (values != "")
+    formats = [PLATFORM_DATE_FORMATS[platform]] if platform in PLATFORM_DATE_FORMATS else []
+    formats += [fmt for fmt in DATE_FORMATS if fmt not in formats]
+    for fmt in formats:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(values[pending], format=fmt, errors="coerce")
+        parsed = parsed[parsed.notna()]
+        result[parsed.index] = parsed.dt.strftime("%Y-%m-%d")
+        pending[parsed.index] = False
+    # Anything left (other layouts, non-string values) goes through the slow path
+    leftover = pending | (~is_str & values.notna() & values.astype(bool))
+    if leftover.any():
+        result[leftover] = values[leftover].map(normalize_date)
+    return result
+
+def _prefixed(values, prefix):
+    """`prefix + value` where the value is truthy, else None."""
+    values = pd.Series(values, dtype=object)
+    truthy = values.notna() & (values != "")
+    return (prefix + values[truthy].astype(str)).reindex(values.index)
+
+def _join_lines(*parts):
+    """Join the non-None parts of each row with newlines, like "\\n".join(...)."""
+    joined = pd.Series("", index=parts[0].index, dtype=object)
+    for part in parts:
+        joined += ("\n" + part).fillna("")
+    return joined.str[1:]
+
+def _titled_text(titles, texts):
+    """f"Title: {title}\\n{text}" where there is a title, else the text, stripped."""
+    titles = pd.Series(titles, dtype=object)
+    texts = pd.Series(texts, dtype=object)
+    has_title = titles.notna() & (titles != "")
+    combined = texts.copy()
+    combined[has_title] = "Title: " + titles[has_title].astype(str) + "\n" + texts[has_title].astype(str)
+    return combined.str.strip()
+
+def _half_rating(values):
+    """round(rating_10 / 2, 1), None where there is no rating."""
+    halved = pd.Series(values, dtype="float64") / 2
+    # Python's round (not numpy's) so ties land exactly where the row normalizers put them
+    return [round(v, 1) for v in halved.tolist()]
+
+def _review_frame(platform, review_date, reviewer_name, star_rating, review_text, replied):
+    return pd.DataFrame({
+        "platform": [platform] * len(review_text),
+        "review_date": review_date.tolist(),
+        "reviewer_name": list(reviewer_name),
+        "star_rating": list(star_rating),
+        "review_text": review_text.tolist(),
+        "replied": list(replied),
+    }, columns=REVIEW_COLUMNS)
+
+def normalize_booking_batch(items):
+    if not items:
+        return pd.DataFrame([], columns=REVIEW_COLUMNS)
+    text = _join_lines(_prefixed(_field(items, "reviewTitle"), "Title: "),
+                       _prefixed(_field(items, "likedText", ""), "Liked: "),
+                       _prefixed(_field(items, "dislikedText", ""), "Disliked: "))
+    return _review_frame(
+        "Booking.com",
+        normalize_dates(_field(items, "reviewDate"), "Booking.com"),
+        _field(items, "userName"),
+        _half_rating(_field(items, "rating")),
+        text,
+        [v is not None for v in _field(items, "propertyResponse")],
+    )
+
+def normalize_expedia_batch(items):
+    if not items:
+        return pd.DataFrame([], columns=REVIEW_COLUMNS)
+    labels = pd.Series(_nested_field(items, "reviewScoreWithDescription", "label", ""), dtype=object)
+    scores = labels.str.split(" out of ", n=1).str[0]
+    ratings = pd.to_numeric(scores, errors="coerce")
+    # float() accepts a few spellings to_numeric doesn't; settle those row by row
+    unparsed = ratings.isna() & scores.notna() & (scores != "")
+    for i in unparsed[unparsed].index:
+        try:
+            ratings[i] = float(scores[i])
+        except Exception:
+            pass
+    return _review_frame(
+        "Expedia",
+        normalize_dates(_nested_field(items, "submissionTime", "longDateFormat", ""), "Expedia"),
+        _nested_field(items, "reviewAuthorAttribution", "text", ""),
+        [None if pd.isna(v) else v for v in _half_rating(ratings)],
+        _titled_text(_field(items, "title", ""), _field(items, "text", "")),
+        [bool(v) for v in _field(items, "managementResponses")],
+    )
+
+def normalize_tripadvisor_batch(items):
+    if not items:
+        return pd.DataFrame([], columns=REVIEW_COLUMNS)
+    return _review_frame(
+        "TripAdvisor",
+        normalize_dates(_field(items, "publishedDate"), "TripAdvisor"),
+        _nested_field(items, "user", "name", ""),
+        _field(items, "rating"),
+        _titled_text(_field(items, "title", ""), _field(items, "text", "")),
+        [v is not None for v in _field(items, "ownerResponse")],
+    )
+
+def normalize_google_batch(items):
+    # Only reviews that have "Google" as their origin
+    items = [raw for raw in items if raw.get("reviewOrigin") == "Google"]
+    if not items:
+        return pd.DataFrame([], columns=REVIEW_COLUMNS)
+    text = pd.Series(_field(items, "text"), dtype=object)
+    translated = pd.Series(_field(items, "textTranslated"), dtype=object)
+    text = text.where(text.notna() & (text != ""), translated)
+    text = text.where(text.notna() & (text != ""), "")
+    return _review_frame(
+        "Google",
+        normalize_dates(_field(items, "publishedAtDate"), "Google"),
+        _field(items, "name", ""),
+        _field(items, "stars"),
+        text.str.strip(),
+        [v is not None for v in _field(items, "responseFromOwnerText")],
+    )
+
+# Row normalizer -> equivalent batch normalizer
+BATCH_NORMALIZERS = {
+    normalize_booking_review: normalize_booking_batch,
+    normalize_expedia_review: normalize_expedia_batch,
+    normalize_tripadvisor_review: normalize_tripadvisor_batch,
+    normalize_google_review: normalize_google_batch,
+}
+
+# Top-level fields each normalizer reads; fetching only these keeps pages small
+DATASET_FIELDS = {
+    normalize_booking_review: ["rating", "reviewTitle", "likedText", "dislikedText", "reviewDate",
+                               "userName", "propertyResponse"],
+    normalize_expedia_review: ["reviewScoreWithDescription", "title", "text", "reviewAuthorAttribution",
+                               "managementResponses", "submissionTime"],
+    normalize_tripadvisor_review: ["title", "text", "user", "ownerResponse", "publishedDate", "rating"],
+    normalize_google_review: ["reviewOrigin", "title", "text", "textTranslated", "name",
+                              "responseFromOwnerText", "stars", "publishedAtDate"],
+}
+
+def normalize_reviews(normalize_fn, items):
+    """Normalize a platform's raw items into a DataFrame, in batch where possible."""
+    batch_fn = BATCH_NORMALIZERS.get(normalize_fn)
+    if batch_fn is not None:
+        return batch_fn(items)
+    normalized = [r for r in [normalize_fn(r) for r in items] if r is not None]
+    return pd.DataFrame(normalized, columns=REVIEW_COLUMNS)
+
+def compact_reviews(df):
+    """`df` in the REVIEW_DTYPES layout, other columns unchanged.
+
+    Platform names become a categorical, ratings float32 (they are whole or
+    half stars) and the texts Arrow strings held in contiguous buffers
+    rather than one Python object each, which takes a few times less memory.
+    """
+    df = df.assign(
+        platform=df["platform"].astype("category"),
+        review_date=pd.to_datetime(df["review_date"], errors="coerce"),
+        star_rating=pd.to_numeric(df["star_rating"], errors="coerce"),
+        replied=df["replied"].fillna(False),
+    )
+    return df.astype(REVIEW_DTYPES)
+
+PLATFORMS = [
+    ("Booking.com", "voyager~booking-reviews-scraper", normalize_booking_review),
+    ("Expedia", "tri_angle~expedia-hotels-com-reviews-scraper", normalize_expedia_review),
+    ("TripAdvisor", "maxcopell~tripadvisor-reviews", normalize_tripadvisor_review),
+    ("Google Maps", "compass~google-maps-reviews-scraper", normalize_google_review),
+]
+
+def ingest_platform(name, actor_id, normalize_fn, api_token, start_url, emit, since=None, run_id=None,
+                    on_run=None):
+    """Run one platform end to end and return its normalized reviews as a DataFrame.
+
+    `emit(kind, message)` is called with "progress" and "warning" updates.
+    With `since`, only reviews newer than that date are requested. With
+    `run_id`, the existing run is reattached to instead of starting one;
+    either way `on_run(run_id)` is called as soon as the run's ID is known.
+    """
+    if run_id is None:
+        emit("progress", f"Triggering Apify actor for {name}..." if not since
+             else f"Triggering Apify actor for {name} (reviews since {since})...")
+        with metrics.timer("reviews_ingest_stage_seconds", platform=name, stage="trigger"):
+            run_id = trigger_actor(actor_id, api_token, start_url, since=since)
+    else:
+        emit("progress", f"Reattaching to the running {name} actor...")
+    if on_run is not None:
+        on_run(run_id)
+    emit("progress", f"Waiting for {name} run to finish...")
+    # Time in Apify's queue plus the actor's own run time
+    with metrics.timer("reviews_ingest_stage_seconds", platform=name, stage="run"):
+        run_data = wait_for_run(run_id, api_token)
+    if run_data["data"]["status"] != "SUCCEEDED":
+        raise ActorRunError(name, run_data)
+    dataset_id = run_data["data"]["defaultDatasetId"]
+    emit("progress", f"Fetching reviews for {name}...")
+    # Each page is normalized as soon as it lands, while the next one downloads
+    frames, fetched = [], 0
+    pages = iter_dataset_pages(dataset_id, api_token, fields=DATASET_FIELDS.get(normalize_fn))
+    while True:
+        # Only the time spent waiting for a page; downloads overlap normalization
+        with metrics.timer("reviews_ingest_stage_seconds", platform=name, stage="download"):
+            page = next(pages, None)
+        if page is None:
+            break
+        fetched += len(page)
+        with metrics.timer("reviews_ingest_stage_seconds", platform=name, stage="normalize"):
+            frame = normalize_reviews(normalize_fn, page)
+        frames.append(frame)
+        if metrics.ENABLED:
+            metrics.inc("reviews_fetched_total", len(page), platform=name)
+            metrics.inc("reviews_dropped_total", len(page) - len(frame), platform=name)
+            metrics.inc("reviews_undated_total", int(frame["review_date"].isna().sum()), platform=name)
+        emit("progress", f"Fetched {fetched:,} {name} reviews...")
+    if not fetched and not since:
+        emit("warning", f"No reviews found for {name}. This might indicate an issue with the URL or scraper.")
+    with metrics.timer("reviews_ingest_stage_seconds", platform=name, stage="build"):
+        frames = [frame for frame in frames if not frame.empty]
+        df = pd.concat(frames, ignore_index=True) if frames else normalize_reviews(normalize_fn, [])
+    metrics.inc("reviews_kept_total", len(df), platform=name)
+    # A full page of reviews that are all newer than the last sync may have skipped some
+    dates = df["review_date"].dropna()
+    if since and fetched >= INCREMENTAL_MAX_REVIEWS and not dates.empty and dates.min() > since:
+        emit("warning", f"More than {INCREMENTAL_MAX_REVIEWS} new {name} reviews since {since}; "
+                        f"some may be missing until the next full refresh.")
+    return df
+
+def ingest_platforms(platforms, urls, api_token, since=None):
+    """Run all platforms' actors at once and yield events as they happen.
+
+    Yields `(name, kind, payload)` tuples. `kind` is "progress" or "warning"
+    (payload is a message), "done" (payload is the platform's normalized
+    DataFrame) or "error" (payload is the exception). Each platform is
+    normalized in its own worker as soon as its run finishes, so the whole
+    load takes about as long as the slowest actor.
+
+    `since` optionally maps platform names to the date of their newest stored
+    review; those platforms only fetch the reviews published since then.
+    """
+    since = since or {}
+    jobs = [(name, actor_id, normalize_fn, urls[name])
+            for name, actor_id, normalize_fn in platforms if urls.get(name)]
+    if not jobs:
+        return
+    events = queue.Queue()
+
+    def run(name, actor_id, normalize_fn, start_url):
+        try:
+            df = ingest_platform(name, actor_id, normalize_fn, api_token, start_url,
+                                 lambda kind, message: events.put((name, kind, message)),
+                                 since=since.get(name))
+            events.put((name, "done", df))
+        except Exception as e:
+            events.put((name, "error", e))
+
+    pool = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="ingest")
+    try:
+        for job in jobs:
+            pool.submit(run, *job)
+        remaining = len(jobs)
+        while remaining:
+            event = events.get()
+            if event[1] in ("done", "error"):
+                remaining -= 1
+            yield event
+    finally:
+        # Don't block a rerun on actors we no longer care about
+        pool.shutdown(wait=False, cancel_futures=True)
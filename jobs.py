@@ -0,0 +1,231 @@
+"""Background ingestion jobs, recorded in reviews.db.
+
+A job scrapes some platforms of one establishment on the runner's worker
+threads, independently of any Streamlit script run, and stores the reviews
+in the review store. Its progress lives in two tables: `ingest_jobs` (one
+row per job) and `ingest_job_platforms` (one per platform, with the Apify
+run ID as soon as the run starts). The UI polls those rows, so a rerun,
+page reload or dropped connection loses nothing.
+
+A job whose process died is resumed by reattaching to its recorded runs
+(see JobRunner.start); platforms already saved are not scraped again.
+"""
+import json
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import replay
+import review_store
+from ingestion import PLATFORMS, ActorRunError, ingest_platform
+
+# Jobs running at once per process; each runs all its platforms concurrently
+MAX_JOBS = 4
+# Unfinished jobs older than this are given up instead of resumed (Apify keeps
+# the default datasets of runs for a week, but the reviews will be stale)
+RESUME_HOURS = 24
+ACTIVE = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_jobs
+    (job_id TEXT PRIMARY KEY,
+     establishment TEXT NOT NULL,
+     status TEXT NOT NULL,
+     created_at REAL NOT NULL,
+     updated_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS ingest_job_platforms
+    (job_id TEXT NOT NULL,
+     platform TEXT NOT NULL,
+     source_url TEXT NOT NULL,
+     since TEXT,
+     run_id TEXT,
+     status TEXT NOT NULL,
+     saved INTEGER,
+     message TEXT,
+     details TEXT,
+     updated_at REAL NOT NULL,
+     PRIMARY KEY (job_id, platform));
+CREATE INDEX IF NOT EXISTS ingest_jobs_establishment ON ingest_jobs (establishment, status);
+"""
+
+
+def connect(path=None):
+    conn = review_store.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def create_job(conn, establishment, plan, now=None):
+    """Record a queued job for `plan` ({platform: (url, since)}) and return its ID."""
+    now = time.time() if now is None else now
+    job_id = uuid.uuid4().hex[:12]
+    with conn:
+        conn.execute("INSERT INTO ingest_jobs VALUES (?, ?, 'queued', ?, ?)", (job_id, establishment, now, now))
+        conn.executemany("INSERT INTO ingest_job_platforms VALUES (?, ?, ?, ?, NULL, 'pending', NULL, NULL, NULL, ?)",
+                         [(job_id, platform, url, since, now) for platform, (url, since) in plan.items()])
+    return job_id
+
+def active_job(conn, establishment):
+    """(job_id, created_at) of the establishment's newest unfinished job, or None."""
+    return conn.execute(
+        f"SELECT job_id, created_at FROM ingest_jobs WHERE establishment = ? "
+        f"AND status IN ({','.join('?' * len(ACTIVE))}) ORDER BY created_at DESC LIMIT 1",
+        (establishment, *ACTIVE)).fetchone()
+
+def job_status(conn, job_id):
+    """{'establishment', 'status', 'created_at', 'updated_at', 'platforms'} of a job; platforms is a DataFrame."""
+    row = conn.execute("SELECT establishment, status, created_at, updated_at FROM ingest_jobs WHERE job_id = ?",
+                       (job_id,)).fetchone()
+    if row is None:
+        return None
+    platforms = pd.read_sql_query(
+        "SELECT platform, source_url, status, saved, message, details, run_id FROM ingest_job_platforms "
+        "WHERE job_id = ? ORDER BY rowid", conn, params=(job_id,))
+    return {"establishment": row[0], "status": row[1], "created_at": row[2], "updated_at": row[3],
+            "platforms": platforms}
+
+def _set_job(conn, job_id, status):
+    with conn:
+        conn.execute("UPDATE ingest_jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                     (status, time.time(), job_id))
+
+def _set_platform(conn, job_id, platform, **fields):
+    fields["updated_at"] = time.time()
+    with conn:
+        conn.execute(f"UPDATE ingest_job_platforms SET {', '.join(f'{k} = ?' for k in fields)} "
+                     f"WHERE job_id = ? AND platform = ?", (*fields.values(), job_id, platform))
+
+def _save_reviews(conn, establishment, platform, url, since, df):
+    """Store a platform's fetched reviews; returns how many were saved (new ones for a delta)."""
+    if since:
+        return review_store.merge_platform_reviews(conn, establishment, platform, url, df)
+    review_store.save_platform_reviews(conn, establishment, platform, url, df)
+    return len(df)
+
+def _error_details(error):
+    if isinstance(error, ActorRunError):
+        return json.dumps(error.run_data["data"], indent=2)
+    response = getattr(error, "response", None)
+    return response.text if response is not None else None
+
+
+class JobRunner:
+    """Runs ingestion jobs on worker threads owned by the process (one runner per server)."""
+
+    def __init__(self, max_jobs=MAX_JOBS):
+        # Recording or replay applies to the whole process, never per job thread
+        replay.install_from_env()
+        self._pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="ingest-job")
+        self._lock = threading.Lock()
+        self._running = set()
+
+    def is_running(self, job_id):
+        with self._lock:
+            return job_id in self._running
+
+    def start(self, conn, establishment, plan, api_token, now=None):
+        """Start a job for `plan` ({platform: (url, since)}) and return its ID.
+
+        If the establishment already has an unfinished job, that job is
+        returned instead: still running in this process, or resumed from its
+        recorded runs if its process died less than RESUME_HOURS ago.
+        """
+        now = time.time() if now is None else now
+        active = active_job(conn, establishment)
+        if active is not None:
+            job_id, created_at = active
+            if self.is_running(job_id) or self.resume(job_id, api_token, created_at, now):
+                return job_id
+        job_id = create_job(conn, establishment, plan, now=now)
+        self._submit(job_id, api_token)
+        return job_id
+
+    def resume(self, job_id, api_token, created_at, now=None):
+        """Resume an interrupted job; gives it up (and returns False) if it is too old."""
+        now = time.time() if now is None else now
+        if now - created_at > RESUME_HOURS * 3600:
+            conn = connect()
+            try:
+                _set_job(conn, job_id, "abandoned")
+            finally:
+                conn.close()
+            return False
+        self._submit(job_id, api_token)
+        return True
+
+    def _submit(self, job_id, api_token):
+        with self._lock:
+            if job_id in self._running:
+                return
+            self._running.add(job_id)
+        self._pool.submit(self._run, job_id, api_token)
+
+    def _run(self, job_id, api_token):
+        conn = connect()
+        try:
+            self._run_platforms(conn, job_id, api_token)
+        except Exception:
+            _set_job(conn, job_id, "failed")
+        finally:
+            conn.close()
+            with self._lock:
+                self._running.discard(job_id)
+
+    def _run_platforms(self, conn, job_id, api_token):
+        establishment = conn.execute("SELECT establishment FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+        todo = conn.execute("SELECT platform, source_url, since, run_id FROM ingest_job_platforms "
+                            "WHERE job_id = ? AND status != 'saved'", (job_id,)).fetchall()
+        _set_job(conn, job_id, "running")
+        actors = {name: (actor_id, normalize_fn) for name, actor_id, normalize_fn in PLATFORMS}
+        events = queue.Queue()
+
+        def run(platform, url, since, run_id):
+            try:
+                actor_id, normalize_fn = actors[platform]
+                df = ingest_platform(platform, actor_id, normalize_fn, api_token, url,
+                                     lambda kind, message: events.put((platform, kind, message)),
+                                     since=since, run_id=run_id,
+                                     on_run=lambda started: events.put((platform, "run", started)))
+                events.put((platform, "done", df))
+            except Exception as e:
+                events.put((platform, "error", e))
+
+        # Every write happens on this thread; the SQLite connection isn't shared with the workers
+        pool = ThreadPoolExecutor(max_workers=max(len(todo), 1), thread_name_prefix="ingest")
+        try:
+            for row in todo:
+                _set_platform(conn, job_id, row[0], status="running", message=None, details=None)
+                pool.submit(run, *row)
+            urls = {platform: (url, since) for platform, url, since, _ in todo}
+            failed = 0
+            remaining = len(todo)
+            while remaining:
+                platform, kind, payload = events.get()
+                if kind == "done":
+                    url, since = urls[platform]
+                    try:
+                        saved = _save_reviews(conn, establishment, platform, url, since, payload)
+                    except Exception as e:
+                        # Recorded against the platform like a failed run; the other platforms carry on
+                        kind, payload = "error", e
+                if kind == "run":
+                    _set_platform(conn, job_id, platform, run_id=payload)
+                elif kind == "progress":
+                    _set_platform(conn, job_id, platform, message=payload)
+                elif kind == "warning":
+                    _set_platform(conn, job_id, platform, details=payload)
+                elif kind == "done":
+                    remaining -= 1
+                    _set_platform(conn, job_id, platform, status="saved", saved=saved,
+                                  message=f"Saved {saved:,} {'new ' if since else ''}{platform} reviews.")
+                else:
+                    remaining -= 1
+                    failed += 1
+                    _set_platform(conn, job_id, platform, status="failed", message=str(payload),
+                                  details=_error_details(payload))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        _set_job(conn, job_id, "failed" if failed else "done")
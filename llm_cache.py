@@ -0,0 +1,69 @@
+"""On-disk cache of GPT results in reviews.db.
+
+Entries are keyed by a hash of the model, the prompt template and the IDs of
+the reviews that went into the prompt, so the same question over the same
+reviews is answered from disk. Entries expire after TTL_DAYS and the least
+recently used ones are dropped beyond MAX_ENTRIES.
+"""
+import hashlib
+import sqlite3
+import time
+
+import review_store
+
+TTL_DAYS = 30
+MAX_ENTRIES = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache
+    (key TEXT PRIMARY KEY,
+     value TEXT NOT NULL,
+     created_at REAL NOT NULL,
+     last_used REAL NOT NULL);
+"""
+
+
+def connect(path=None):
+    # A short-lived connection per call keeps the cache usable from worker threads
+    conn = sqlite3.connect(path or review_store.DB_PATH, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+def cache_key(model, template, review_ids, *extra):
+    """Content address of a prompt: model, template and the exact set of reviews."""
+    digest = hashlib.sha256()
+    for part in (model, template, *extra):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1e")
+    for review_id in sorted(review_ids):
+        digest.update(review_id.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+def get(key, path=None, now=None):
+    """Cached value for `key`, or None if missing or expired."""
+    now = time.time() if now is None else now
+    conn = connect(path)
+    try:
+        with conn:
+            row = conn.execute("SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?",
+                               (key, now - TTL_DAYS * 86400)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+    finally:
+        conn.close()
+
+def put(key, value, path=None, now=None):
+    """Store `value` under `key`, then evict expired and least recently used entries."""
+    now = time.time() if now is None else now
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, now, now))
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - TTL_DAYS * 86400,))
+            conn.execute("DELETE FROM llm_cache WHERE key NOT IN "
+                         "(SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT ?)", (MAX_ENTRIES,))
+    finally:
+        conn.close()
@@ -0,0 +1,187 @@
+"""Process-wide timers and counters, exported in the Prometheus text format.
+
+Ingestion records how long each stage takes per platform (starting the run,
+waiting for Apify, downloading the dataset, normalizing it) and how many
+reviews were fetched, kept and dropped; summarizer records the latency and
+token usage of every OpenAI request. Instrumentation is off unless
+REVIEWS_METRICS is set (or an export is configured), and then every call
+here returns straight away.
+
+Exports, both optional:
+- REVIEWS_METRICS_FILE: rewritten every FLUSH_SECONDS (and by `flush()`),
+  e.g. for node_exporter's textfile collector.
+- REVIEWS_METRICS_PORT: a `/metrics` endpoint for Prometheus to scrape.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_FILE = os.getenv("REVIEWS_METRICS_FILE")
+METRICS_PORT = os.getenv("REVIEWS_METRICS_PORT")
+ENABLED = os.getenv("REVIEWS_METRICS", "") not in ("", "0") or bool(METRICS_FILE or METRICS_PORT)
+# Seconds between rewrites of METRICS_FILE
+FLUSH_SECONDS = 15
+
+# name: (Prometheus type, help); timers are summaries of seconds
+METRICS = {
+    "reviews_ingest_stage_seconds": ("summary", "Time spent in each ingestion stage, per platform"),
+    "reviews_fetched_total": ("counter", "Raw review items downloaded from Apify datasets"),
+    "reviews_kept_total": ("counter", "Reviews left after normalization"),
+    "reviews_dropped_total": ("counter", "Downloaded items dropped by normalization (e.g. non-Google Maps reviews)"),
+    "reviews_undated_total": ("counter", "Kept reviews whose date could not be parsed"),
+    "reviews_assemble_seconds": ("summary", "Time to build the loaded reviews DataFrame from the store"),
+    "apify_http_retries_total": ("counter", "Apify API requests retried after a transient failure"),
+    "openai_request_seconds": ("summary", "OpenAI chat completion latency"),
+    "openai_tokens_total": ("counter", "OpenAI tokens used; streamed responses are estimated"),
+    "openai_requests_total": ("counter", "OpenAI chat completion requests"),
+}
+
+_NULL_TIMER = nullcontext()
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Registry:
+    """Thread-safe counters and timers keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        # (name, labels) -> [count, total seconds, max seconds]
+        self._timers = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    def snapshot(self):
+        """[{'metric', 'labels', 'count', 'total', 'max'}] for display; counters have only a total."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timers = sorted((key, list(value)) for key, value in self._timers.items())
+        rows = [{"metric": name, "labels": _format("", labels), "count": None, "total": value, "max": None}
+                for (name, labels), value in counters]
+        rows += [{"metric": name, "labels": _format("", labels), "count": count, "total": total, "max": longest}
+                 for (name, labels), (count, total, longest) in timers]
+        return sorted(rows, key=lambda row: row["metric"])
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            series = {}
+            for (name, labels), value in self._counters.items():
+                series.setdefault(name, []).append((name, labels, value))
+            for (name, labels), (count, total, _) in self._timers.items():
+                series.setdefault(name, []).extend([(name + "_count", labels, count), (name + "_sum", labels, total)])
+        lines = []
+        for name in sorted(series):
+            kind, help_text = METRICS.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines += [f"{_format(sample, labels)} {value:g}" for sample, labels, value in sorted(series[name])]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Module-level shortcuts; each is a no-op while metrics are disabled
+
+def inc(name, value=1, **labels):
+    if ENABLED:
+        registry.inc(name, value, **labels)
+
+def observe(name, seconds, **labels):
+    if ENABLED:
+        registry.observe(name, seconds, **labels)
+
+def timer(name, **labels):
+    """Context manager that records its block's duration under `name`."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return registry.timer(name, **labels)
+
+
+def write_file(path):
+    """Write the metrics to `path` atomically, so a collector never reads half a file."""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(temporary, path)
+
+def flush():
+    if ENABLED and METRICS_FILE:
+        write_file(METRICS_FILE)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="0.0.0.0"):
+    """Serve `/metrics` on `port` from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        flush()
+
+def start_exporters():
+    """Start the configured exports; call once per process."""
+    if not ENABLED:
+        return
+    if METRICS_PORT:
+        serve(METRICS_PORT)
+    if METRICS_FILE:
+        threading.Thread(target=_flush_forever, name="metrics-file", daemon=True).start()
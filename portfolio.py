@@ -0,0 +1,153 @@
+"""Refresh a whole portfolio of establishments in one run.
+
+A portfolio maps establishment names to their platform URLs, read from a
+JSON or CSV file or from the establishments saved in reviews.db. Every
+establishment/platform pair that is not fresh in the review store becomes
+one job; jobs share a bounded pool so only so many Apify runs are active at
+once, and actor starts are spaced out to stay under Apify's rate limits.
+Results are stored per establishment as each run finishes.
+"""
+import csv
+import io
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import review_store
+from ingestion import PLATFORMS, ingest_platform
+
+# Apify actor runs in flight at once across the whole portfolio
+MAX_CONCURRENT_RUNS = 8
+# Minimum gap between starting two actor runs, in seconds
+RUN_START_INTERVAL = 1.0
+
+
+def load_portfolio(source):
+    """Read `{establishment: {platform: url}}` from a JSON or CSV file (path or file object).
+
+    JSON is either that mapping or a list of `{"name": ..., "urls": {...}}`.
+    CSV has a `name` column and one column per platform name.
+    """
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            return load_portfolio(f)
+    text = source.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8-sig")
+    filename = getattr(source, "name", "")
+    if filename.lower().endswith(".csv"):
+        rows = csv.DictReader(io.StringIO(text))
+        entries = [(row.pop("name"), row) for row in rows]
+    else:
+        data = json.loads(text)
+        entries = data.items() if isinstance(data, dict) else [(e["name"], e["urls"]) for e in data]
+    platform_names = [name for name, _, _ in PLATFORMS]
+    return {name.strip(): {p: (urls.get(p) or "").strip() for p in platform_names if (urls.get(p) or "").strip()}
+            for name, urls in entries if name and name.strip()}
+
+def stored_portfolio(conn):
+    """Every establishment saved in the review store, with its URLs."""
+    return {name: review_store.load_establishment(conn, name)
+            for name in review_store.list_establishments(conn)}
+
+def plan_refresh(conn, portfolio, force=False, incremental=True, ttl_hours=None, now=None):
+    """Jobs `(establishment, platform, url, since)` for every pair that needs scraping.
+
+    Pairs fetched within their TTL are skipped unless `force`; with
+    `incremental`, `since` is the newest stored review date, otherwise None.
+    """
+    ttl_hours = {**review_store.DEFAULT_TTL_HOURS, **(ttl_hours or {})}
+    now = time.time() if now is None else now
+    jobs = []
+    for establishment, urls in portfolio.items():
+        for platform, _, _ in PLATFORMS:
+            url = urls.get(platform)
+            if not url:
+                continue
+            if not force and review_store.is_fresh(conn, establishment, platform, url, ttl_hours[platform], now):
+                continue
+            since = None
+            if incremental and not force:
+                since = review_store.newest_review_date(conn, establishment, url)
+            jobs.append((establishment, platform, url, since))
+    return jobs
+
+
+class _StartThrottle:
+    """Spaces out calls to wait() by at least `interval` seconds across threads."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_start = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            delay = self.next_start - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_start = time.monotonic() + self.interval
+
+
+def refresh_portfolio(portfolio, api_token, max_concurrent_runs=MAX_CONCURRENT_RUNS, force=False,
+                      incremental=True, ttl_hours=None, start_interval=RUN_START_INTERVAL):
+    """Scrape and store every stale establishment/platform pair; yields events as they happen.
+
+    Yields `(establishment, platform, kind, payload)`: "progress" and
+    "warning" carry a message, "saved" the number of reviews stored (new
+    ones for incremental jobs), "error" the exception. A failed job doesn't
+    stop the others.
+    """
+    actors = {name: (actor_id, normalize_fn) for name, actor_id, normalize_fn in PLATFORMS}
+    conn = review_store.connect()
+    try:
+        for establishment, urls in portfolio.items():
+            review_store.save_establishment(conn, establishment, urls)
+        jobs = plan_refresh(conn, portfolio, force=force, incremental=incremental, ttl_hours=ttl_hours)
+        if not jobs:
+            return
+        events = queue.Queue()
+        throttle = _StartThrottle(start_interval)
+
+        def run(establishment, platform, url, since):
+            def emit(kind, message):
+                events.put((establishment, platform, kind, message))
+            try:
+                throttle.wait()
+                actor_id, normalize_fn = actors[platform]
+                df = ingest_platform(platform, actor_id, normalize_fn, api_token, url, emit, since=since)
+                events.put((establishment, platform, "done", (url, since, df)))
+            except Exception as e:
+                events.put((establishment, platform, "error", e))
+
+        pool = ThreadPoolExecutor(max_workers=max_concurrent_runs, thread_name_prefix="portfolio")
+        try:
+            for job in jobs:
+                pool.submit(run, *job)
+            remaining = len(jobs)
+            while remaining:
+                establishment, platform, kind, payload = events.get()
+                if kind in ("done", "error"):
+                    remaining -= 1
+                if kind == "done":
+                    # Stored from this thread; the SQLite connection isn't shared with the workers
+                    url, since, df = payload
+                    try:
+                        if since:
+                            saved = review_store.merge_platform_reviews(conn, establishment, platform, url, df)
+                        else:
+                            review_store.save_platform_reviews(conn, establishment, platform, url, df)
+                            saved = len(df)
+                    except Exception as e:
+                        # Reported like a failed run; the other establishments carry on
+                        yield establishment, platform, "error", e
+                        continue
+                    yield establishment, platform, "saved", saved
+                else:
+                    yield establishment, platform, kind, payload
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    finally:
+        conn.close()
@@ -0,0 +1,139 @@
+"""Record and replay the Apify calls of the ingestion pipeline.
+
+`record(directory)` wraps ingestion.trigger_actor, wait_for_run and
+fetch_dataset_page (which fetch_reviews pages through) so every real
+response is also written to `directory` as JSON. `replay(directory)` then
+answers the same calls from those files without touching the network, so
+ingestion can be rerun, tested and benchmarked offline:
+
+    with replay.record("recordings/stanwell"):
+        list(ingestion.ingest_platforms(PLATFORMS, urls, token))
+    ...
+    with replay.replay("recordings/stanwell"):
+        list(ingestion.ingest_platforms(PLATFORMS, urls, "any token"))
+
+The context managers swap module globals, so they are for single-threaded
+scripts and tests. The app, its job runner and ingest.py instead call
+`install_from_env()`, which records to $APIFY_RECORD_DIR or replays from
+$APIFY_REPLAY_DIR for the whole process. Runs are keyed by actor, start URL
+and `since` date, so a replay must ask for the same establishments with the
+same incremental state as the recording.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import threading
+
+import ingestion
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode for a call that was never recorded."""
+
+
+def _key(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def _path(directory, kind, key):
+    return os.path.join(directory, kind, f"{key}.json")
+
+def _save(directory, kind, key, value):
+    path = _path(directory, kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+
+def _load(directory, kind, key, call):
+    try:
+        with open(_path(directory, kind, key), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ReplayMissError(f"No recording of {call} in {directory}") from None
+
+# The API token is left out of every key, so recordings replay under any token
+def _trigger_key(actor_id, start_url, since):
+    return _key(actor_id, start_url, since)
+
+def _page_key(dataset_id, offset, limit, fields):
+    return _key(dataset_id, offset, limit, list(fields) if fields else None)
+
+
+@contextlib.contextmanager
+def _patched(trigger_actor, wait_for_run, fetch_dataset_page):
+    originals = ingestion.trigger_actor, ingestion.wait_for_run, ingestion.fetch_dataset_page
+    ingestion.trigger_actor, ingestion.wait_for_run, ingestion.fetch_dataset_page = (
+        trigger_actor, wait_for_run, fetch_dataset_page)
+    try:
+        yield
+    finally:
+        ingestion.trigger_actor, ingestion.wait_for_run, ingestion.fetch_dataset_page = originals
+
+def _recording(directory):
+    # Wrappers of the current functions that also save each response under `directory`
+    trigger_actor, wait_for_run, fetch_dataset_page = (
+        ingestion.trigger_actor, ingestion.wait_for_run, ingestion.fetch_dataset_page)
+
+    def recording_trigger(actor_id, api_token, start_url, since=None):
+        run_id = trigger_actor(actor_id, api_token, start_url, since=since)
+        _save(directory, "runs", _trigger_key(actor_id, start_url, since), run_id)
+        return run_id
+
+    def recording_wait(run_id, api_token, *args, **kwargs):
+        run_data = wait_for_run(run_id, api_token, *args, **kwargs)
+        _save(directory, "run_data", _key(run_id), run_data)
+        return run_data
+
+    def recording_page(dataset_id, api_token, offset, limit, fields=None):
+        page = fetch_dataset_page(dataset_id, api_token, offset, limit, fields)
+        _save(directory, "pages", _page_key(dataset_id, offset, limit, fields), page)
+        return page
+
+    return recording_trigger, recording_wait, recording_page
+
+def _replaying(directory):
+    # Stand-ins that answer from the recordings under `directory`
+    def replayed_trigger(actor_id, api_token, start_url, since=None):
+        return _load(directory, "runs", _trigger_key(actor_id, start_url, since),
+                     f"trigger_actor({actor_id!r}, {start_url!r}, since={since!r})")
+
+    def replayed_wait(run_id, api_token, *args, **kwargs):
+        return _load(directory, "run_data", _key(run_id), f"wait_for_run({run_id!r})")
+
+    def replayed_page(dataset_id, api_token, offset, limit, fields=None):
+        return _load(directory, "pages", _page_key(dataset_id, offset, limit, fields),
+                     f"fetch_dataset_page({dataset_id!r}, offset={offset}, limit={limit})")
+
+    return replayed_trigger, replayed_wait, replayed_page
+
+def record(directory):
+    """Context manager: make the real Apify calls and save every response under `directory`."""
+    return _patched(*_recording(directory))
+
+def replay(directory):
+    """Context manager: answer the Apify calls from recordings under `directory`; no network."""
+    return _patched(*_replaying(directory))
+
+_install_lock = threading.Lock()
+_installed = None
+
+def install_from_env():
+    """Replay from $APIFY_REPLAY_DIR, else record to $APIFY_RECORD_DIR, for the rest of the process.
+
+    Only the first call installs anything; later ones return the mode
+    already chosen ("replay", "record" or "live"). Patching around each
+    job or generator instead would interleave between threads, which save
+    and restore the same globals in any order.
+    """
+    global _installed
+    with _install_lock:
+        if _installed is None:
+            if os.getenv("APIFY_REPLAY_DIR"):
+                functions, _installed = _replaying(os.environ["APIFY_REPLAY_DIR"]), "replay"
+            elif os.getenv("APIFY_RECORD_DIR"):
+                functions, _installed = _recording(os.environ["APIFY_RECORD_DIR"]), "record"
+            else:
+                functions, _installed = None, "live"
+            if functions is not None:
+                ingestion.trigger_actor, ingestion.wait_for_run, ingestion.fetch_dataset_page = functions
+        return _installed
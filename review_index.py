@@ -0,0 +1,67 @@
+"""Sorted date index over a reviews DataFrame.
+
+Date-range filters become two binary searches returning a row slice of the
+frame instead of a boolean mask over every row, and per-platform counts and
+average ratings for any range come from prefix sums.
+"""
+import numpy as np
+import pandas as pd
+
+
+class ReviewDateIndex:
+    """Index over `df` kept newest first, as the loader sorts it (undated reviews last)."""
+
+    def __init__(self, df):
+        dates = df["review_date"]
+        dated = int(dates.notna().sum())
+        # The date search below relies on the loader's order; restore it if needed
+        if not (dates.iloc[:dated].is_monotonic_decreasing and dates.iloc[dated:].isna().all()):
+            df = df.sort_values("review_date", ascending=False, kind="stable")
+        self.df = df
+        # Negated nanoseconds, so the newest-first dates ascend for searchsorted
+        self._keys = -df["review_date"].iloc[:dated].to_numpy("datetime64[ns]").astype("int64")
+
+        codes, self.platforms = pd.factorize(df["platform"])
+        ratings = df["star_rating"].to_numpy("float64", na_value=np.nan)
+        rated = ~np.isnan(ratings)
+        self._positions = []
+        self._counts = np.zeros((len(self.platforms), len(df) + 1), dtype=np.int64)
+        self._rated = np.zeros_like(self._counts)
+        self._sums = np.zeros((len(self.platforms), len(df) + 1), dtype=np.float64)
+        for p in range(len(self.platforms)):
+            mine = codes == p
+            self._positions.append(np.flatnonzero(mine))
+            np.cumsum(mine, out=self._counts[p, 1:])
+            np.cumsum(mine & rated, out=self._rated[p, 1:])
+            np.cumsum(np.where(mine & rated, ratings, 0.0), out=self._sums[p, 1:])
+
+    def bounds(self, start_date, end_date):
+        """Row positions [lo, hi) of reviews dated start_date..end_date inclusive."""
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+        lo = int(np.searchsorted(self._keys, -end.value, side="right"))
+        hi = int(np.searchsorted(self._keys, -start.value, side="right"))
+        return lo, max(lo, hi)
+
+    def slice(self, start_date, end_date):
+        """Reviews in the date range, as a positional slice (no row copy) of the frame."""
+        lo, hi = self.bounds(start_date, end_date)
+        return self.df.iloc[lo:hi]
+
+    def platform_stats(self, start_date, end_date):
+        """{platform: {'avg_rating', 'count'}} for the range, in order of first appearance.
+
+        Matches a groupby over the sliced rows: counts include unrated
+        reviews and averages skip them.
+        """
+        lo, hi = self.bounds(start_date, end_date)
+        stats = []
+        for p, platform in enumerate(self.platforms):
+            count = int(self._counts[p, hi] - self._counts[p, lo])
+            if not count:
+                continue
+            rated = self._rated[p, hi] - self._rated[p, lo]
+            total = self._sums[p, hi] - self._sums[p, lo]
+            first = self._positions[p][np.searchsorted(self._positions[p], lo)]
+            stats.append((first, platform, {'avg_rating': total / rated if rated else np.nan, 'count': count}))
+        return {platform: stat for _, platform, stat in sorted(stats, key=lambda s: s[0])}
@@ -0,0 +1,268 @@
+"""Persistent review store in reviews.db.
+
+Normalized reviews are kept per establishment and platform URL together with
+the time they were fetched, so the loader can serve anything still within
+its platform's TTL without starting an Apify run.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+from ingestion import REVIEW_COLUMNS
+
+DB_PATH = os.getenv("REVIEWS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reviews.db"))
+
+# How long (in hours) a platform's stored reviews are served before re-scraping
+DEFAULT_TTL_HOURS = {
+    "Booking.com": 24,
+    "Expedia": 24,
+    "TripAdvisor": 24,
+    "Google Maps": 12,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS establishments
+    (name TEXT PRIMARY KEY, data TEXT);
+CREATE TABLE IF NOT EXISTS platform_fetches
+    (establishment TEXT NOT NULL,
+     source_url TEXT NOT NULL,
+     source TEXT NOT NULL,
+     fetched_at REAL NOT NULL,
+     PRIMARY KEY (establishment, source_url));
+CREATE TABLE IF NOT EXISTS reviews
+    (establishment TEXT NOT NULL,
+     source_url TEXT NOT NULL,
+     review_id TEXT NOT NULL,
+     platform TEXT,
+     review_date TEXT,
+     reviewer_name TEXT,
+     star_rating REAL,
+     review_text TEXT,
+     replied INTEGER,
+     fetched_at REAL NOT NULL,
+     PRIMARY KEY (establishment, source_url, review_id));
+"""
+
+# Full-text index over the reviews table, kept in step with it by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5
+    (review_text, reviewer_name, content='reviews', content_rowid='rowid',
+     tokenize='porter unicode61 remove_diacritics 2');
+CREATE TRIGGER IF NOT EXISTS reviews_fts_insert AFTER INSERT ON reviews BEGIN
+    INSERT INTO reviews_fts (rowid, review_text, reviewer_name)
+    VALUES (new.rowid, new.review_text, new.reviewer_name);
+END;
+CREATE TRIGGER IF NOT EXISTS reviews_fts_delete AFTER DELETE ON reviews BEGIN
+    INSERT INTO reviews_fts (reviews_fts, rowid, review_text, reviewer_name)
+    VALUES ('delete', old.rowid, old.review_text, old.reviewer_name);
+END;
+CREATE TRIGGER IF NOT EXISTS reviews_fts_update AFTER UPDATE OF review_text, reviewer_name ON reviews BEGIN
+    INSERT INTO reviews_fts (reviews_fts, rowid, review_text, reviewer_name)
+    VALUES ('delete', old.rowid, old.review_text, old.reviewer_name);
+    INSERT INTO reviews_fts (rowid, review_text, reviewer_name)
+    VALUES (new.rowid, new.review_text, new.reviewer_name);
+END;
+"""
+
+
+def connect(path=None):
+    """Open the review database, creating any missing tables."""
+    conn = sqlite3.connect(path or DB_PATH)
+    # Rows replaced by INSERT OR REPLACE must fire the delete trigger too
+    conn.execute("PRAGMA recursive_triggers = ON")
+    conn.executescript(SCHEMA)
+    indexed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'reviews_fts'").fetchone()
+    conn.executescript(FTS_SCHEMA)
+    if not indexed:
+        # Index reviews stored before the search index existed
+        with conn:
+            conn.execute("INSERT INTO reviews_fts (reviews_fts) VALUES ('rebuild')")
+    return conn
+
+def review_id(platform, review_date, reviewer_name, review_text, star_rating=None, occurrence=0):
+    """Stable ID of a normalized review, derived from its content.
+
+    `occurrence` tells apart reviews whose content is otherwise identical
+    (e.g. two untitled, empty reviews by "Graham" on the same day): the
+    first is 0, the next 1, and so on, so a re-fetch matches each of them
+    again instead of collapsing them into one.
+    """
+    return _hash_id(_id_key(platform, review_date, reviewer_name, review_text, star_rating), occurrence)
+
+def _id_key(platform, review_date, reviewer_name, review_text, star_rating):
+    # Missing values are blank, whether None, NaN or pandas' NA from string columns
+    rating = "" if star_rating is None or pd.isna(star_rating) else f"{float(star_rating):g}"
+    return "\x1f".join([*(str(v) if v is not None and v is not pd.NA else ""
+                           for v in (platform, review_date, reviewer_name, review_text)), rating])
+
+def _hash_id(key, occurrence):
+    return hashlib.sha1(f"{key}\x1f{occurrence}".encode("utf-8")).hexdigest()[:16]
+
+def review_ids(df):
+    """review_id() of every row of a normalized reviews frame, numbering repeated content in row order."""
+    if pd.api.types.is_datetime64_any_dtype(df["review_date"]):
+        dates = df["review_date"].dt.strftime("%Y-%m-%d")
+    else:
+        dates = df["review_date"].map(_date_str)
+    seen = {}
+    ids = []
+    for platform, date, name, rating, text in zip(df["platform"], dates, df["reviewer_name"], df["star_rating"],
+                                                  df["review_text"]):
+        key = _id_key(platform, date if isinstance(date, str) else None, name, text, rating)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        ids.append(_hash_id(key, occurrence))
+    return ids
+
+def _date_str(value):
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, str):
+        return value
+    return value.strftime("%Y-%m-%d")
+
+def _review_rows(establishment, source_url, df, fetched_at):
+    for r, rid in zip(df[REVIEW_COLUMNS].itertuples(index=False), review_ids(df)):
+        review_date = _date_str(r.review_date)
+        rating = None if r.star_rating is None or pd.isna(r.star_rating) else float(r.star_rating)
+        yield (establishment, source_url, rid,
+               r.platform, review_date, r.reviewer_name, rating, r.review_text,
+               int(bool(r.replied)), fetched_at)
+
+def save_establishment(conn, name, urls):
+    """Remember an establishment's platform URLs."""
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO establishments (name, data) VALUES (?, ?)",
+                     (name, json.dumps({"urls": urls})))
+
+def load_establishment(conn, name):
+    """Return the stored platform URLs for an establishment, or None."""
+    row = conn.execute("SELECT data FROM establishments WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return None
+    return json.loads(row[0] or "{}").get("urls", {})
+
+def list_establishments(conn):
+    """Names of all saved establishments, alphabetically."""
+    return [name for name, in conn.execute("SELECT name FROM establishments ORDER BY name")]
+
+def save_platform_reviews(conn, establishment, source, source_url, df, fetched_at=None):
+    """Replace the stored reviews for one establishment/platform URL."""
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    with conn:
+        conn.execute("DELETE FROM reviews WHERE establishment = ? AND source_url = ?",
+                     (establishment, source_url))
+        conn.executemany("INSERT OR REPLACE INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         _review_rows(establishment, source_url, df, fetched_at))
+        conn.execute("INSERT OR REPLACE INTO platform_fetches VALUES (?, ?, ?, ?)",
+                     (establishment, source_url, source, fetched_at))
+
+def merge_platform_reviews(conn, establishment, source, source_url, df, fetched_at=None):
+    """Add newly fetched reviews to the stored set for a platform URL.
+
+    Reviews already stored (same review ID) keep their original fetch time;
+    only their reply status is refreshed. Returns the number of new reviews.
+    """
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    count_sql = "SELECT COUNT(*) FROM reviews WHERE establishment = ? AND source_url = ?"
+    with conn:
+        before = conn.execute(count_sql, (establishment, source_url)).fetchone()[0]
+        conn.executemany(
+            "INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (establishment, source_url, review_id) DO UPDATE SET replied = excluded.replied",
+            _review_rows(establishment, source_url, df, fetched_at))
+        after = conn.execute(count_sql, (establishment, source_url)).fetchone()[0]
+        conn.execute("INSERT OR REPLACE INTO platform_fetches VALUES (?, ?, ?, ?)",
+                     (establishment, source_url, source, fetched_at))
+    return after - before
+
+def newest_review_date(conn, establishment, source_url):
+    """Date ("YYYY-MM-DD") of the newest stored review for a platform URL, or None."""
+    row = conn.execute("SELECT MAX(review_date) FROM reviews WHERE establishment = ? AND source_url = ?",
+                       (establishment, source_url)).fetchone()
+    return row[0]
+
+def last_fetched(conn, establishment, source_url):
+    """Unix time of the last successful fetch for a platform URL, or None."""
+    row = conn.execute("SELECT fetched_at FROM platform_fetches WHERE establishment = ? AND source_url = ?",
+                       (establishment, source_url)).fetchone()
+    return row[0] if row else None
+
+def load_platform_reviews(conn, establishment, source_url):
+    """Return the stored reviews for a platform URL as a normalized DataFrame."""
+    rows = conn.execute(
+        "SELECT platform, review_date, reviewer_name, star_rating, review_text, replied "
+        "FROM reviews WHERE establishment = ? AND source_url = ?",
+        (establishment, source_url)).fetchall()
+    df = pd.DataFrame(rows, columns=REVIEW_COLUMNS)
+    df["replied"] = df["replied"].astype(bool)
+    return df
+
+def is_fresh(conn, establishment, source, source_url, ttl_hours=None, now=None):
+    """Whether a platform URL was fetched within the platform's TTL."""
+    fetched_at = last_fetched(conn, establishment, source_url)
+    if fetched_at is None:
+        return False
+    ttl_hours = DEFAULT_TTL_HOURS.get(source, 24) if ttl_hours is None else ttl_hours
+    now = time.time() if now is None else now
+    return now - fetched_at <= ttl_hours * 3600
+
+_QUERY_TERMS = re.compile(r'"([^"]*)"?|(\S+)')
+
+def fts_query(text):
+    """Turn search box input into an FTS5 query.
+
+    Words must all match, "quoted text" matches as a phrase, a trailing *
+    matches any word starting with that prefix and OR between terms matches
+    either. Everything else is quoted so stray punctuation can't break the query.
+    """
+    terms = []
+    for phrase, word in _QUERY_TERMS.findall(text):
+        if word == "OR" and terms and terms[-1] != "OR":
+            terms.append("OR")
+            continue
+        prefix = word.endswith("*")
+        value = (phrase or word.rstrip("*")).strip()
+        if value:
+            terms.append('"' + value.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if terms and terms[-1] == "OR":
+        terms.pop()
+    return " ".join(terms)
+
+def search_reviews(conn, text, establishment=None, start_date=None, end_date=None, platforms=None, limit=500):
+    """Stored reviews matching search box input, best match (bm25) first.
+
+    Optionally restricted to one establishment, an inclusive date range and
+    a list of platforms. Returns a normalized DataFrame with `establishment`
+    and `rank` columns added (lower rank is a better match).
+    """
+    columns = ["establishment"] + REVIEW_COLUMNS + ["rank"]
+    query = fts_query(text)
+    if not query:
+        return pd.DataFrame(columns=columns)
+    sql = ["SELECT r.establishment, r.platform, r.review_date, r.reviewer_name, r.star_rating, "
+           "r.review_text, r.replied, bm25(reviews_fts) AS rank "
+           "FROM reviews_fts JOIN reviews r ON r.rowid = reviews_fts.rowid WHERE reviews_fts MATCH ?"]
+    params = [query]
+    if establishment is not None:
+        sql.append("AND r.establishment = ?")
+        params.append(establishment)
+    if start_date is not None:
+        sql.append("AND r.review_date >= ?")
+        params.append(_date_str(start_date))
+    if end_date is not None:
+        sql.append("AND r.review_date <= ?")
+        params.append(_date_str(end_date))
+    if platforms is not None:
+        sql.append(f"AND r.platform IN ({','.join('?' * len(platforms))})")
+        params.extend(platforms)
+    sql.append("ORDER BY rank LIMIT ?")
+    params.append(limit)
+    df = pd.DataFrame(conn.execute(" ".join(sql), params).fetchall(), columns=columns)
+    df["replied"] = df["replied"].astype(bool)
+    return df
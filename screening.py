@@ -0,0 +1,178 @@
+"""Per-review policy screening with verdicts stored in reviews.db.
+
+Every review is screened once per screener (model + prompt version) and its
+verdict kept under the review's stable ID. A violation report only sends
+the reviews that have no verdict yet, many per request, and is then
+assembled from the stored verdicts.
+"""
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import review_store
+import summarizer
+
+# Bump when SCREEN_PROMPT changes so older verdicts are not reused
+PROMPT_VERSION = 1
+SCREENER = f"{summarizer.MODEL}:v{PROMPT_VERSION}"
+# Upper bound on reviews per request, on top of the token budget
+MAX_REVIEWS_PER_REQUEST = 25
+
+SYSTEM = ("You are a professional review policy compliance analyst specializing in identifying "
+          "reviews that violate platform terms and conditions.")
+
+VIOLATION_GROUNDS = """- Fake or fraudulent reviews (e.g., reviewer never stayed)
+- Reviews from non-guests (e.g., competitors, non-customers)
+- Offensive language or hate speech
+- Personal attacks or threats
+- Confidential information exposure
+- Reviews for wrong business
+- Reviews from canceled bookings/no-shows"""
+
+SCREEN_PROMPT = """Screen each review below for clear, legitimate grounds for removal based on platform policies.
+
+IMPORTANT: Only flag reviews that have CLEAR and UNDENIABLE violations. Do not flag reviews that are simply negative or critical but legitimate. Focus strictly on identifying:
+
+""" + VIOLATION_GROUNDS + """
+
+Reply with only a JSON array holding one object per review, using the review's ID, for example:
+[{{"id": "R1", "flagged": false}}, {{"id": "R2", "flagged": true, "violations": ["Offensive language or hate speech"], "evidence": "quote from the review text", "removal_request": "draft message to the platform requesting removal"}}]
+
+Reviews to screen:
+{reviews}"""
+
+
+class ScreeningError(Exception):
+    """Raised when some screening requests failed; the others' verdicts are stored."""
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_verdicts
+    (review_id TEXT NOT NULL,
+     screener TEXT NOT NULL,
+     flagged INTEGER NOT NULL,
+     verdict TEXT NOT NULL,
+     screened_at REAL NOT NULL,
+     PRIMARY KEY (review_id, screener));
+"""
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or review_store.DB_PATH, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+def load_verdicts(conn, review_ids, screener=SCREENER):
+    """Stored verdicts for the given review IDs, as {review_id: verdict dict}."""
+    verdicts = {}
+    ids = list(review_ids)
+    # Stay under SQLite's bound-parameter limit
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        rows = conn.execute(
+            f"SELECT review_id, verdict FROM review_verdicts WHERE screener = ? "
+            f"AND review_id IN ({','.join('?' * len(chunk))})", [screener, *chunk])
+        verdicts.update((review_id, json.loads(verdict)) for review_id, verdict in rows)
+    return verdicts
+
+def save_verdicts(conn, verdicts, screener=SCREENER, now=None):
+    now = time.time() if now is None else now
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO review_verdicts VALUES (?, ?, ?, ?, ?)",
+                         [(review_id, screener, int(bool(v.get("flagged"))), json.dumps(v), now)
+                          for review_id, v in verdicts.items()])
+
+def parse_verdicts(text, local_ids):
+    """Map the model's JSON reply back to review IDs; unknown or missing IDs are dropped."""
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("Screening reply did not contain a JSON array")
+    verdicts = {}
+    for item in json.loads(text[start:end + 1]):
+        review_id = local_ids.get(str(item.get("id")))
+        if review_id is not None:
+            verdicts[review_id] = {
+                "flagged": bool(item.get("flagged")),
+                "violations": item.get("violations") or [],
+                "evidence": item.get("evidence") or "",
+                "removal_request": item.get("removal_request") or "",
+            }
+    return verdicts
+
+def screen_batch(client, ids, blocks):
+    """Screen one batch of formatted reviews and return {review_id: verdict}."""
+    local_ids = {f"R{i + 1}": review_id for i, review_id in enumerate(ids)}
+    reviews = "\n".join(f"[R{i + 1}] {block}" for i, block in enumerate(blocks))
+    reply = summarizer.chat(client, SYSTEM, SCREEN_PROMPT.format(reviews=reviews),
+                            max_tokens=summarizer.COMPLETION_TOKENS, purpose="report")
+    return parse_verdicts(reply, local_ids)
+
+def screening_batches(ids, blocks, budget=summarizer.REVIEW_TOKEN_BUDGET):
+    batches = []
+    position = 0
+    for packed in summarizer.batch_blocks(blocks, budget):
+        for start in range(0, len(packed), MAX_REVIEWS_PER_REQUEST):
+            chunk = packed[start:start + MAX_REVIEWS_PER_REQUEST]
+            batches.append((ids[position:position + len(chunk)], chunk))
+            position += len(chunk)
+    return batches
+
+def screen_reviews(client, df, rescreen=False, max_workers=summarizer.MAX_WORKERS, on_batch=None):
+    """Make sure every review in `df` has a verdict; returns {review_id: verdict}.
+
+    Only reviews without a stored verdict are sent (all of them with
+    `rescreen`). After each batch is stored, `on_batch(verdicts)` is called
+    with all verdicts so far, so callers can show the report as it fills in.
+    """
+    ids = review_store.review_ids(df)
+    blocks = summarizer.format_reviews(df)
+    conn = connect()
+    try:
+        verdicts = {} if rescreen else load_verdicts(conn, ids)
+        pending = [(i, b) for i, b in zip(ids, blocks) if i not in verdicts]
+        if not pending:
+            return verdicts
+        batches = screening_batches([i for i, _ in pending], [b for _, b in pending])
+        errors = []
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [pool.submit(screen_batch, client, batch_ids, batch_blocks) for batch_ids, batch_blocks in batches]
+            for future in as_completed(futures):
+                try:
+                    batch_verdicts = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                # Stored as each batch lands, so an interrupted or failed run resumes where it stopped
+                save_verdicts(conn, batch_verdicts)
+                verdicts.update(batch_verdicts)
+                if on_batch is not None:
+                    on_batch(verdicts)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if errors:
+            raise ScreeningError(f"{len(errors)} of {len(batches)} screening requests failed: {errors[0]}")
+        return verdicts
+    finally:
+        conn.close()
+
+def build_report(df, verdicts, start_date, end_date):
+    """Markdown violation report for the reviews in `df` from their verdicts."""
+    ids = review_store.review_ids(df)
+    flagged = [(row, verdicts[i]) for i, row in zip(ids, df.itertuples(index=False))
+               if verdicts.get(i, {}).get("flagged")]
+    screened = sum(1 for i in ids if i in verdicts)
+    lines = [f"Screened {screened:,} of {len(ids):,} reviews from {start_date} to {end_date}."]
+    if not flagged:
+        lines.append("\nNo reviews were found that could be legitimately challenged.")
+        return "\n".join(lines)
+    for n, (row, verdict) in enumerate(flagged, start=1):
+        lines += [
+            f"\n#### {n}. {row.review_date:%Y-%m-%d} · {row.platform} · {row.star_rating} stars",
+            f"**Reviewer:** {row.reviewer_name}",
+            f"**Violation(s):** {', '.join(verdict['violations']) or 'Not specified'}",
+            f"**Evidence:** \"{verdict['evidence']}\"",
+            f"**Draft removal request:**\n\n{verdict['removal_request']}",
+        ]
+    return "\n".join(lines)
@@ -0,0 +1,181 @@
+"""Process-wide store of loaded datasets, shared by every session of the server.
+
+Sessions asking for the same key share one loaded value instead of each
+loading and holding its own:
+
+- Loads are single-flight: while one session loads a key, the others that
+  ask for it wait for that load and get its result (or its exception).
+- Each session holds a Lease on the value it uses. A lease is released
+  explicitly or, through weakref.finalize, when the session state holding
+  it is garbage collected, so abandoned sessions don't pin datasets.
+- Values nobody holds a lease on stay cached for the next session, but once
+  the total size exceeds the memory budget the least recently used of them
+  are evicted. Values in use are never evicted; dropping them would free
+  nothing while a session still references them.
+
+Nothing here imports Streamlit; app.py keeps one store per process with
+st.cache_resource.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# Bytes of unleased datasets kept before the least recently used are evicted
+MEMORY_BUDGET = int(float(os.getenv("REVIEWS_MEMORY_BUDGET_MB", "1024")) * 1e6)
+
+
+def frame_bytes(value):
+    """Deep memory use of a DataFrame, or of the first DataFrame in a tuple."""
+    df = value[0] if isinstance(value, tuple) else value
+    return int(df.memory_usage(deep=True).sum())
+
+
+class _Entry:
+    def __init__(self, value, size, loaded_at, started_at):
+        self.value = value
+        self.size = size
+        self.loaded_at = loaded_at
+        # Wall-clock time the load began; data changed after it may be missing from the value
+        self.started_at = started_at
+        self.refs = 0
+
+
+class _Flight:
+    """A load in progress; waiters block on `done`."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+        # Set when the leader was interrupted rather than failed; waiters then load themselves
+        self.abandoned = False
+        self.waiters = 0
+
+
+class Lease:
+    """A session's hold on a stored value; `value` stays valid after release."""
+
+    def __init__(self, store, key, entry):
+        self.key = key
+        self.value = entry.value
+        # The callback must not reference the lease, or it would never be collected
+        self._finalizer = weakref.finalize(self, store._release, entry)
+
+    def release(self):
+        """Give the value back; safe to call more than once."""
+        self._finalizer()
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+
+class SharedStore:
+    """Keyed values loaded once per process, reference counted and evicted LRU under a byte budget."""
+
+    def __init__(self, budget=MEMORY_BUDGET, sizeof=frame_bytes):
+        self.budget = budget
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+
+    def acquire(self, key, load, changed_at=None, refresh=False, on_wait=None):
+        """Lease the value for `key`, calling `load()` if needed; None if `load()` returns None.
+
+        A stored value whose load began before `changed_at` (Unix time the
+        source data last changed), or any stored value with `refresh`, is
+        reloaded. If another session is already loading the key, `on_wait()`
+        is called and the result of that load is shared.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                fresh = entry is not None and (changed_at is None or entry.started_at >= changed_at)
+                if fresh and not refresh:
+                    entry.refs += 1
+                    self._entries.move_to_end(key)
+                    return Lease(self, key, entry)
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                else:
+                    flight.waiters += 1
+            if leader:
+                break
+
+            if on_wait is not None:
+                on_wait()
+                on_wait = None
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.abandoned:
+                # Try again, loading in this thread unless another waiter got there first
+                continue
+            # The leader counted this waiter's reference when it stored the entry
+            return Lease(self, key, flight.entry) if flight.entry is not None else None
+
+        started_at = time.time()
+        try:
+            value = load()
+        except Exception as e:
+            with self._lock:
+                del self._flights[key]
+                flight.error = e
+            flight.done.set()
+            raise
+        except BaseException:
+            # An interruption of the leader's own thread (e.g. a Streamlit rerun or stop)
+            # is not the load's result; it must not be raised in the waiters' threads
+            with self._lock:
+                del self._flights[key]
+                flight.abandoned = True
+            flight.done.set()
+            raise
+        with self._lock:
+            del self._flights[key]
+            if value is not None:
+                entry = _Entry(value, self.sizeof(value), time.monotonic(), started_at)
+                entry.refs = 1 + flight.waiters
+                flight.entry = entry
+                # A replaced entry stays alive for the sessions still leasing it, but no longer counts
+                self._entries.pop(key, None)
+                self._entries[key] = entry
+                self._evict()
+        flight.done.set()
+        return Lease(self, key, flight.entry) if flight.entry is not None else None
+
+    def discard(self, match):
+        """Drop the stored values whose key satisfies `match(key)`, so the next acquire reloads them.
+
+        Sessions still leasing a dropped value keep it until they release it.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if match(key)]:
+                del self._entries[key]
+
+    def _release(self, entry):
+        with self._lock:
+            entry.refs -= 1
+            self._evict()
+
+    def _evict(self):
+        # Called with the lock held
+        total = sum(e.size for e in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.budget:
+                break
+            entry = self._entries[key]
+            if entry.refs <= 0:
+                del self._entries[key]
+                total -= entry.size
+
+    def stats(self):
+        """[(key, bytes, leases, age in seconds)] of the stored values, least recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, e.size, e.refs, now - e.loaded_at) for key, e in self._entries.items()]
@@ -0,0 +1,79 @@
+"""Columnar snapshots of normalized reviews as Parquet.
+
+Snapshots live under SNAPSHOT_DIR in a hive-style layout,
+`establishment=<name>/platform=<platform>/*.parquet`, one directory per
+establishment and platform. Rows are sorted by review date and written in
+row groups, so a date-range load only reads the row groups (and with
+`columns`, only the column chunks) it needs, and the establishment and
+platform filters prune whole directories.
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from ingestion import REVIEW_COLUMNS
+
+SNAPSHOT_DIR = os.getenv("REVIEWS_SNAPSHOT_DIR",
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"))
+# Rows per Parquet row group; each group's date range is in its statistics
+ROW_GROUP_SIZE = 16384
+
+SCHEMA = pa.schema([
+    ("review_date", pa.date32()),
+    ("reviewer_name", pa.string()),
+    ("star_rating", pa.float32()),
+    ("review_text", pa.string()),
+    ("replied", pa.bool_()),
+    ("establishment", pa.string()),
+    ("platform", pa.string()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("establishment", pa.string()), ("platform", pa.string())]),
+                               flavor="hive")
+
+
+def write_snapshot(df, establishment, root=None):
+    """Write normalized reviews as the establishment's snapshot, replacing its platforms present in `df`."""
+    table = pd.DataFrame({
+        "review_date": pd.to_datetime(df["review_date"], errors="coerce").dt.date,
+        "reviewer_name": df["reviewer_name"].astype(object).where(df["reviewer_name"].notna(), None),
+        "star_rating": pd.to_numeric(df["star_rating"], errors="coerce"),
+        "review_text": df["review_text"].astype(object).where(df["review_text"].notna(), None),
+        "replied": df["replied"].fillna(False).astype(bool),
+        "establishment": establishment,
+        "platform": df["platform"],
+    }).sort_values("review_date", kind="stable", na_position="last")
+    ds.write_dataset(
+        pa.Table.from_pandas(table, schema=SCHEMA, preserve_index=False), root or SNAPSHOT_DIR,
+        format="parquet", partitioning=PARTITIONING, existing_data_behavior="delete_matching",
+        basename_template="reviews-{i}.parquet", max_rows_per_group=ROW_GROUP_SIZE,
+        min_rows_per_group=min(ROW_GROUP_SIZE, max(len(table), 1)),
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"))
+
+def load_snapshots(root=None, establishment=None, platforms=None, start_date=None, end_date=None, columns=None):
+    """Reviews from the snapshots as a reviews DataFrame, newest first.
+
+    Only the partitions of `establishment` and `platforms` are opened, only
+    row groups overlapping start_date..end_date (inclusive) are read and,
+    with `columns`, only those columns (a subset of REVIEW_COLUMNS).
+    """
+    root = root or SNAPSHOT_DIR
+    if not os.path.isdir(root):
+        return pd.DataFrame(columns=columns or REVIEW_COLUMNS)
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    condition = None
+    for clause in (
+        ds.field("establishment") == establishment if establishment is not None else None,
+        ds.field("platform").isin(list(platforms)) if platforms is not None else None,
+        ds.field("review_date") >= pd.Timestamp(start_date).date() if start_date is not None else None,
+        ds.field("review_date") <= pd.Timestamp(end_date).date() if end_date is not None else None,
+    ):
+        if clause is not None:
+            condition = clause if condition is None else condition & clause
+    columns = list(columns or REVIEW_COLUMNS)
+    df = dataset.to_table(columns=columns, filter=condition).to_pandas()
+    if "review_date" in df:
+        df["review_date"] = pd.to_datetime(df["review_date"])
+        df = df.sort_values("review_date", ascending=False, kind="stable", ignore_index=True)
+    return df
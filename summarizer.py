@@ -0,0 +1,274 @@
+"""GPT summaries over any number of reviews.
+
+Reviews that fit in one prompt are sent as before. Larger ranges are split
+into token-budgeted batches that are analysed in parallel (map) and then
+merged into a single answer (reduce), so the prompt never outgrows the
+model's context window.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import llm_cache
+import metrics
+import review_store
+
+MODEL = "gpt-4"
+CONTEXT_TOKENS = 8192
+COMPLETION_TOKENS = 2000
+# Completion budget of each map call; its output is part of a reduce prompt
+PARTIAL_TOKENS = 700
+# Room left for the instructions around the reviews
+PROMPT_OVERHEAD_TOKENS = 600
+REVIEW_TOKEN_BUDGET = CONTEXT_TOKENS - COMPLETION_TOKENS - PROMPT_OVERHEAD_TOKENS
+# Concurrent OpenAI requests during the map step
+MAX_WORKERS = 4
+
+SUMMARY_SYSTEM = "You are a professional business analyst specializing in customer feedback analysis."
+
+SUMMARY_SECTIONS = """1. Overall Sentiment
+2. Positive Highlights
+3. Areas for Improvement
+4. Actionable Suggestions
+5. Unreplied Reviews (if any)"""
+
+SUMMARY_PROMPT = """Analyze these reviews from {start_date} to {end_date} and provide a structured summary with the following sections:
+
+""" + SUMMARY_SECTIONS + """
+
+Reviews to analyze:
+{reviews}
+
+Please provide a professional, concise, and solution-oriented summary that helps managers take efficient actions based on customer feedback insights."""
+
+SUMMARY_MAP_PROMPT = """These reviews, from {start_date} to {end_date}, are one batch of a larger set. Write compact notes on this batch only, under the following sections, so they can later be merged with notes on the other batches:
+
+""" + SUMMARY_SECTIONS + """
+
+Note how many reviews each point comes from, the platforms involved, and the date, platform and rating of each unreplied review.
+
+Reviews to analyze:
+{reviews}"""
+
+SUMMARY_REDUCE_PROMPT = """Below are notes on consecutive batches of reviews from {start_date} to {end_date}. Merge them into one structured summary of all the reviews with the following sections:
+
+""" + SUMMARY_SECTIONS + """
+
+Weigh each point by how many reviews it comes from rather than by how many batches mention it.
+
+Batch notes:
+{partials}
+
+Please provide a professional, concise, and solution-oriented summary that helps managers take efficient actions based on customer feedback insights."""
+
+THEMES_PROMPT = """Below are the themes found in {count} reviews from {start_date} to {end_date}, each with its review count, average rating, monthly rating trend, number of unreplied reviews and a few representative quotes. Using them, provide a structured summary with the following sections:
+
+""" + SUMMARY_SECTIONS + """
+
+Themes:
+{themes}
+
+Please provide a professional, concise, and solution-oriented summary that helps managers take efficient actions based on customer feedback insights."""
+
+def estimate_tokens(text):
+    """Rough token count; errs high so batches stay inside the context window."""
+    return len(text) // 3 + 1
+
+def format_reviews(df):
+    """One prompt block per review, built column-wise instead of with iterrows."""
+    if df.empty:
+        return []
+    blocks = ("Date: " + df["review_date"].dt.strftime("%Y-%m-%d") + "\n"
+              + "Platform: " + df["platform"].astype(str) + "\n"
+              + "Rating: " + df["star_rating"].astype(str) + " stars\n"
+              + "Review: " + df["review_text"].astype(str) + "\n"
+              + "Replied: " + df["replied"].map({True: "Yes", False: "No"}).fillna("No") + "\n"
+              + "---\n")
+    return blocks.tolist()
+
+def batch_blocks(blocks, budget=REVIEW_TOKEN_BUDGET):
+    """Pack consecutive blocks into batches of at most `budget` estimated tokens."""
+    batches, current, used = [], [], 0
+    max_chars = budget * 3
+    for block in blocks:
+        if len(block) > max_chars:
+            block = block[:max_chars - 20] + "...[truncated]\n---\n"
+        tokens = estimate_tokens(block)
+        if current and used + tokens > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(block)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def chat(client, system, prompt, max_tokens=COMPLETION_TOKENS, model=MODEL, purpose="summary"):
+    """One chat completion; returns the message text.
+
+    `purpose` labels the request's latency and token usage in metrics.
+    """
+    with metrics.timer("openai_request_seconds", purpose=purpose, model=model):
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=max_tokens
+        )
+    usage = getattr(response, "usage", None)
+    if metrics.ENABLED and usage is not None:
+        _count_tokens(purpose, model, usage.prompt_tokens, usage.completion_tokens)
+    return response.choices[0].message.content
+
+def _count_tokens(purpose, model, prompt_tokens, completion_tokens):
+    metrics.inc("openai_requests_total", purpose=purpose, model=model)
+    metrics.inc("openai_tokens_total", prompt_tokens, purpose=purpose, model=model, kind="prompt")
+    metrics.inc("openai_tokens_total", completion_tokens, purpose=purpose, model=model, kind="completion")
+
+def batch_reviews(df, budget=REVIEW_TOKEN_BUDGET):
+    """Split `df` into chronological batches that never straddle a calendar month.
+
+    Returns `(ids, blocks, first_date, last_date)` tuples. Keeping batch
+    boundaries on month edges means a slightly different date range still
+    produces mostly the same batches, so their cached results are reused.
+    """
+    ordered = df.sort_values("review_date", kind="stable")
+    blocks = format_reviews(ordered)
+    ids = review_store.review_ids(ordered)
+    dates = ordered["review_date"].dt.strftime("%Y-%m-%d").tolist()
+    months = [d[:7] for d in dates]
+    batches = []
+    start = 0
+    while start < len(blocks):
+        end = start
+        while end < len(blocks) and months[end] == months[start]:
+            end += 1
+        position = start
+        for packed in batch_blocks(blocks[start:end], budget):
+            stop = position + len(packed)
+            batches.append((ids[position:stop], packed, dates[position], dates[stop - 1]))
+            position = stop
+        start = end
+    return batches
+
+def chat_stream(client, system, prompt, max_tokens=COMPLETION_TOKENS, model=MODEL, purpose="summary"):
+    """Streaming chat(); yields the text received so far after each chunk.
+
+    The response is closed however iteration ends, so abandoning the
+    generator (e.g. when the page is interrupted) cancels the request.
+    Streamed responses carry no usage, so their tokens are estimated.
+    """
+    started = time.perf_counter()
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    text = ""
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                text += chunk.choices[0].delta.content
+                yield text
+    finally:
+        stream.close()
+        if metrics.ENABLED:
+            metrics.observe("openai_request_seconds", time.perf_counter() - started, purpose=purpose, model=model)
+            _count_tokens(purpose, model, estimate_tokens(system) + estimate_tokens(prompt), estimate_tokens(text))
+
+def cached_chat(client, system, prompt, key, use_cache=True, max_tokens=COMPLETION_TOKENS, on_text=None):
+    """chat(), answered from the on-disk cache when the same key was seen before.
+
+    With `on_text`, the answer is streamed and `on_text(text_so_far)` called
+    as it arrives. Only complete answers are cached.
+    """
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+    if on_text is None:
+        result = chat(client, system, prompt, max_tokens=max_tokens)
+    else:
+        result = ""
+        for result in chat_stream(client, system, prompt, max_tokens=max_tokens):
+            on_text(result)
+    llm_cache.put(key, result)
+    return result
+
+def map_reduce(client, system, df, start_date, end_date, prompt, map_prompt, reduce_prompt,
+               max_workers=MAX_WORKERS, budget=REVIEW_TOKEN_BUDGET, use_cache=True, on_text=None,
+               on_progress=None):
+    """Answer `prompt` over the reviews in `df`, splitting into map/reduce calls when they don't fit.
+
+    The whole answer and every batch answer are cached by model, template and
+    the IDs of the reviews involved; the whole answer also by the date range
+    its prompt names. With `on_text`, the final answer is
+    streamed through it as it is generated; `on_progress(message)` reports
+    finished map batches.
+    """
+    key = llm_cache.cache_key(MODEL, system + prompt, review_store.review_ids(df), start_date, end_date)
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+
+    blocks = format_reviews(df)
+    if sum(estimate_tokens(block) for block in blocks) <= budget:
+        reviews = "\n".join(blocks)
+        return cached_chat(client, system, prompt.format(start_date=start_date, end_date=end_date, reviews=reviews),
+                           key, use_cache=False, on_text=on_text)
+
+    def run_map(batch):
+        ids, texts, first, last = batch
+        return cached_chat(client, system,
+                           map_prompt.format(start_date=first, end_date=last, reviews="\n".join(texts)),
+                           llm_cache.cache_key(MODEL, system + map_prompt, ids),
+                           use_cache=use_cache, max_tokens=PARTIAL_TOKENS)
+
+    batches = batch_reviews(df, budget)
+    partials = [None] * len(batches)
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {pool.submit(run_map, batch): i for i, batch in enumerate(batches)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            partials[futures[future]] = future.result()
+            if on_progress is not None:
+                on_progress(f"Summarized batch {done} of {len(batches)}...")
+    finally:
+        # If the caller is interrupted, don't start the batches still queued
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # Merge partials in as many rounds as it takes to fit one prompt
+    while True:
+        notes = [f"Batch {i + 1}:\n{p}\n" for i, p in enumerate(partials)]
+        groups = batch_blocks(notes, budget)
+        if len(groups) == 1:
+            return cached_chat(client, system,
+                               reduce_prompt.format(start_date=start_date, end_date=end_date,
+                                                    partials="\n".join(groups[0])),
+                               key, use_cache=False, on_text=on_text)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            partials = list(pool.map(
+                lambda group: chat(client, system,
+                                   reduce_prompt.format(start_date=start_date, end_date=end_date,
+                                                        partials="\n".join(group)),
+                                   max_tokens=PARTIAL_TOKENS),
+                groups))
+
+def summarize_reviews(client, df, start_date, end_date, **kwargs):
+    """Five-section summary of the reviews in `df`, however many there are."""
+    return map_reduce(client, SUMMARY_SYSTEM, df, start_date, end_date,
+                      SUMMARY_PROMPT, SUMMARY_MAP_PROMPT, SUMMARY_REDUCE_PROMPT, **kwargs)
+
+def summarize_themes(client, digest, review_count, start_date, end_date, use_cache=True, on_text=None):
+    """Five-section summary from a theme digest (see themes.theme_digest) instead of the reviews themselves."""
+    prompt = THEMES_PROMPT.format(count=review_count, start_date=start_date, end_date=end_date, themes=digest)
+    key = llm_cache.cache_key(MODEL, SUMMARY_SYSTEM + THEMES_PROMPT, [], digest, review_count, start_date, end_date)
+    return cached_chat(client, SUMMARY_SYSTEM, prompt, key, use_cache=use_cache, on_text=on_text)
@@ -0,0 +1,34 @@
+import pandas as pd
+
+import dedup
+
+STAY = ("We stayed here to celebrate an anniversary. It is a delightful hotel in the heart of town, "
+        "the staff were attentive and the breakfast was excellent.")
+
+
+def reviews(rows):
+    return pd.DataFrame(rows, columns=["platform", "review_date", "reviewer_name", "star_rating", "review_text"])
+
+
+def test_cross_posted_reviews_share_a_cluster():
+    df = reviews([
+        ["Booking.com", "2024-12-14", "Ricci", 5.0, f"Liked: {STAY}"],
+        ["TripAdvisor", "2024-12-15", "Ricci A", 5.0, f"Title: We'll be back!\n{STAY}"],
+        ["Google", "2024-12-14", "Someone Else", 5.0, STAY.replace("excellent", "excellent!!")],
+        ["Google", "2024-12-14", "Ann", 4.0, "Lovely rooms with sea views, but parking was difficult and the bar closed early."],
+        ["Expedia", "2023-01-02", "Ricci", 5.0, STAY],
+    ])
+
+    clusters = dedup.duplicate_clusters(df)
+
+    assert clusters.tolist() == [0, 0, 0, 3, 4]
+    assert dedup.unique_reviews(df.assign(duplicate_cluster=clusters))["platform"].tolist() == [
+        "Booking.com", "Google", "Expedia"]
+
+
+def test_short_generic_reviews_are_not_merged():
+    df = reviews([["Google", "2024-05-01", "Ann", 5.0, "Great stay"],
+                  ["TripAdvisor", "2024-05-01", "Bob", 5.0, "Great stay!"]])
+
+    assert dedup.duplicate_clusters(df).tolist() == [0, 1]
+    assert dedup.duplicate_clusters(df.iloc[:0]).tolist() == []
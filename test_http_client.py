@@ -0,0 +1,71 @@
+import time
+
+import pytest
+import requests
+
+import http_client
+
+
+def response(status, headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers or {})
+    resp._content = b"{}"
+    resp._content_consumed = True
+    return resp
+
+
+def fake_client(monkeypatch, outcomes, **kwargs):
+    """A client whose session answers with `outcomes` in turn; returns it, the methods sent and the sleeps made."""
+    client = http_client.HttpClient(rate=None, **kwargs)
+    outcomes, calls, sleeps = iter(outcomes), [], []
+
+    def request(method, url, **kw):
+        calls.append(method)
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(client.session, "request", request)
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+    return client, calls, sleeps
+
+
+def test_get_retries_transient_failures_with_backoff(monkeypatch):
+    client, calls, sleeps = fake_client(
+        monkeypatch, [requests.ConnectionError("reset"), response(502), response(200)], backoff_base=1)
+    assert client.get("https://example.com").status_code == 200
+    assert len(calls) == 3
+    # Full jitter: each delay is at most base * 2**attempt
+    assert 0 <= sleeps[0] <= 1 and 0 <= sleeps[1] <= 2
+
+
+def test_retry_after_is_honoured_and_retries_run_out(monkeypatch):
+    client, calls, sleeps = fake_client(
+        monkeypatch, [response(429, {"Retry-After": "7"})] * 3, max_retries=2)
+    assert client.get("https://example.com").status_code == 429
+    assert len(calls) == 3
+    assert sleeps == [7.0, 7.0]
+
+
+def test_post_is_only_retried_when_it_was_not_processed(monkeypatch):
+    client, calls, _ = fake_client(monkeypatch, [response(429), response(201)])
+    assert client.post("https://example.com").status_code == 201
+
+    client, calls, _ = fake_client(monkeypatch, [response(503), response(201)])
+    assert client.post("https://example.com").status_code == 503
+    assert len(calls) == 1
+
+    client, calls, _ = fake_client(monkeypatch, [requests.ReadTimeout("slow")])
+    with pytest.raises(requests.ReadTimeout):
+        client.post("https://example.com")
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = http_client.TokenBucket(rate=100, capacity=5)
+    started = time.monotonic()
+    for _ in range(25):
+        bucket.acquire()
+    # Five tokens come from the burst, the other twenty at 100 per second
+    assert time.monotonic() - started >= 0.19
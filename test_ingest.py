@@ -0,0 +1,50 @@
+import subprocess
+import sys
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+import ingest
+import portfolio
+import review_store
+
+
+def test_cli_imports_no_ui_or_llm_libraries():
+    code = ("import sys, ingest, portfolio; "
+            "print(sorted(m for m in ('streamlit', 'openai', 'plotly') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_cli_refreshes_one_establishment_into_the_store(tmp_path, monkeypatch, capsys):
+    def ingest_platform(name, actor_id, normalize_fn, api_token, start_url, emit, since=None):
+        emit("progress", f"Fetching reviews for {name}...")
+        return pd.DataFrame([{"platform": name, "review_date": "2024-05-01", "reviewer_name": "Ann",
+                              "star_rating": 4.0, "review_text": "Fine", "replied": False}])
+
+    monkeypatch.setattr(portfolio, "ingest_platform", ingest_platform)
+    monkeypatch.setattr(portfolio, "RUN_START_INTERVAL", 0)
+    monkeypatch.setattr(review_store, "DB_PATH", review_store.DB_PATH)
+    db = str(tmp_path / "reviews.db")
+
+    status = ingest.main(["--establishment", "Stanwell House", "--url", "TripAdvisor=https://t/1",
+                          "--token", "token", "--db", db])
+
+    assert status == 0
+    assert "Stanwell House: saved 1 TripAdvisor reviews" in capsys.readouterr().out
+    with closing(review_store.connect(db)) as conn:
+        assert review_store.load_establishment(conn, "Stanwell House") == {"TripAdvisor": "https://t/1"}
+        assert len(review_store.load_platform_reviews(conn, "Stanwell House", "https://t/1")) == 1
+
+
+def test_cli_rejects_unknown_platforms_and_establishments_without_urls(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(review_store, "DB_PATH", review_store.DB_PATH)
+    db = str(tmp_path / "reviews.db")
+    with pytest.raises(SystemExit) as error:
+        ingest.main(["--establishment", "Stanwell House", "--url", "Tripadvisor=https://t/1",
+                     "--token", "token", "--db", db])
+    assert error.value.code == 2 and "Tripadvisor" in capsys.readouterr().err
+
+    assert ingest.main(["--establishment", "Unknown Inn", "--token", "token", "--db", db]) == 1
+    assert "No platform URLs for Unknown Inn" in capsys.readouterr().err
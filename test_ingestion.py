@@ -0,0 +1,170 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import ingestion
+import review_store
+from benchmarks.synthetic import raw_items
+
+
+def test_ingest_platforms_runs_concurrently(fake_apify, monkeypatch):
+    # Each run's wait only returns once both runs are being waited on at the same time;
+    # run one after the other, the first would time out and its platform fail
+    barrier = threading.Barrier(2)
+    wait_for_run = fake_apify.wait_for_run
+
+    def wait_together(run_id, api_token, *args, **kwargs):
+        barrier.wait(timeout=10)
+        return wait_for_run(run_id, api_token, *args, **kwargs)
+
+    monkeypatch.setattr(ingestion, "wait_for_run", wait_together)
+    fake_apify.items = {"trip": [{"title": "Lovely", "text": "Great stay", "rating": 5,
+                                  "publishedDate": "2024-05-01", "user": {"name": "Ann"}}],
+                        "google": [{"reviewOrigin": "Tripadvisor", "text": "Skipped"}]}
+    platforms = [("TripAdvisor", "trip", ingestion.normalize_tripadvisor_review),
+                 ("Google Maps", "google", ingestion.normalize_google_review)]
+    urls = {"TripAdvisor": "https://example.com/t", "Google Maps": "https://example.com/g"}
+
+    events = list(ingestion.ingest_platforms(platforms, urls, "token"))
+
+    assert [kind for _, kind, _ in events if kind == "error"] == []
+    done = {name: payload for name, kind, payload in events if kind == "done"}
+    assert list(done["TripAdvisor"].columns) == ingestion.REVIEW_COLUMNS
+    assert done["TripAdvisor"].iloc[0]["review_text"] == "Title: Lovely\nGreat stay"
+    assert done["Google Maps"].empty
+
+
+def test_ingest_platforms_reports_failed_runs(fake_apify):
+    fake_apify.failed.add("broken")
+    platforms = [("Expedia", "broken", ingestion.normalize_expedia_review)]
+
+    events = list(ingestion.ingest_platforms(platforms, {"Expedia": "https://example.com/e"}, "token"))
+
+    name, kind, error = events[-1]
+    assert (name, kind) == ("Expedia", "error")
+    assert isinstance(error, ingestion.ActorRunError)
+    assert error.run_data["data"]["status"] == "FAILED"
+
+
+def test_ingest_platforms_skips_platforms_without_url():
+    assert list(ingestion.ingest_platforms(ingestion.PLATFORMS, {}, "token")) == []
+
+
+def test_trigger_actor_requests_only_the_delta(monkeypatch):
+    payloads = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"data": {"id": "run-1"}}
+
+    def post(url, json):
+        payloads.append(json)
+        return Response()
+
+    monkeypatch.setattr(ingestion.http_client, "post", post)
+    ingestion.trigger_actor("compass~google-maps-reviews-scraper", "token", "https://example.com/g")
+    ingestion.trigger_actor("compass~google-maps-reviews-scraper", "token", "https://example.com/g", since="2024-05-01")
+    ingestion.trigger_actor("maxcopell~tripadvisor-reviews", "token", "https://example.com/t", since="2024-05-01")
+    ingestion.trigger_actor("voyager~booking-reviews-scraper", "token", "https://example.com/b")
+    ingestion.trigger_actor("voyager~booking-reviews-scraper", "token", "https://example.com/b", since="2024-05-01")
+
+    full, google_delta, tripadvisor_delta, booking_full, booking_delta = payloads
+    assert full["maxReviews"] == 1000 and "reviewsStartDate" not in full
+    assert google_delta["maxReviews"] == ingestion.INCREMENTAL_MAX_REVIEWS
+    assert google_delta["reviewsStartDate"] == "2024-05-01"
+    assert tripadvisor_delta["maxReviews"] == ingestion.INCREMENTAL_MAX_REVIEWS
+    assert "reviewsStartDate" not in tripadvisor_delta and "cutoffDate" not in tripadvisor_delta
+    # Capped deltas must be the newest reviews, whatever the full sync sorts by
+    assert booking_full["sortBy"] == "review_score_and_price"
+    assert booking_delta["sortBy"] == "f_recent_desc" and booking_delta["cutoffDate"] == "2024-05-01"
+    assert google_delta["sortBy"] == tripadvisor_delta["sortBy"] == "Most recent"
+
+
+def test_wait_for_run_long_polls_and_backs_off_when_answered_early(monkeypatch):
+    statuses = iter(["RUNNING", "RUNNING", "READY", "SUCCEEDED"])
+    requests_params, sleeps = [], []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"data": {"status": next(statuses)}}
+
+    def get(url, params=None, timeout=None):
+        requests_params.append(params)
+        return Response()
+
+    monkeypatch.setattr(ingestion.http_client, "get", get)
+    monkeypatch.setattr(ingestion.time, "sleep", sleeps.append)
+
+    run_data = ingestion.wait_for_run("run-1", "token")
+
+    assert run_data["data"]["status"] == "SUCCEEDED"
+    assert len(requests_params) == 4
+    assert all(p["waitForFinish"] == ingestion.WAIT_FOR_FINISH_SECS for p in requests_params)
+    # The fake answers instantly, as if long polling were unsupported
+    assert sleeps == [0.5, 1.0, 2.0]
+
+
+def test_ingest_platform_fetches_the_dataset_in_pages(fake_apify, monkeypatch):
+    items = raw_items("TripAdvisor", 25)
+    fake_apify.items["trip"] = items
+    monkeypatch.setattr(ingestion, "DATASET_PAGE_SIZE", 10)
+
+    df = ingestion.ingest_platform("TripAdvisor", "trip", ingestion.normalize_tripadvisor_review,
+                                   "token", "https://example.com/t", lambda kind, message: None)
+
+    fields = ingestion.DATASET_FIELDS[ingestion.normalize_tripadvisor_review]
+    assert fake_apify.pages == [("trip", 0, 10, fields), ("trip", 10, 10, fields), ("trip", 20, 10, fields)]
+    pd.testing.assert_frame_equal(df, ingestion.normalize_reviews(ingestion.normalize_tripadvisor_review, items))
+
+
+# Raw items the synthetic generator doesn't produce
+EDGE_CASES = {
+    "Booking.com": [{}, {"rating": 7.3, "reviewTitle": "", "likedText": "Bed", "dislikedText": None,
+                         "reviewDate": "Sept 3, 2024"},
+                    {"rating": 8.5, "reviewDate": "", "likedText": "", "dislikedText": "Noise\n"}],
+    "Expedia": [{"reviewScoreWithDescription": {"label": "Excellent"}, "text": "  No score  "},
+                {"reviewScoreWithDescription": {"label": " 9 out of 10"}, "title": "Hi",
+                 "text": "There", "submissionTime": {"longDateFormat": "3 September 2024"}}],
+    "TripAdvisor": [{"title": None, "text": "Untitled", "publishedDate": None}],
+    "Google Maps": [{"reviewOrigin": "Google", "text": "", "textTranslated": "Translated ",
+                     "publishedAtDate": "2024-12-31T23:30:00.000+01:00"},
+                    {"reviewOrigin": "Google", "text": None, "textTranslated": None}],
+}
+
+
+@pytest.mark.parametrize("name, normalize_fn", [(name, fn) for name, _, fn in ingestion.PLATFORMS])
+def test_batch_normalization_matches_row_normalizers(name, normalize_fn):
+    items = raw_items(name) + EDGE_CASES[name]
+    rows = [r for r in [normalize_fn(r) for r in items] if r is not None]
+    expected = pd.DataFrame(rows, columns=ingestion.REVIEW_COLUMNS)
+
+    actual = ingestion.BATCH_NORMALIZERS[normalize_fn](items)
+
+    pd.testing.assert_frame_equal(actual, expected)
+    assert ingestion.BATCH_NORMALIZERS[normalize_fn]([]).columns.tolist() == ingestion.REVIEW_COLUMNS
+
+
+def test_compact_reviews_keeps_values_and_review_ids():
+    df = pd.concat([ingestion.normalize_reviews(fn, raw_items(name, 200)) for name, _, fn in ingestion.PLATFORMS],
+                   ignore_index=True)
+    df.loc[0, "reviewer_name"] = None
+    df["review_date"] = pd.to_datetime(df["review_date"])
+
+    compact = ingestion.compact_reviews(df)
+
+    assert {c: str(t) for c, t in compact.dtypes.items()} == {
+        "platform": "category", "review_date": "datetime64[ns]", "reviewer_name": "string",
+        "star_rating": "float32", "review_text": "string", "replied": "bool"}
+    assert compact.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum() / 2
+    for column in ingestion.REVIEW_COLUMNS:
+        values = compact[column].astype(object)
+        assert values.where(values.notna(), None).tolist() == df[column].astype(object).tolist(), column
+    # IDs of stored verdicts and cached summaries don't change with the layout
+    assert review_store.review_ids(compact) == review_store.review_ids(df)
@@ -0,0 +1,100 @@
+import sqlite3
+import time
+from contextlib import closing
+
+import pytest
+
+import jobs
+import review_store
+
+BOOKING = "voyager~booking-reviews-scraper"
+URL = "https://www.booking.com/hotel/gb/stanwell-house.en-gb.html"
+PLAN = {"Booking.com": (URL, None)}
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(review_store, "DB_PATH", str(tmp_path / "reviews.db"))
+
+
+@pytest.fixture
+def apify(fake_apify):
+    items = [{"rating": 8, "reviewTitle": "Nice", "likedText": "Bed", "reviewDate": "2024-05-01T00:00:00.000Z",
+              "userName": "Bo"}]
+    fake_apify.items = {BOOKING: items, "run-0": items, "tri_angle~expedia-hotels-com-reviews-scraper": items}
+    return fake_apify
+
+
+def wait_for(runner, job_id):
+    for _ in range(100):
+        if not runner.is_running(job_id):
+            return
+        time.sleep(0.05)
+    raise AssertionError("job still running")
+
+
+def test_job_records_its_run_and_saves_the_reviews(apify):
+    runner = jobs.JobRunner()
+    with closing(jobs.connect()) as conn:
+        job_id = runner.start(conn, "Stanwell House", PLAN, "token")
+        wait_for(runner, job_id)
+        job = jobs.job_status(conn, job_id)
+        assert job["status"] == "done" and jobs.active_job(conn, "Stanwell House") is None
+        row = job["platforms"].iloc[0]
+        assert (row["status"], row["saved"], row["run_id"]) == ("saved", 1, BOOKING)
+        assert len(review_store.load_platform_reviews(conn, "Stanwell House", URL)) == 1
+    assert apify.triggered == [(BOOKING, None)]
+
+
+def test_interrupted_job_reattaches_to_its_run(apify):
+    with closing(jobs.connect()) as conn:
+        # As left by a server that died after the run started
+        job_id = jobs.create_job(conn, "Stanwell House", PLAN)
+        jobs._set_job(conn, job_id, "running")
+        jobs._set_platform(conn, job_id, "Booking.com", status="running", run_id="run-0")
+        runner = jobs.JobRunner()
+        assert runner.start(conn, "Stanwell House", PLAN, "token") == job_id
+        wait_for(runner, job_id)
+        job = jobs.job_status(conn, job_id)
+        assert job["status"] == "done" and job["platforms"]["run_id"].tolist() == ["run-0"]
+    assert apify.triggered == []
+
+    # Jobs interrupted too long ago are given up and a new one started
+    with closing(jobs.connect()) as conn:
+        stale = jobs.create_job(conn, "Stanwell House", PLAN, now=time.time() - 2 * 86400)
+        job_id = runner.start(conn, "Stanwell House", PLAN, "token")
+        wait_for(runner, job_id)
+        assert job_id != stale and jobs.job_status(conn, stale)["status"] == "abandoned"
+    assert len(apify.triggered) == 1
+
+
+def test_failed_platform_fails_the_job(apify):
+    apify.failed.add(BOOKING)
+    runner = jobs.JobRunner()
+    with closing(jobs.connect()) as conn:
+        job_id = runner.start(conn, "Stanwell House", PLAN, "token")
+        wait_for(runner, job_id)
+        job = jobs.job_status(conn, job_id)
+        assert job["status"] == "failed"
+        assert job["platforms"]["status"].tolist() == ["failed"] and "FAILED" in job["platforms"]["details"][0]
+
+
+def test_failed_save_fails_only_that_platform(apify, monkeypatch):
+    save = review_store.save_platform_reviews
+
+    def save_platform_reviews(conn, establishment, source, source_url, df, fetched_at=None):
+        if source == "Expedia":
+            raise sqlite3.OperationalError("database is locked")
+        save(conn, establishment, source, source_url, df, fetched_at)
+
+    monkeypatch.setattr(review_store, "save_platform_reviews", save_platform_reviews)
+    plan = {"Booking.com": ("https://b", None), "Expedia": ("https://e", None)}
+    runner = jobs.JobRunner()
+    with closing(jobs.connect()) as conn:
+        job_id = runner.start(conn, "Stanwell House", plan, "token")
+        wait_for(runner, job_id)
+        job = jobs.job_status(conn, job_id)
+    assert job["status"] == "failed"
+    statuses = dict(zip(job["platforms"]["platform"], zip(job["platforms"]["status"], job["platforms"]["message"])))
+    assert statuses == {"Booking.com": ("saved", "Saved 1 Booking.com reviews."),
+                        "Expedia": ("failed", "database is locked")}
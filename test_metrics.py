@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+
+import ingestion
+import metrics
+import summarizer
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    metrics.registry.reset()
+    yield metrics.registry
+    metrics.registry.reset()
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    metrics.registry.reset()
+    metrics.inc("reviews_fetched_total", 5, platform="Expedia")
+    with metrics.timer("reviews_ingest_stage_seconds", platform="Expedia", stage="run"):
+        pass
+    assert metrics.registry.snapshot() == []
+
+
+def test_render_uses_the_prometheus_text_format(enabled, tmp_path):
+    metrics.inc("reviews_fetched_total", 3, platform='Say "hi"')
+    metrics.observe("openai_request_seconds", 1.5, purpose="summary", model="gpt-4")
+    metrics.observe("openai_request_seconds", 0.5, purpose="summary", model="gpt-4")
+    text = enabled.render()
+    assert "# TYPE reviews_fetched_total counter" in text
+    assert 'reviews_fetched_total{platform="Say \\"hi\\""} 3' in text
+    assert "# TYPE openai_request_seconds summary" in text
+    assert 'openai_request_seconds_count{model="gpt-4",purpose="summary"} 2' in text
+    assert 'openai_request_seconds_sum{model="gpt-4",purpose="summary"} 2' in text
+
+    path = tmp_path / "reviews.prom"
+    metrics.write_file(str(path))
+    assert path.read_text() == text
+
+
+def test_ingestion_and_openai_usage_are_recorded(enabled, fake_apify):
+    fake_apify.items["google"] = [
+        {"reviewOrigin": "Google", "text": "Good", "stars": 5, "publishedAtDate": "2024-05-04T10:00:00.000Z"},
+        {"reviewOrigin": "Tripadvisor", "text": "Copied", "stars": 4},
+        {"reviewOrigin": "Google", "text": "No date", "stars": 3}]
+    ingestion.ingest_platform("Google Maps", "google", ingestion.normalize_google_review, "token",
+                              "https://example.com/g", lambda kind, message: None)
+
+    usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+    message = SimpleNamespace(content="answer")
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **kwargs: SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage))))
+    summarizer.chat(client, "system", "prompt", purpose="report")
+
+    rows = {(row["metric"], row["labels"]): row for row in enabled.snapshot()}
+    google = '{platform="Google Maps"}'
+    assert rows[("reviews_fetched_total", google)]["total"] == 3
+    assert rows[("reviews_dropped_total", google)]["total"] == 1
+    assert rows[("reviews_kept_total", google)]["total"] == 2
+    assert rows[("reviews_undated_total", google)]["total"] == 1
+    for stage in ("trigger", "run", "download", "normalize", "build"):
+        assert rows[("reviews_ingest_stage_seconds", f'{{platform="Google Maps",stage="{stage}"}}')]["count"] >= 1
+    assert rows[("openai_tokens_total", '{kind="prompt",model="gpt-4",purpose="report"}')]["total"] == 120
+    assert rows[("openai_tokens_total", '{kind="completion",model="gpt-4",purpose="report"}')]["total"] == 30
+    assert rows[("openai_request_seconds", '{model="gpt-4",purpose="report"}')]["count"] == 1
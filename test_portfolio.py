@@ -0,0 +1,82 @@
+import io
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+import portfolio
+import review_store
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(review_store, "DB_PATH", str(tmp_path / "reviews.db"))
+
+
+def test_load_portfolio_reads_csv_and_json():
+    csv_file = io.BytesIO(b"name,TripAdvisor,Google Maps\nStanwell House,https://t/1,\nCastle Inn,https://t/2,https://g/2\n")
+    csv_file.name = "portfolio.csv"
+    json_file = io.StringIO('[{"name": "Castle Inn", "urls": {"Google Maps": "https://g/2", "Unknown": "x"}}]')
+
+    assert portfolio.load_portfolio(csv_file) == {
+        "Stanwell House": {"TripAdvisor": "https://t/1"},
+        "Castle Inn": {"TripAdvisor": "https://t/2", "Google Maps": "https://g/2"},
+    }
+    assert portfolio.load_portfolio(json_file) == {"Castle Inn": {"Google Maps": "https://g/2"}}
+
+
+def test_refresh_portfolio_bounds_concurrency_and_stores_per_establishment(monkeypatch):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def ingest_platform(name, actor_id, normalize_fn, api_token, start_url, emit, since=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return pd.DataFrame([{"platform": name, "review_date": "2024-05-01", "reviewer_name": start_url,
+                              "star_rating": 4.0, "review_text": "Fine", "replied": False}])
+
+    monkeypatch.setattr(portfolio, "ingest_platform", ingest_platform)
+    establishments = {f"Hotel {i}": {"TripAdvisor": f"https://t/{i}", "Google Maps": f"https://g/{i}"}
+                      for i in range(5)}
+    with closing(review_store.connect()) as conn:
+        review_store.save_platform_reviews(conn, "Hotel 0", "TripAdvisor", "https://t/0", pd.DataFrame(
+            columns=review_store.REVIEW_COLUMNS))
+
+    events = list(portfolio.refresh_portfolio(establishments, "token", max_concurrent_runs=3, start_interval=0))
+
+    saved = [(e, p) for e, p, kind, _ in events if kind == "saved"]
+    assert len(saved) == 9 and ("Hotel 0", "TripAdvisor") not in saved
+    assert peak[0] <= 3
+    with closing(review_store.connect()) as conn:
+        assert review_store.list_establishments(conn) == sorted(establishments)
+        stored = review_store.load_platform_reviews(conn, "Hotel 3", "https://g/3")
+    assert stored["reviewer_name"].tolist() == ["https://g/3"]
+
+
+def test_refresh_portfolio_reports_a_failed_save_and_carries_on(monkeypatch):
+    def ingest_platform(name, actor_id, normalize_fn, api_token, start_url, emit, since=None):
+        return pd.DataFrame([{"platform": name, "review_date": "2024-05-01", "reviewer_name": start_url,
+                              "star_rating": 4.0, "review_text": "Fine", "replied": False}])
+
+    save = review_store.save_platform_reviews
+
+    def save_platform_reviews(conn, establishment, source, source_url, df, fetched_at=None):
+        if establishment == "Hotel 0":
+            raise sqlite3.OperationalError("database is locked")
+        save(conn, establishment, source, source_url, df, fetched_at)
+
+    monkeypatch.setattr(portfolio, "ingest_platform", ingest_platform)
+    monkeypatch.setattr(review_store, "save_platform_reviews", save_platform_reviews)
+    establishments = {f"Hotel {i}": {"TripAdvisor": f"https://t/{i}"} for i in range(3)}
+
+    events = list(portfolio.refresh_portfolio(establishments, "token", max_concurrent_runs=1, start_interval=0))
+
+    kinds = {e: (kind, str(payload)) for e, _, kind, payload in events if kind in ("saved", "error")}
+    assert kinds == {"Hotel 0": ("error", "database is locked"), "Hotel 1": ("saved", "1"), "Hotel 2": ("saved", "1")}
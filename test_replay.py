@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import ingestion
+import replay
+from apify_stub import StubApifyServer, synthetic_items_by_actor
+
+
+def ingest_all(token):
+    urls = {name: f"https://example.com/{name}" for name, _, _ in ingestion.PLATFORMS}
+    events = list(ingestion.ingest_platforms(ingestion.PLATFORMS, urls, token))
+    assert not [e for e in events if e[1] == "error"]
+    return {name: payload for name, kind, payload in events if kind == "done"}
+
+
+def test_stub_server_record_then_replay_offline(monkeypatch, tmp_path):
+    monkeypatch.setattr(ingestion, "DATASET_PAGE_SIZE", 100)
+    with StubApifyServer(synthetic_items_by_actor(250), run_seconds=0.2) as server:
+        monkeypatch.setattr(ingestion, "API_BASE", server.base_url)
+        with replay.record(tmp_path):
+            recorded = ingest_all("stub-token")
+        # Three pages per platform, each fetched once
+        pages = [r for r in server.requests if r[1].endswith("/items")]
+        assert len(pages) == 3 * len(ingestion.PLATFORMS)
+
+    # The server is gone: replay must not need the network, whatever the token
+    monkeypatch.setattr(ingestion, "API_BASE", "http://127.0.0.1:9/v2")
+    with replay.replay(tmp_path):
+        replayed = ingest_all("another-token")
+    assert set(replayed) == set(recorded) == {name for name, _, _ in ingestion.PLATFORMS}
+    for name, df in recorded.items():
+        assert len(df) > 0
+        pd.testing.assert_frame_equal(replayed[name], df)
+
+
+def test_replay_miss_raises(tmp_path):
+    with replay.replay(tmp_path):
+        with pytest.raises(replay.ReplayMissError):
+            ingestion.trigger_actor("voyager~booking-reviews-scraper", "token", "https://example.com")
+    # The real functions are back afterwards
+    assert ingestion.trigger_actor.__module__ == "ingestion"
+
+
+def test_stub_server_failed_run(monkeypatch):
+    actor = "maxcopell~tripadvisor-reviews"
+    with StubApifyServer({actor: []}, fail_actors=[actor]) as server:
+        monkeypatch.setattr(ingestion, "API_BASE", server.base_url)
+        run_id = ingestion.trigger_actor(actor, "token", "https://example.com")
+        assert ingestion.wait_for_run(run_id, "token")["data"]["status"] == "FAILED"
+
+
+def test_install_from_env_applies_once_for_the_whole_process(tmp_path, monkeypatch):
+    for name in ("trigger_actor", "wait_for_run", "fetch_dataset_page"):
+        monkeypatch.setattr(ingestion, name, getattr(ingestion, name))
+    monkeypatch.setattr(replay, "_installed", None)
+    monkeypatch.setenv("APIFY_REPLAY_DIR", str(tmp_path))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert set(pool.map(lambda _: replay.install_from_env(), range(8))) == {"replay"}
+    installed = ingestion.trigger_actor
+
+    # Later calls, whatever the environment says by then, leave it in place
+    monkeypatch.delenv("APIFY_REPLAY_DIR")
+    monkeypatch.setenv("APIFY_RECORD_DIR", str(tmp_path / "other"))
+    assert replay.install_from_env() == "replay" and ingestion.trigger_actor is installed
+    with pytest.raises(replay.ReplayMissError):
+        ingestion.trigger_actor("voyager~booking-reviews-scraper", "token", "https://example.com")
@@ -0,0 +1,56 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from review_index import ReviewDateIndex
+
+
+def loaded_reviews(n=500, seed=0):
+    """Reviews shaped like the loader's output: newest first, undated ones last."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "platform": rng.choice(["Google", "TripAdvisor", "Booking.com", "Expedia"], n),
+        "review_date": pd.to_datetime("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D"),
+        "reviewer_name": "Guest",
+        "star_rating": rng.choice([1.0, 2.5, 4.0, 5.0, np.nan], n),
+        "review_text": "Text",
+        "replied": rng.random(n) < 0.5,
+    })
+    df.loc[df.index[:5], "review_date"] = pd.NaT
+    return df.sort_values("review_date", ascending=False)
+
+
+def mask_filter(df, start, end):
+    return df.loc[(df["review_date"].dt.date >= start) & (df["review_date"].dt.date <= end)]
+
+
+@pytest.mark.parametrize("start, end", [
+    (datetime.date(2023, 3, 1), datetime.date(2023, 3, 31)),
+    (datetime.date(2022, 1, 1), datetime.date(2026, 1, 1)),
+    (datetime.date(2024, 12, 31), datetime.date(2024, 12, 31)),
+    (datetime.date(2024, 6, 1), datetime.date(2024, 5, 1)),
+])
+def test_slice_and_stats_match_mask_filter(start, end):
+    df = loaded_reviews()
+    index = ReviewDateIndex(df)
+
+    sliced = index.slice(start, end)
+    expected = mask_filter(df, start, end)
+    pd.testing.assert_frame_equal(sliced, expected)
+
+    stats = index.platform_stats(start, end)
+    assert list(stats) == list(expected["platform"].unique())
+    for platform, stat in stats.items():
+        rows = expected[expected["platform"] == platform]
+        assert stat["count"] == len(rows)
+        assert stat["avg_rating"] == pytest.approx(rows["star_rating"].mean(), nan_ok=True)
+
+
+def test_unsorted_frames_are_sorted_first():
+    df = loaded_reviews().sample(frac=1, random_state=1)
+    index = ReviewDateIndex(df)
+
+    start, end = datetime.date(2023, 6, 1), datetime.date(2023, 8, 31)
+    assert len(index.slice(start, end)) == len(mask_filter(df, start, end))
@@ -0,0 +1,121 @@
+from contextlib import closing
+
+import pandas as pd
+
+import review_store
+
+URL = "https://www.tripadvisor.co.uk/Hotel_Review-example.html"
+
+
+def sample_reviews():
+    return pd.DataFrame([
+        {"platform": "TripAdvisor", "review_date": "2024-05-01", "reviewer_name": "Ann",
+         "star_rating": 5, "review_text": "Title: Lovely\nGreat stay", "replied": True},
+        {"platform": "TripAdvisor", "review_date": None, "reviewer_name": "Bob",
+         "star_rating": None, "review_text": "No date", "replied": False},
+    ])
+
+
+def test_saved_reviews_round_trip(tmp_path):
+    with closing(review_store.connect(str(tmp_path / "reviews.db"))) as conn:
+        review_store.save_platform_reviews(conn, "Stanwell House", "TripAdvisor", URL, sample_reviews())
+        loaded = review_store.load_platform_reviews(conn, "Stanwell House", URL)
+
+    loaded = loaded.sort_values("reviewer_name").reset_index(drop=True)
+    assert loaded["review_date"].tolist() == ["2024-05-01", None]
+    assert loaded["star_rating"].iloc[0] == 5.0 and pd.isna(loaded["star_rating"].iloc[1])
+    assert loaded["replied"].tolist() == [True, False]
+
+
+def test_is_fresh_respects_ttl(tmp_path):
+    with closing(review_store.connect(str(tmp_path / "reviews.db"))) as conn:
+        review_store.save_platform_reviews(conn, "Stanwell House", "TripAdvisor", URL, sample_reviews(), fetched_at=1000)
+
+        fresh = review_store.is_fresh(conn, "Stanwell House", "TripAdvisor", URL, ttl_hours=1, now=1000 + 3599)
+        stale = review_store.is_fresh(conn, "Stanwell House", "TripAdvisor", URL, ttl_hours=1, now=1000 + 3601)
+        other = review_store.is_fresh(conn, "Other Hotel", "TripAdvisor", URL, now=1000)
+
+    assert fresh
+    assert not stale and not other
+
+
+def test_establishment_urls_are_saved(tmp_path):
+    with closing(review_store.connect(str(tmp_path / "reviews.db"))) as conn:
+        review_store.save_establishment(conn, "Stanwell House", {"TripAdvisor": URL})
+
+        assert review_store.load_establishment(conn, "Stanwell House") == {"TripAdvisor": URL}
+        assert review_store.load_establishment(conn, "Unknown") is None
+
+
+def test_merge_adds_only_new_reviews(tmp_path):
+    with closing(review_store.connect(str(tmp_path / "reviews.db"))) as conn:
+        review_store.save_platform_reviews(conn, "Stanwell House", "TripAdvisor", URL, sample_reviews(), fetched_at=1000)
+        delta = pd.DataFrame([
+            {"platform": "TripAdvisor", "review_date": "2024-05-01", "reviewer_name": "Ann",
+             "star_rating": 5, "review_text": "Title: Lovely\nGreat stay", "replied": False},
+            {"platform": "TripAdvisor", "review_date": "2024-06-02", "reviewer_name": "Cat",
+             "star_rating": 4, "review_text": "Newer", "replied": False},
+        ])
+
+        added = review_store.merge_platform_reviews(conn, "Stanwell House", "TripAdvisor", URL, delta, fetched_at=2000)
+        merged = review_store.load_platform_reviews(conn, "Stanwell House", URL)
+
+        assert added == 1
+        assert len(merged) == 3
+        assert review_store.newest_review_date(conn, "Stanwell House", URL) == "2024-06-02"
+        assert review_store.last_fetched(conn, "Stanwell House", URL) == 2000
+        assert not merged.loc[merged["reviewer_name"] == "Ann", "replied"].iloc[0]
+
+
+def test_search_is_ranked_filtered_and_kept_in_sync(tmp_path):
+    with closing(review_store.connect(str(tmp_path / "reviews.db"))) as conn:
+        review_store.save_platform_reviews(conn, "Stanwell House", "TripAdvisor", URL, pd.DataFrame([
+            {"platform": "TripAdvisor", "review_date": "2024-05-01", "reviewer_name": "Ann", "star_rating": 3,
+             "review_text": "Parking was hard to find. Parking costs extra.", "replied": False},
+            {"platform": "TripAdvisor", "review_date": "2024-06-01", "reviewer_name": "Bob", "star_rating": 5,
+             "review_text": "Lovely front desk staff, easy parking", "replied": True},
+        ]))
+        review_store.save_platform_reviews(conn, "Castle Inn", "Google", "https://g", pd.DataFrame([
+            {"platform": "Google", "review_date": "2024-05-03", "reviewer_name": "Cat", "star_rating": 4,
+             "review_text": "The car park is small", "replied": False},
+        ]))
+
+        # Words are stemmed, so "parking" also finds "car park"; two mentions rank first
+        ranked = review_store.search_reviews(conn, "parking")
+        assert ranked["reviewer_name"].iloc[0] == "Ann"
+        assert set(ranked["establishment"]) == {"Stanwell House", "Castle Inn"}
+        assert review_store.search_reviews(conn, '"front desk"')["reviewer_name"].tolist() == ["Bob"]
+        assert review_store.search_reviews(conn, "parking", start_date="2024-05-15")["reviewer_name"].tolist() == ["Bob"]
+        assert review_store.search_reviews(conn, "lov*")["reviewer_name"].tolist() == ["Bob"]
+        assert review_store.search_reviews(conn, "park*", establishment="Castle Inn", platforms=["Google"])["reviewer_name"].tolist() == ["Cat"]
+        assert review_store.search_reviews(conn, 'parking "unclosed').empty
+
+        # Replacing a platform's reviews replaces them in the index too
+        review_store.save_platform_reviews(conn, "Stanwell House", "TripAdvisor", URL, sample_reviews())
+        assert review_store.search_reviews(conn, "parking")["reviewer_name"].tolist() == ["Cat"]
+        assert review_store.search_reviews(conn, "lovely")["reviewer_name"].tolist() == ["Ann"]
+
+
+def test_existing_reviews_are_indexed_on_upgrade(tmp_path):
+    path = str(tmp_path / "reviews.db")
+    with closing(review_store.connect(path)) as conn:
+        review_store.save_platform_reviews(conn, "Stanwell House", "TripAdvisor", URL, sample_reviews())
+        conn.executescript("DROP TABLE reviews_fts; DROP TRIGGER reviews_fts_insert;")
+
+    with closing(review_store.connect(path)) as conn:
+        assert review_store.search_reviews(conn, "lovely")["reviewer_name"].tolist() == ["Ann"]
+
+
+def test_reviews_with_identical_content_are_kept_apart(tmp_path):
+    graham = {"platform": "Booking.com", "review_date": "2024-01-23", "reviewer_name": "Graham",
+              "star_rating": 4.0, "review_text": "", "replied": False}
+    twins = pd.DataFrame([graham, graham, {**graham, "star_rating": 5.0}])
+    with closing(review_store.connect(str(tmp_path / "reviews.db"))) as conn:
+        review_store.save_platform_reviews(conn, "Stanwell House", "Booking.com", URL, twins)
+        assert len(set(review_store.review_ids(twins))) == 3
+        assert len(review_store.load_platform_reviews(conn, "Stanwell House", URL)) == 3
+
+        # A re-fetch of the same reviews matches them rather than adding more
+        added = review_store.merge_platform_reviews(conn, "Stanwell House", "Booking.com", URL, twins)
+        assert added == 0 and len(review_store.load_platform_reviews(conn, "Stanwell House", URL)) == 3
+
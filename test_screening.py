@@ -0,0 +1,76 @@
+import json
+import re
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import review_store
+import screening
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(review_store, "DB_PATH", str(tmp_path / "reviews.db"))
+
+
+class ScreeningClient:
+    """Flags every review mentioning "idiot"; records how many reviews each request held."""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, temperature, max_tokens, stream=False):
+        prompt = messages[1]["content"]
+        reviews = re.findall(r"\[(R\d+)\] (.*?)---", prompt, flags=re.S)
+        self.batch_sizes.append(len(reviews))
+        verdicts = [{"id": rid, "flagged": "idiot" in text,
+                     "violations": ["Personal attacks or threats"], "evidence": "idiot",
+                     "removal_request": "Please remove this review."} for rid, text in reviews]
+        message = SimpleNamespace(content="Here you go:\n" + json.dumps(verdicts))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def reviews(texts, start="2024-01-01"):
+    return pd.DataFrame({
+        "platform": ["Google"] * len(texts),
+        "review_date": pd.date_range(start, periods=len(texts), freq="D"),
+        "reviewer_name": [f"Guest {i}" for i in range(len(texts))],
+        "star_rating": [1.0] * len(texts),
+        "review_text": texts,
+        "replied": [False] * len(texts),
+    })
+
+
+def test_only_unscreened_reviews_are_sent():
+    client = ScreeningClient()
+    week = reviews([f"Stay {i}" for i in range(60)] + ["The manager is an idiot"])
+    screening.screen_reviews(client, week.iloc[:40])
+    first_requests = list(client.batch_sizes)
+
+    verdicts = screening.screen_reviews(client, week)
+
+    assert max(first_requests) <= screening.MAX_REVIEWS_PER_REQUEST
+    assert sum(first_requests) == 40
+    assert sum(client.batch_sizes[len(first_requests):]) == 21
+    assert len(verdicts) == 61
+    assert screening.screen_reviews(client, week) == verdicts
+    assert sum(client.batch_sizes) == 61
+
+
+def test_report_is_built_from_stored_verdicts():
+    df = reviews(["Lovely stay", "The manager is an idiot"])
+    verdicts = screening.screen_reviews(ScreeningClient(), df)
+
+    report = screening.build_report(df, verdicts, "2024-01-01", "2024-01-02")
+
+    assert "Screened 2 of 2 reviews" in report
+    assert "#### 1. 2024-01-02 · Google · 1.0 stars" in report
+    assert "Personal attacks or threats" in report
+    assert "Lovely stay" not in report
+
+
+def test_unparseable_reply_raises():
+    with pytest.raises(ValueError):
+        screening.parse_verdicts("I could not find any violations.", {"R1": "abc"})
@@ -0,0 +1,122 @@
+import gc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from shared_store import SharedStore
+
+
+def frame(rows):
+    return pd.DataFrame({"review_text": ["x" * 10] * rows})
+
+
+def test_concurrent_acquires_share_one_load():
+    store = SharedStore()
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.2)
+        return frame(10)
+
+    waited = []
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leases = list(pool.map(lambda _: store.acquire("Stanwell House", load, on_wait=lambda: waited.append(1)),
+                               range(3)))
+
+    assert len(loads) == 1 and len(waited) == 2
+    assert leases[0].value is leases[1].value is leases[2].value
+    assert store.stats()[0][2] == 3
+    # A later session gets the stored value without loading
+    store.acquire("Stanwell House", load).release()
+    assert len(loads) == 1
+
+
+def test_leases_are_released_when_collected():
+    store = SharedStore()
+    lease = store.acquire("a", lambda: frame(10))
+    store.acquire("a", lambda: frame(10)).release()
+    assert store.stats()[0][2] == 1
+    del lease
+    gc.collect()
+    assert store.stats()[0][2] == 0
+
+
+def test_unleased_values_are_evicted_least_recently_used_first():
+    size = SharedStore().sizeof(frame(100))
+    store = SharedStore(budget=2.5 * size)
+    held = store.acquire("a", lambda: frame(100))
+    store.acquire("b", lambda: frame(100)).release()
+    store.acquire("c", lambda: frame(100)).release()
+    # "a" is over budget too but still leased; "b" was used least recently
+    assert [key for key, *_ in store.stats()] == ["a", "c"]
+    held.release()
+    store.acquire("d", lambda: frame(100)).release()
+    assert [key for key, *_ in store.stats()] == ["c", "d"]
+
+
+def test_failed_loads_are_shared_and_retried():
+    store = SharedStore()
+    gate = threading.Event()
+
+    def failing_load():
+        gate.wait()
+        raise RuntimeError("Apify down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(store.acquire, "c", failing_load) for _ in range(2)]
+        time.sleep(0.1)
+        gate.set()
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result()
+    assert len(store.acquire("c", lambda: frame(4)).value) == 4
+
+
+def test_interrupted_leader_hands_the_load_to_a_waiter():
+    store = SharedStore()
+    started = threading.Event()
+    gate = threading.Event()
+
+    class Rerun(BaseException):
+        pass
+
+    def interrupted_load():
+        started.set()
+        gate.wait()
+        raise Rerun()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(store.acquire, "a", interrupted_load)
+        started.wait()
+        waiter = pool.submit(store.acquire, "a", lambda: frame(5))
+        time.sleep(0.1)
+        gate.set()
+        with pytest.raises(Rerun):
+            leader.result()
+        # The waiter neither sees the leader's interruption nor gets nothing; it loads itself
+        assert len(waiter.result().value) == 5
+    assert store.stats()[0][2] == 1
+
+
+def test_values_loaded_before_the_data_changed_are_reloaded():
+    store = SharedStore()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return frame(10)
+
+    store.acquire("a", load).release()
+    loaded = time.time()
+    store.acquire("a", load, changed_at=loaded - 60).release()
+    assert len(loads) == 1
+    store.acquire("a", load, changed_at=loaded + 1).release()
+    assert len(loads) == 2
+
+    store.acquire("b", load).release()
+    store.discard(lambda key: key == "a")
+    assert [key for key, *_ in store.stats()] == ["b"]
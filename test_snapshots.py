@@ -0,0 +1,45 @@
+import pandas as pd
+
+import snapshots
+
+
+def reviews(platform, dates):
+    return pd.DataFrame({
+        "platform": platform,
+        "review_date": dates,
+        "reviewer_name": [f"Guest {i}" for i in range(len(dates))],
+        "star_rating": [4.0, None, 5.0][:len(dates)],
+        "review_text": [f"Stay {i}" for i in range(len(dates))],
+        "replied": [True, False, False][:len(dates)],
+    })
+
+
+def test_snapshot_round_trip_with_filters(tmp_path):
+    root = str(tmp_path)
+    snapshots.write_snapshot(reviews("Google", ["2024-05-01", "2024-06-15", None]), "Stanwell House", root)
+    snapshots.write_snapshot(reviews("TripAdvisor", ["2024-06-01"]), "Stanwell House", root)
+    snapshots.write_snapshot(reviews("Google", ["2024-06-02"]), "Castle Inn", root)
+
+    everything = snapshots.load_snapshots(root, establishment="Stanwell House")
+    assert everything["review_date"].dt.strftime("%Y-%m-%d").tolist()[:3] == ["2024-06-15", "2024-06-01", "2024-05-01"]
+    assert everything["review_date"].isna().sum() == 1
+    assert list(everything.columns) == snapshots.REVIEW_COLUMNS
+    assert everything.loc[everything["reviewer_name"] == "Guest 0", "replied"].tolist() == [True, True]
+
+    june = snapshots.load_snapshots(root, platforms=["Google"], start_date="2024-06-01", end_date="2024-06-30",
+                                    columns=["reviewer_name", "review_date"])
+    assert list(june.columns) == ["reviewer_name", "review_date"]
+    assert june["reviewer_name"].tolist() == ["Guest 1", "Guest 0"]
+
+
+def test_rewriting_a_platform_replaces_only_that_partition(tmp_path):
+    root = str(tmp_path)
+    snapshots.write_snapshot(reviews("Google", ["2024-05-01", "2024-06-15"]), "Stanwell House", root)
+    snapshots.write_snapshot(reviews("TripAdvisor", ["2024-06-01"]), "Stanwell House", root)
+
+    snapshots.write_snapshot(reviews("Google", ["2024-07-01"]), "Stanwell House", root)
+
+    loaded = snapshots.load_snapshots(root)
+    assert sorted(zip(loaded["platform"], loaded["review_date"].dt.strftime("%Y-%m-%d"))) == [
+        ("Google", "2024-07-01"), ("TripAdvisor", "2024-06-01")]
+    assert snapshots.load_snapshots(str(tmp_path / "missing")).empty
@@ -0,0 +1,163 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import review_store
+import summarizer
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(review_store, "DB_PATH", str(tmp_path / "reviews.db"))
+
+
+class FakeClient:
+    """Stands in for openai.OpenAI, recording prompts and peak concurrency."""
+
+    def __init__(self, delay=0):
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, temperature, max_tokens, stream=False):
+        with self.lock:
+            self.prompts.append(messages[1]["content"])
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        content = f"answer {len(self.prompts)}"
+        if stream:
+            self.stream = FakeStream(content.split(" "))
+            return self.stream
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeStream:
+    def __init__(self, words):
+        self.words = words
+        self.closed = False
+
+    def __iter__(self):
+        for i, word in enumerate(self.words):
+            delta = SimpleNamespace(content=word if i == 0 else " " + word)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    def close(self):
+        self.closed = True
+
+
+def reviews(n, text="Great stay, lovely staff."):
+    return pd.DataFrame({
+        "platform": ["Google"] * n,
+        "review_date": pd.date_range("2024-01-01", periods=n, freq="D"),
+        "reviewer_name": ["Ann"] * n,
+        "star_rating": [5.0] * n,
+        "review_text": [text] * n,
+        "replied": [i % 2 == 0 for i in range(n)],
+    })
+
+
+def test_format_reviews_matches_prompt_layout():
+    block = summarizer.format_reviews(reviews(1))[0]
+    assert block == ("Date: 2024-01-01\nPlatform: Google\nRating: 5.0 stars\n"
+                     "Review: Great stay, lovely staff.\nReplied: Yes\n---\n")
+
+
+def test_small_range_is_one_call():
+    client = FakeClient()
+    result = summarizer.summarize_reviews(client, reviews(10), "2024-01-01", "2024-01-10")
+
+    assert result == "answer 1"
+    assert len(client.prompts) == 1
+    assert "Reviews to analyze:" in client.prompts[0]
+
+
+def test_large_range_is_mapped_in_bounded_parallel_batches_then_reduced():
+    client = FakeClient(delay=0.02)
+    df = reviews(400, text="x" * 400)
+
+    summarizer.summarize_reviews(client, df, "2023-01-01", "2024-12-31", max_workers=3, budget=2000)
+
+    map_prompts = [p for p in client.prompts if p.startswith("These reviews, from")]
+    assert len(map_prompts) > 3
+    assert sum(p.count("\n---\n") for p in map_prompts) == 400
+    assert all(summarizer.estimate_tokens(p) < 2000 + summarizer.PROMPT_OVERHEAD_TOKENS for p in map_prompts)
+    assert client.peak <= 3
+    assert client.prompts[-1].startswith("Below are notes on consecutive batches")
+
+
+def test_repeat_requests_are_answered_from_cache():
+    client = FakeClient()
+    df = reviews(10)
+
+    first = summarizer.summarize_reviews(client, df, "2024-01-01", "2024-01-10")
+    again = summarizer.summarize_reviews(client, df.iloc[::-1], "2024-01-01", "2024-01-10")
+    fresh = summarizer.summarize_reviews(client, df, "2024-01-01", "2024-01-10", use_cache=False)
+
+    assert again == first
+    assert fresh != first
+    assert len(client.prompts) == 2
+
+    # The same reviews over a wider range get an answer that names the new dates
+    wider = summarizer.summarize_reviews(client, df, "2023-12-01", "2024-01-31")
+    assert wider != first and "2023-12-01" in client.prompts[-1]
+
+
+def test_shifted_range_reuses_batches_of_unchanged_months():
+    client = FakeClient()
+    df = reviews(120, text="x" * 400)
+    summarizer.summarize_reviews(client, df, "2024-01-01", "2024-04-29", budget=2000)
+    calls = len(client.prompts)
+
+    # Drop the first week: only January's batches (and the merge) need recomputing
+    summarizer.summarize_reviews(client, df.iloc[7:], "2024-01-08", "2024-04-29", budget=2000)
+    redone = client.prompts[calls:]
+
+    assert all("Date: 2024-01" in p for p in redone if p.startswith("These reviews, from"))
+    assert len(redone) < calls / 2
+
+
+def test_final_answer_is_streamed_and_cached_once_complete():
+    client = FakeClient()
+    seen = []
+
+    result = summarizer.summarize_reviews(client, reviews(3), "2024-01-01", "2024-01-03", on_text=seen.append)
+
+    assert seen == ["answer", "answer 1"]
+    assert result == "answer 1"
+    assert client.stream.closed
+    assert summarizer.summarize_reviews(client, reviews(3), "2024-01-01", "2024-01-03") == "answer 1"
+
+
+def test_cancelled_stream_is_closed_and_not_cached():
+    client = FakeClient()
+
+    def cancel(text):
+        raise KeyboardInterrupt  # stands in for Streamlit interrupting the script
+
+    with pytest.raises(KeyboardInterrupt):
+        summarizer.summarize_reviews(client, reviews(3), "2024-01-01", "2024-01-03", on_text=cancel)
+
+    assert client.stream.closed
+    assert summarizer.summarize_reviews(client, reviews(3), "2024-01-01", "2024-01-03") == "answer 2"
+
+
+def test_theme_summary_is_one_prompt_of_digests():
+    client = FakeClient()
+    digest = "Theme: breakfast, coffee\nReviews: 400, average rating 3.2\n---\n"
+
+    first = summarizer.summarize_themes(client, digest, 400, "2024-01-01", "2024-06-30")
+    again = summarizer.summarize_themes(client, digest, 400, "2024-01-01", "2024-06-30")
+
+    assert again == first
+    assert len(client.prompts) == 1
+    assert digest in client.prompts[0] and "400 reviews" in client.prompts[0]
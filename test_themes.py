@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+import themes
+
+TOPICS = {
+    "breakfast": ["breakfast eggs coffee buffet delicious", "cold breakfast coffee toast buffet slow"],
+    "parking": ["parking car park expensive tight spaces", "parking difficult car park full street"],
+    "spa": ["spa pool sauna treatment relaxing massage", "spa massage pool sauna wonderful treatment"],
+}
+
+
+def topic_reviews(n_per_topic=30):
+    rows = []
+    for t, (topic, texts) in enumerate(TOPICS.items()):
+        for i in range(n_per_topic):
+            month = pd.Timestamp("2024-01-01") + pd.DateOffset(months=i % 6)
+            # Parking gets steadily worse; the other topics stay flat
+            rating = 5.0 - (i % 6) * 0.5 if topic == "parking" else 4.0
+            rows.append({"platform": "Google", "review_date": month, "reviewer_name": f"{topic}{i}",
+                         "star_rating": rating, "review_text": f"{texts[i % 2]} stay {i}", "replied": i % 3 == 0})
+    return pd.DataFrame(rows)
+
+
+def test_find_themes_separates_topics_and_tracks_trends():
+    df = topic_reviews()
+
+    labels, found = themes.find_themes(df, n_themes=3)
+
+    assert (labels >= 0).all()
+    by_topic = pd.Series(labels).groupby(np.repeat(list(TOPICS), 30)).nunique()
+    assert (by_topic == 1).all() and len(set(labels)) == 3
+    assert found["reviews"].tolist() == [30, 30, 30]
+    parking = found[found["terms"].map(lambda terms: "parking" in terms)].iloc[0]
+    assert parking["trend"] < -0.4
+    assert found[found.index != parking.name]["trend"].abs().max() < 1e-9
+    assert len(parking["quotes"]) == themes.QUOTES_PER_THEME
+
+
+def test_theme_digest_size_does_not_grow_with_reviews():
+    small = themes.theme_digest(themes.find_themes(topic_reviews(30), n_themes=3)[1])
+    large = themes.theme_digest(themes.find_themes(topic_reviews(600), n_themes=3)[1])
+
+    assert small.count("Theme:") == large.count("Theme:") == 3
+    assert len(large) < 1.2 * len(small)
+
+
+def test_too_few_reviews_give_no_themes():
+    labels, found = themes.find_themes(topic_reviews(1))
+    assert labels.tolist() == [-1, -1, -1] and found.empty
@@ -0,0 +1,219 @@
+"""Offline theme clustering of review texts.
+
+Reviews are turned into TF-IDF vectors and grouped with spherical
+mini-batch k-means, all in NumPy on the CPU. Each theme gets its top terms,
+rating statistics, a monthly rating trend and a few representative quotes,
+which together make a digest whose size depends on the number of themes
+rather than the number of reviews.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+N_THEMES = 8
+# Vocabulary: terms in at least MIN_DF reviews and at most MAX_DF_SHARE of them,
+# the MAX_TERMS most frequent of those
+MIN_DF = 3
+MAX_DF_SHARE = 0.5
+MAX_TERMS = 3000
+# Mini-batch k-means
+BATCH_SIZE = 256
+ITERATIONS = 100
+# Rows densified at once when assigning every review to a theme
+CHUNK_ROWS = 2048
+TOP_TERMS = 5
+QUOTES_PER_THEME = 3
+QUOTE_CHARS = 280
+MIN_QUOTE_CHARS = 60
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has
+have having he her here hers him his how i if in into is it its itself just me more most my no nor
+not now of off on once only or other our ours out over own same she should so some such than that
+the their theirs them then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours title liked disliked
+""".split())
+
+_WORDS = re.compile(r"[a-z][a-z']{2,}")
+
+
+def tokenize(text):
+    """Lowercase content words of a review."""
+    if not isinstance(text, str):
+        return []
+    return [w for w in _WORDS.findall(text.lower()) if w not in STOPWORDS]
+
+
+class TfidfMatrix:
+    """L2-normalized TF-IDF rows in compressed sparse row form (indptr, indices, data)."""
+
+    def __init__(self, texts):
+        tokens = [tokenize(t) for t in texts]
+        lengths = np.array([len(t) for t in tokens], dtype=np.int64)
+        n = len(tokens)
+        codes, words = pd.factorize(pd.Series([w for ts in tokens for w in ts], dtype=object))
+        docs = np.repeat(np.arange(n), lengths)
+
+        # Count each (review, word) pair once for document frequency, keep the counts as term frequency
+        pairs, counts = np.unique(docs * max(len(words), 1) + codes, return_counts=True)
+        pair_docs, pair_words = pairs // max(len(words), 1), pairs % max(len(words), 1)
+        df = np.bincount(pair_words, minlength=len(words))
+        eligible = np.flatnonzero((df >= min(MIN_DF, max(n, 1))) & (df <= max(MAX_DF_SHARE * n, 1)))
+        keep = eligible[np.argsort(-df[eligible], kind="stable")[:MAX_TERMS]]
+        keep.sort()
+        column = np.full(len(words), -1, dtype=np.int64)
+        column[keep] = np.arange(len(keep))
+        self.terms = np.asarray(words)[keep]
+
+        kept = column[pair_words] >= 0
+        pair_docs, pair_cols, counts = pair_docs[kept], column[pair_words[kept]], counts[kept]
+        idf = np.log((1 + n) / (1 + df[keep])) + 1
+        data = (1 + np.log(counts)) * idf[pair_cols]
+        norms = np.sqrt(np.bincount(pair_docs, weights=data ** 2, minlength=n))
+        data = data / norms[pair_docs]
+
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(pair_docs, minlength=n))])
+        self.indices = pair_cols
+        self.data = data.astype(np.float32)
+        self.shape = (n, len(keep))
+
+    def nonempty(self):
+        """Rows with at least one vocabulary term."""
+        return np.flatnonzero(np.diff(self.indptr) > 0)
+
+    def dense(self, rows):
+        """The given rows as a dense float32 array."""
+        rows = np.asarray(rows)
+        out = np.zeros((len(rows), self.shape[1]), dtype=np.float32)
+        starts, stops = self.indptr[rows], self.indptr[rows + 1]
+        lengths = stops - starts
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + starts[owner]
+        out[owner, self.indices[positions]] = self.data[positions]
+        return out
+
+
+def _normalize(centers):
+    norms = np.linalg.norm(centers, axis=1, keepdims=True)
+    return centers / np.where(norms == 0, 1, norms)
+
+def minibatch_kmeans(matrix, rows, k, seed=0):
+    """Spherical mini-batch k-means over `rows` of `matrix`; returns unit-length centers."""
+    rng = np.random.default_rng(seed)
+    # k-means++ seeding on a sample
+    sample = matrix.dense(rng.choice(rows, size=min(len(rows), 20 * k), replace=False))
+    centers = [sample[rng.integers(len(sample))]]
+    for _ in range(1, k):
+        distance = 1 - np.max(sample @ np.array(centers).T, axis=1)
+        distance = np.clip(distance, 0, None)
+        p = distance / distance.sum() if distance.sum() > 0 else None
+        centers.append(sample[rng.choice(len(sample), p=p)])
+    centers = np.array(centers, dtype=np.float32)
+
+    seen = np.zeros(k)
+    for _ in range(ITERATIONS):
+        batch = matrix.dense(rng.choice(rows, size=min(len(rows), BATCH_SIZE), replace=False))
+        nearest = np.argmax(batch @ centers.T, axis=1)
+        # Per-center learning rate 1 / (reviews seen so far), applied for the whole batch at once
+        batch_counts = np.bincount(nearest, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, nearest, batch)
+        seen += batch_counts
+        moved = batch_counts > 0
+        rate = (batch_counts[moved] / seen[moved])[:, None]
+        centers[moved] = (1 - rate) * centers[moved] + rate * sums[moved] / batch_counts[moved][:, None]
+        centers = _normalize(centers)
+    return centers
+
+def _assign(matrix, rows, centers):
+    labels = np.empty(len(rows), dtype=np.int64)
+    scores = np.empty(len(rows), dtype=np.float32)
+    for start in range(0, len(rows), CHUNK_ROWS):
+        similarity = matrix.dense(rows[start:start + CHUNK_ROWS]) @ centers.T
+        labels[start:start + CHUNK_ROWS] = np.argmax(similarity, axis=1)
+        scores[start:start + CHUNK_ROWS] = np.max(similarity, axis=1)
+    return labels, scores
+
+def _monthly_trends(labels, dates, ratings, k):
+    """Per-theme monthly average ratings (k x months) and the count-weighted slope in stars per month."""
+    months = dates.dt.year.to_numpy() * 12 + dates.dt.month.to_numpy() - 1
+    valid = ~(np.isnan(months.astype(float)) | np.isnan(ratings))
+    months = months[valid].astype(np.int64)
+    if not len(months):
+        return np.full((k, 0), np.nan), np.full(k, np.nan), None
+    first = months.min()
+    span = months.max() - first + 1
+    cell = labels[valid] * span + (months - first)
+    counts = np.bincount(cell, minlength=k * span).reshape(k, span).astype(float)
+    sums = np.bincount(cell, weights=ratings[valid], minlength=k * span).reshape(k, span)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        monthly = sums / counts
+        x = np.arange(span, dtype=float)
+        total = counts.sum(axis=1)
+        x_mean = (counts * x).sum(axis=1) / total
+        y_mean = sums.sum(axis=1) / total
+        dx = x - x_mean[:, None]
+        slope = (counts * dx * (np.nan_to_num(monthly) - y_mean[:, None])).sum(axis=1) / (counts * dx ** 2).sum(axis=1)
+    return monthly, slope, first
+
+def find_themes(df, n_themes=N_THEMES, seed=0):
+    """Cluster the reviews of `df` into themes.
+
+    Returns `(labels, themes)`: the theme number of each row (-1 for reviews
+    with no vocabulary terms) and a DataFrame with one row per theme
+    (`theme`, `terms`, `reviews`, `avg_rating`, `trend`, `unreplied`,
+    `quotes`), largest theme first.
+    """
+    matrix = TfidfMatrix(df["review_text"].tolist())
+    rows = matrix.nonempty()
+    labels = np.full(len(df), -1, dtype=np.int64)
+    columns = ["theme", "terms", "reviews", "avg_rating", "trend", "unreplied", "quotes"]
+    k = min(n_themes, len(rows) // 5)
+    if k < 1 or not matrix.shape[1]:
+        return labels, pd.DataFrame(columns=columns)
+
+    centers = minibatch_kmeans(matrix, rows, k, seed=seed)
+    labels[rows], scores = _assign(matrix, rows, centers)
+
+    ratings = df["star_rating"].to_numpy("float64", na_value=np.nan)
+    _, slope, _ = _monthly_trends(labels[rows], pd.to_datetime(df["review_date"].iloc[rows], errors="coerce"),
+                                  ratings[rows], k)
+    counts = np.bincount(labels[rows], minlength=k)
+    rated = ~np.isnan(ratings[rows])
+    rating_sums = np.bincount(labels[rows][rated], weights=ratings[rows][rated], minlength=k)
+    rated_counts = np.bincount(labels[rows][rated], minlength=k)
+    unreplied = np.bincount(labels[rows], weights=~df["replied"].to_numpy(bool)[rows], minlength=k)
+    texts = df["review_text"].to_numpy(object)
+
+    themes = []
+    for t in range(k):
+        if not counts[t]:
+            continue
+        terms = matrix.terms[np.argsort(-centers[t])[:TOP_TERMS]].tolist()
+        members = rows[labels[rows] == t]
+        by_score = members[np.argsort(-scores[labels[rows] == t], kind="stable")]
+        # Prefer quotes with some substance over bare titles
+        substantial = [i for i in by_score if len(str(texts[i])) >= MIN_QUOTE_CHARS]
+        closest = (substantial or list(by_score))[:QUOTES_PER_THEME]
+        quotes = [" ".join(str(texts[i]).split())[:QUOTE_CHARS] for i in closest]
+        themes.append({
+            "theme": t, "terms": terms, "reviews": int(counts[t]),
+            "avg_rating": rating_sums[t] / rated_counts[t] if rated_counts[t] else np.nan,
+            "trend": slope[t], "unreplied": int(unreplied[t]), "quotes": quotes,
+        })
+    themes = pd.DataFrame(themes, columns=columns).sort_values("reviews", ascending=False, ignore_index=True)
+    return labels, themes
+
+def theme_digest(themes):
+    """Compact text description of the themes for a prompt."""
+    blocks = []
+    for row in themes.itertuples(index=False):
+        trend = "" if pd.isna(row.trend) else f", trend {row.trend:+.2f} stars/month"
+        rating = "n/a" if pd.isna(row.avg_rating) else f"{row.avg_rating:.1f}"
+        quotes = "\n".join(f'  - "{q}"' for q in row.quotes)
+        blocks.append(f"Theme: {', '.join(row.terms)}\n"
+                      f"Reviews: {row.reviews}, average rating {rating}{trend}, unreplied {row.unreplied}\n"
+                      f"Representative quotes:\n{quotes}\n---\n")
+    return "\n".join(blocks)